@@ -0,0 +1,151 @@
+"""
+Account ledger with running balances per account_number.
+
+The balance of a row is the sum of debit - credit over every row of the same
+account_number up to and including it, ordered by (date, id). A page of the
+ledger computes its running balance with a SQL window function over the page
+rows only; the opening balance before the page comes from the latest monthly
+checkpoint (AccountBalanceCheckpoint) plus the rows between that checkpoint and
+the page, so a page deep in history never scans from the first entry.
+
+Checkpoints are built lazily on read. A write deletes the checkpoints from the
+month of the earliest changed row onwards; checkpoints before it stay valid.
+"""
+import calendar
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum, Window
+from django.db.models.functions import TruncMonth
+from django.db.models.expressions import RowRange
+
+from .archive import ledger_queryset
+from .models import AccountBalanceCheckpoint
+
+ZERO = Decimal('0.00')
+AMOUNT = F('debit') - F('credit')
+
+
+def month_start(value):
+    return value.replace(day=1)
+
+
+def month_end(month):
+    return month.replace(day=calendar.monthrange(month.year, month.month)[1])
+
+
+def previous_month(month):
+    return month_start(month - timedelta(days=1))
+
+
+def invalidate_balance_checkpoints(since=None):
+    """Delete checkpoints that include rows dated on or after `since` (all of them if None)"""
+    checkpoints = AccountBalanceCheckpoint.objects.all()
+    if since is not None:
+        checkpoints = checkpoints.filter(month__gte=month_start(since))
+    checkpoints.delete()
+
+
+def balance_rows_changed(dates=None):
+    """
+    Invalidate checkpoints for a write touching rows on the given dates (None: any date).
+    Runs now and again on commit, so a checkpoint built concurrently from the
+    pre-commit state does not survive.
+    """
+    dates = [value for value in dates or () if value]
+    since = min(dates) if dates else None
+    invalidate_balance_checkpoints(since)
+    transaction.on_commit(lambda: invalidate_balance_checkpoints(since))
+
+
+def _ledger_rows(account_number):
+    return ledger_queryset().filter(account_number=account_number)
+
+
+def checkpoint_balance(account_number, through_month):
+    """
+    Closing balance of the account through the end of through_month, building and
+    storing the missing monthly checkpoints with one grouped query.
+    Returns (balance, month the balance is valid through or None).
+    """
+    last = AccountBalanceCheckpoint.objects.filter(
+        account_number=account_number, month__lte=through_month
+    ).order_by('-month').first()
+    if last and last.month == through_month:
+        return last.balance, last.month
+
+    rows = _ledger_rows(account_number).filter(date__lte=month_end(through_month))
+    if last:
+        rows = rows.filter(date__gt=month_end(last.month))
+    months = rows.annotate(month=TruncMonth('date')).values('month').annotate(
+        total=Sum(AMOUNT), count=Count('id')
+    ).order_by('month')
+
+    balance = last.balance if last else ZERO
+    checkpoints = {}
+    for row in months:
+        month = row['month'].date() if hasattr(row['month'], 'date') else row['month']
+        balance += row['total'] or ZERO
+        checkpoints[month] = AccountBalanceCheckpoint(
+            account_number=account_number, month=month, balance=balance, entry_count=row['count']
+        )
+    if through_month not in checkpoints:
+        # Empty months are stored too, so the next read of this month is a single lookup
+        checkpoints[through_month] = AccountBalanceCheckpoint(
+            account_number=account_number, month=through_month, balance=balance, entry_count=0
+        )
+    AccountBalanceCheckpoint.objects.bulk_create(checkpoints.values(), ignore_conflicts=True)
+    return balance, through_month
+
+
+def opening_balance(account_number, before_date, before_id=None):
+    """
+    Balance of every row before (before_date, before_id) in ledger order;
+    with before_id None, of every row dated before before_date.
+    """
+    through_month = previous_month(month_start(before_date))
+    balance, valid_through = checkpoint_balance(account_number, through_month)
+    position = Q(date__lt=before_date)
+    if before_id is not None:
+        position |= Q(date=before_date, id__lt=before_id)
+    rest = _ledger_rows(account_number).filter(
+        position, date__gt=month_end(valid_through)
+    ).aggregate(total=Sum(AMOUNT))['total']
+    return balance + (rest or ZERO)
+
+
+def ledger_page(account_number, start_date=None, end_date=None, after=None, page_size=100):
+    """
+    One page of the account ledger in (date, id) order with running balances.
+    after: (date, id) of the last row of the previous page.
+    Returns (opening_balance, rows, has_more); each row has a `balance`.
+    """
+    queryset = _ledger_rows(account_number)
+    if after:
+        after_date, after_id = after
+        queryset = queryset.filter(Q(date__gt=after_date) | Q(date=after_date, id__gt=after_id))
+        opening = opening_balance(account_number, after_date, after_id + 1)
+    elif start_date:
+        queryset = queryset.filter(date__gte=start_date)
+        opening = opening_balance(account_number, start_date)
+    else:
+        opening = ZERO
+    if end_date:
+        queryset = queryset.filter(date__lte=end_date)
+
+    rows = list(queryset.annotate(
+        running=Window(
+            Sum(AMOUNT),
+            order_by=[F('date').asc(), F('id').asc()],
+            frame=RowRange(start=None, end=0),
+        ),
+    ).values(
+        'id', 'date', 'description', 'reference_number', 'remarks', 'debit', 'credit',
+        'final_total', 'account_type__name', 'truck__plate_number', 'running',
+    ).order_by('date', 'id')[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    for row in rows:
+        row['balance'] = opening + row.pop('running')
+    return opening, rows, has_more
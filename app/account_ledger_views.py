@@ -0,0 +1,74 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from .account_ledger import ledger_page
+from .report_cache import cached_report
+from .report_utils import decode_cursor, encode_cursor, parse_date_param, parse_date_range, parse_page_size
+
+LEDGER_DEFAULT_PAGE_SIZE = 100
+LEDGER_MAX_PAGE_SIZE = 1000
+
+
+class AccountLedgerView(APIView):
+    """
+    GET: Ledger entries of one account number with running balances
+    Balance = cumulative debit - credit in (date, id) order over the whole account history.
+    Query params:
+    - account_number: Account number (required)
+    - start_date / end_date: Date range (YYYY-MM-DD or MM/DD/YYYY); the opening balance
+      includes every entry before start_date
+    - page_size: Entries per page (default 100, max 1000)
+    - cursor: next_cursor from the previous page
+    """
+
+    @cached_report('account_ledger')
+    def get(self, request):
+        try:
+            account_number = request.query_params.get('account_number')
+            if not account_number:
+                raise ValueError('account_number is required')
+            start_date, end_date = parse_date_range(request.query_params)
+            page_size = parse_page_size(request.query_params, LEDGER_DEFAULT_PAGE_SIZE, LEDGER_MAX_PAGE_SIZE)
+            position = decode_cursor(request.query_params.get('cursor'))
+            after = (parse_date_param(position['date']), int(position['id'])) if position else None
+        except (ValueError, KeyError, TypeError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            opening, rows, has_more = ledger_page(account_number, start_date, end_date, after, page_size)
+            entries = [{
+                'id': row['id'],
+                'date': row['date'].strftime('%Y-%m-%d'),
+                'account_type': row['account_type__name'],
+                'plate_number': row['truck__plate_number'],
+                'description': row['description'],
+                'reference_number': row['reference_number'],
+                'remarks': row['remarks'],
+                'debit': float(row['debit']),
+                'credit': float(row['credit']),
+                'final_total': float(row['final_total']),
+                'balance': float(row['balance']),
+            } for row in rows]
+
+            next_cursor = None
+            if has_more:
+                next_cursor = encode_cursor({
+                    'date': rows[-1]['date'].strftime('%Y-%m-%d'),
+                    'id': rows[-1]['id'],
+                })
+            response = Response({
+                'account_number': account_number,
+                'opening_balance': float(opening),
+                'closing_balance': float(rows[-1]['balance']) if rows else float(opening),
+                'entries': entries,
+                'next_cursor': next_cursor,
+            }, status=status.HTTP_200_OK)
+            if next_cursor:
+                response['X-Next-Cursor'] = next_cursor
+            return response
+
+        except Exception as e:
+            return Response(
+                {'error': f'Failed to retrieve account ledger: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
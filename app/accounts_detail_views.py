@@ -1,171 +1,253 @@
+import json
+
+from django.http import StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .models import TruckingAccount
-from django.db.models import Q
+from .archive import ledger_queryset
+from .report_cache import cached_report
+from .report_utils import (
+    apply_date_range,
+    decode_cursor,
+    encode_cursor,
+    parse_date_range,
+    parse_page_size,
+)
+
+# Account type mappings: response key -> AccountType name and display name
+ACCOUNT_MAPPINGS = {
+    'repair_maintenance': {
+        'account_type': 'Repairs and Maintenance Expense',
+        'name': 'Repair & Maintenance'
+    },
+    'insurance': {
+        'account_type': 'Insurance Expense',
+        'name': 'Insurance'
+    },
+    'fuel': {
+        'account_type': 'Fuel and Oil',
+        'name': 'Fuel & Oil'
+    },
+    'tax': {
+        'account_type': 'Tax Expense',
+        'name': 'Tax Account'
+    },
+    'allowance': {
+        'account_type': 'Driver\'s Allowance',
+        'name': 'Allowance Account'
+    },
+    'income': {
+        'account_type': 'Hauling Income',
+        'name': 'Income Account'
+    },
+    'salaries_wages': {
+        'account_type': 'Salaries and Wages',
+        'name': 'Salaries and Wages'
+    },
+    'taxes_permits_licenses': {
+        'account_type': 'Taxes, Permits and Licenses Expense',
+        'name': 'Taxes, Permits and Licenses'
+    }
+}
+
+
+def _float(value):
+    return float(value or 0)
+
+
+def _float_or_none(value):
+    return float(value) if value else None
+
+
+def _name_ref(id_value, name):
+    return {'id': id_value, 'name': name} if id_value else None
+
+
+# Entry field -> (columns to fetch, function building the value from those columns)
+ENTRY_FIELDS = {
+    'id': (['id'], lambda v: v),
+    'account_number': (['account_number'], lambda v: v or ''),
+    'truck_type': (['truck__truck_type__name'], lambda v: v or ''),
+    'company': (['truck__company'], lambda v: v or ''),
+    'account_type': (['account_type__name'], lambda v: v or ''),
+    'plate_number': (['truck__plate_number'], lambda v: v or ''),
+    'debit': (['debit'], _float),
+    'credit': (['credit'], _float),
+    'final_total': (['final_total'], _float),
+    'reference_number': (['reference_number'], lambda v: v or ''),
+    'date': (['date'], lambda v: v.strftime('%Y-%m-%d') if v else ''),
+    'description': (['description'], lambda v: v or ''),
+    'remarks': (['remarks'], lambda v: v or ''),
+    'driver': (['driver_id', 'driver__name'], _name_ref),
+    'route': (['route_id', 'route__name'], _name_ref),
+    'liters': (['quantity'], _float_or_none),
+    'price': (['price'], _float_or_none),
+    'front_load': (['front_load__name'], lambda v: v or ''),
+    'back_load': (['back_load__name'], lambda v: v or ''),
+    'quantity': (['quantity'], _float_or_none),
+}
+
+DETAIL_DEFAULT_PAGE_SIZE = 500
+DETAIL_MAX_PAGE_SIZE = 5000
+STREAM_CHUNK_SIZE = 2000
+
+
+def parse_fields(fields_param):
+    """Parse the fields= projection (comma separated). Defaults to all entry fields."""
+    if not fields_param:
+        return list(ENTRY_FIELDS)
+    fields = [field.strip() for field in fields_param.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in ENTRY_FIELDS]
+    if unknown:
+        raise ValueError(
+            f'Unknown fields: {", ".join(unknown)}. Valid fields: {", ".join(ENTRY_FIELDS)}'
+        )
+    return fields
+
+
+def resolve_account_type(value):
+    """Return (key, mapping) for an account_type param given as response key or AccountType name"""
+    if value in ACCOUNT_MAPPINGS:
+        return value, ACCOUNT_MAPPINGS[value]
+    for key, mapping in ACCOUNT_MAPPINGS.items():
+        if mapping['account_type'].lower() == value.lower():
+            return key, mapping
+    raise ValueError(f'Unknown account_type. Must be one of: {", ".join(ACCOUNT_MAPPINGS)}')
+
+
+class EntryRowBuilder:
+    """
+    Builds entry dicts from values_list() tuples.
+    Only the columns needed for the requested fields are fetched.
+    """
+
+    def __init__(self, fields, extra_columns=()):
+        self.fields = fields
+        self.columns = []
+        for column in list(extra_columns) + [c for field in fields for c in ENTRY_FIELDS[field][0]]:
+            if column not in self.columns:
+                self.columns.append(column)
+        index = {column: i for i, column in enumerate(self.columns)}
+        self.plan = [
+            (field, [index[c] for c in ENTRY_FIELDS[field][0]], ENTRY_FIELDS[field][1])
+            for field in fields
+        ]
+
+    def values_list(self, queryset):
+        return queryset.values_list(*self.columns)
+
+    def build(self, row):
+        return {field: build(*[row[i] for i in positions]) for field, positions, build in self.plan}
+
+
+def is_stream_request(request):
+    return request.query_params.get('stream') in ('1', 'true')
+
 
 class AccountsDetailView(APIView):
     """
     GET: Get detailed account entries from TruckingAccount model
+    Query params:
+    - start_date / end_date: Date range (YYYY-MM-DD or MM/DD/YYYY)
+    - fields: Comma separated projection of entry fields (default: all)
+    - account_type: Response key (e.g. 'fuel') or account type name. Returns one
+      paginated account type: {'account_type', 'name', 'entries', 'next_cursor'}
+    - page_size / cursor: Pagination for account_type requests (ordered by id)
+    - stream=1: Stream all matching entries as one JSON array with constant memory
+      (never cached)
+    Without account_type or stream, every entry of the range is returned grouped
+    under 'accounts'. That response is unbounded and deprecated (Deprecation header):
+    page through each account_type or use stream=1 instead.
     """
+    @cached_report('accounts_detail', bypass=is_stream_request)
     def get(self, request):
         try:
-            # Define account type mappings
-            account_mappings = {
-                'repair_maintenance': {
-                    'account_type': 'Repairs and Maintenance Expense',
-                    'name': 'Repair & Maintenance'
-                },
-                'insurance': {
-                    'account_type': 'Insurance Expense',
-                    'name': 'Insurance'
-                },
-                'fuel': {
-                    'account_type': 'Fuel and Oil',
-                    'name': 'Fuel & Oil'
-                },
-                'tax': {
-                    'account_type': 'Tax Expense',
-                    'name': 'Tax Account'
-                },
-                'allowance': {
-                    'account_type': 'Driver\'s Allowance',
-                    'name': 'Allowance Account'
-                },
-                'income': {
-                    'account_type': 'Hauling Income',
-                    'name': 'Income Account'
-                },
-                'salaries_wages': {
-                    'account_type': 'Salaries and Wages',
-                    'name': 'Salaries and Wages'
-                },
-                'taxes_permits_licenses': {
-                    'account_type': 'Taxes, Permits and Licenses Expense',
-                    'name': 'Taxes, Permits and Licenses'
-                }
-            }
-            
-            # Fetch ALL records in a single optimized query
-            # Using select_related to avoid N+1 queries - this fetches all related objects in one query
-            all_records = TruckingAccount.objects.select_related(
-                'driver', 'route', 'truck', 'truck__truck_type', 'account_type', 'front_load', 'back_load'
-            ).order_by('id')  # Consistent ordering for predictable results
-            
-            # Group records by account type in Python (faster than multiple DB queries)
+            try:
+                start_date, end_date = parse_date_range(request.query_params)
+                fields = parse_fields(request.query_params.get('fields'))
+                account_type = request.query_params.get('account_type')
+                mapping_key, mapping = resolve_account_type(account_type) if account_type else (None, None)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            queryset = apply_date_range(ledger_queryset(start_date, end_date), start_date, end_date)
+            if mapping:
+                queryset = queryset.filter(account_type__name=mapping['account_type'])
+            else:
+                queryset = queryset.filter(
+                    account_type__name__in=[m['account_type'] for m in ACCOUNT_MAPPINGS.values()]
+                )
+            queryset = queryset.order_by('id')  # Consistent ordering for predictable results
+
+            if is_stream_request(request):
+                return self.stream_entries(queryset, fields)
+            if mapping:
+                return self.paginated_entries(request, queryset, fields, mapping_key, mapping)
+
+            # Group rows by account type name while reading; only the needed columns are fetched
+            builder = EntryRowBuilder(fields, extra_columns=['account_type__name'])
             records_by_account_type = {}
-            for record in all_records:
-                account_type_name = None
-                if record.account_type:
-                    account_type_name = record.account_type.name if hasattr(record.account_type, 'name') else str(record.account_type)
-                
-                if account_type_name:
-                    if account_type_name not in records_by_account_type:
-                        records_by_account_type[account_type_name] = []
-                    records_by_account_type[account_type_name].append(record)
-            
+            for row in builder.values_list(queryset).iterator(chunk_size=STREAM_CHUNK_SIZE):
+                records_by_account_type.setdefault(row[0], []).append(builder.build(row))
+
             accounts_data = {}
-            
-            for key, mapping in account_mappings.items():
-                # Get records for this account type from the pre-grouped data
-                records = records_by_account_type.get(mapping['account_type'], [])
-                
-                # Convert to the format expected by frontend
-                entries = []
-                for record in records:
-                    # Handle driver - can be ForeignKey object or None
-                    driver_data = None
-                    if record.driver:
-                        if hasattr(record.driver, 'name'):
-                            # It's a Driver model instance
-                            driver_data = {
-                                'id': record.driver.id,
-                                'name': record.driver.name
-                            }
-                        else:
-                            # It's already a string
-                            driver_data = record.driver
-                    
-                    # Handle route - can be ForeignKey object or None
-                    route_data = None
-                    if record.route:
-                        if hasattr(record.route, 'name'):
-                            # It's a Route model instance
-                            route_data = {
-                                'id': record.route.id,
-                                'name': record.route.name
-                            }
-                        else:
-                            # It's already a string
-                            route_data = record.route
-                    
-                    # Handle truck - get plate_number, truck_type, and company from truck FK
-                    plate_number = ''
-                    truck_type = ''
-                    company = ''
-                    if record.truck:
-                        plate_number = record.truck.plate_number or ''
-                        truck_type = record.truck.truck_type.name if record.truck.truck_type else ''
-                        company = record.truck.company or ''
-                    
-                    # Handle account_type
-                    account_type_data = None
-                    if record.account_type:
-                        if hasattr(record.account_type, 'name'):
-                            account_type_data = record.account_type.name
-                        else:
-                            account_type_data = record.account_type
-                    
-                    # Handle front_load and back_load
-                    front_load_data = None
-                    if record.front_load:
-                        if hasattr(record.front_load, 'name'):
-                            front_load_data = record.front_load.name
-                        else:
-                            front_load_data = record.front_load
-                    
-                    back_load_data = None
-                    if record.back_load:
-                        if hasattr(record.back_load, 'name'):
-                            back_load_data = record.back_load.name
-                        else:
-                            back_load_data = record.back_load
-                    
-                    entry = {
-                        'id': record.id,
-                        'account_number': record.account_number or '',
-                        'truck_type': truck_type,
-                        'company': company,
-                        'account_type': account_type_data or '',
-                        'plate_number': plate_number,
-                        'debit': float(record.debit or 0),
-                        'credit': float(record.credit or 0),
-                        'final_total': float(record.final_total or 0),
-                        'reference_number': record.reference_number or '',
-                        'date': record.date.strftime('%Y-%m-%d') if record.date else '',
-                        'description': record.description or '',
-                        'remarks': record.remarks or '',
-                        'driver': driver_data,
-                        'route': route_data,
-                        'liters': float(record.quantity or 0) if record.quantity else None,
-                        'price': float(record.price or 0) if record.price else None,
-                        'front_load': front_load_data or '',
-                        'back_load': back_load_data or '',
-                        'quantity': float(record.quantity or 0) if record.quantity else None
-                    }
-                    entries.append(entry)
-                
+            for key, mapping in ACCOUNT_MAPPINGS.items():
                 accounts_data[key] = {
                     'name': mapping['name'],
-                    'entries': entries
+                    'entries': records_by_account_type.get(mapping['account_type'], [])
                 }
-            
-            return Response({
+
+            response = Response({
                 'accounts': accounts_data
             }, status=status.HTTP_200_OK)
-            
+            response['Deprecation'] = 'true'
+            return response
+
         except Exception as e:
             return Response(
                 {'error': f'Failed to fetch accounts detail data: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+    def paginated_entries(self, request, queryset, fields, mapping_key, mapping):
+        try:
+            page_size = parse_page_size(request.query_params, DETAIL_DEFAULT_PAGE_SIZE, DETAIL_MAX_PAGE_SIZE)
+            position = decode_cursor(request.query_params.get('cursor'))
+            after_id = int(position['id']) if position else None
+        except (ValueError, KeyError, TypeError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if after_id is not None:
+            queryset = queryset.filter(id__gt=after_id)
+
+        builder = EntryRowBuilder(fields, extra_columns=['id'])
+        rows = list(builder.values_list(queryset)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        return Response({
+            'account_type': mapping_key,
+            'name': mapping['name'],
+            'entries': [builder.build(row) for row in rows],
+            'next_cursor': encode_cursor({'id': rows[-1][0]}) if has_more else None,
+        }, status=status.HTTP_200_OK)
+
+    def stream_entries(self, queryset, fields):
+        builder = EntryRowBuilder(fields)
+        rows = builder.values_list(queryset).iterator(chunk_size=STREAM_CHUNK_SIZE)
+
+        def generate():
+            yield '['
+            separator = ''
+            chunk = []
+            for row in rows:
+                chunk.append(json.dumps(builder.build(row)))
+                if len(chunk) >= STREAM_CHUNK_SIZE:
+                    yield separator + ','.join(chunk)
+                    separator = ','
+                    chunk = []
+            if chunk:
+                yield separator + ','.join(chunk)
+            yield ']'
+
+        return StreamingHttpResponse(generate(), content_type='application/json')
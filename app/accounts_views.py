@@ -1,8 +1,10 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Sum, Count
-from .models import TruckingAccount
+from collections import defaultdict
+from .ledger_snapshot import cents_to_float, get_ledger_snapshot
+from .models import AccountType
+from .report_cache import cached_report
 
 
 class AccountsSummaryView(APIView):
@@ -10,26 +12,30 @@ class AccountsSummaryView(APIView):
     GET: Get summary of all account types with totals
     """
     
+    @cached_report('accounts_summary', stale_while_revalidate=True)
     def get(self, request):
         try:
             # Get all account types with their totals from TruckingAccount
             accounts_summary = {}
             
+            # Totals per account type id, aggregated in memory from the ledger snapshot
+            totals_by_type = get_ledger_snapshot().group_sum(
+                'account_type_id', ['debit', 'credit', 'final_total']
+            )
+            type_ids_by_name = defaultdict(list)
+            for type_id, type_name in AccountType.objects.values_list('id', 'name'):
+                type_ids_by_name[type_name].append(type_id)
+            
             # Helper function to get account summary for a given account type
             def get_account_summary(account_type, display_name, color):
-                records = TruckingAccount.objects.filter(account_type__name=account_type)
-                totals = records.aggregate(
-                    total_debit=Sum('debit'),
-                    total_credit=Sum('credit'),
-                    total_final=Sum('final_total'),
-                    count=Count('id')
-                )
+                type_ids = type_ids_by_name[account_type]
+                totals = [totals_by_type[type_id] for type_id in type_ids if type_id in totals_by_type]
                 return {
                     'name': display_name,
-                    'total_debit': float(totals['total_debit'] or 0),
-                    'total_credit': float(totals['total_credit'] or 0),
-                    'total_final': float(totals['total_final'] or 0),
-                    'count': totals['count'],
+                    'total_debit': cents_to_float(sum(t['debit'] for t in totals)),
+                    'total_credit': cents_to_float(sum(t['credit'] for t in totals)),
+                    'total_final': cents_to_float(sum(t['final_total'] for t in totals)),
+                    'count': sum(t['count'] for t in totals),
                     'color': color
                 }
             
@@ -94,26 +100,30 @@ class TruckingAccountSummaryView(APIView):
     GET: Get account summary data from TruckingAccount model
     """
     
+    @cached_report('trucking_accounts_summary', stale_while_revalidate=True)
     def get(self, request):
         try:
             # Get all account types with their totals from TruckingAccount
             accounts_summary = {}
             
+            # Totals per account type id, aggregated in memory from the ledger snapshot
+            totals_by_type = get_ledger_snapshot().group_sum(
+                'account_type_id', ['debit', 'credit', 'final_total']
+            )
+            type_ids_by_name = defaultdict(list)
+            for type_id, type_name in AccountType.objects.values_list('id', 'name'):
+                type_ids_by_name[type_name].append(type_id)
+            
             # Helper function to get account summary for a given account type
             def get_account_summary(account_type, display_name, color):
-                records = TruckingAccount.objects.filter(account_type__name=account_type)
-                totals = records.aggregate(
-                    total_debit=Sum('debit'),
-                    total_credit=Sum('credit'),
-                    total_final=Sum('final_total'),
-                    count=Count('id')
-                )
+                type_ids = type_ids_by_name[account_type]
+                totals = [totals_by_type[type_id] for type_id in type_ids if type_id in totals_by_type]
                 return {
                     'name': display_name,
-                    'total_debit': float(totals['total_debit'] or 0),
-                    'total_credit': float(totals['total_credit'] or 0),
-                    'total_final': float(totals['total_final'] or 0),
-                    'count': totals['count'],
+                    'total_debit': cents_to_float(sum(t['debit'] for t in totals)),
+                    'total_credit': cents_to_float(sum(t['credit'] for t in totals)),
+                    'total_final': cents_to_float(sum(t['final_total'] for t in totals)),
+                    'count': sum(t['count'] for t in totals),
                     'color': color
                 }
             
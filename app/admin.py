@@ -6,7 +6,8 @@ from .models import (
     TruckType, AccountType, PlateNumber, 
     RepairAndMaintenanceAccount, InsuranceAccount, FuelAccount, 
     TaxAccount, AllowanceAccount, IncomeAccount, TruckingAccount,
-    SalaryAccount, Truck, Driver, Route
+    SalaryAccount, Truck, Driver, Route, Trip, AccountBalanceCheckpoint,
+    ClosedPeriod, PeriodAggregate, ArchivedTruckingAccount, LedgerTombstone
 )
 
 User = get_user_model()
@@ -30,3 +31,9 @@ admin.site.register(SalaryAccount)
 admin.site.register(Truck)
 admin.site.register(Driver)
 admin.site.register(Route)
+admin.site.register(Trip)
+admin.site.register(AccountBalanceCheckpoint)
+admin.site.register(ClosedPeriod)
+admin.site.register(PeriodAggregate)
+admin.site.register(ArchivedTruckingAccount)
+admin.site.register(LedgerTombstone)
@@ -1,8 +1,10 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from django.db import transaction
 from django.db.models import Q
-from .models import TruckingAccount, AccountType
+from .models import TruckingAccount, AccountType, normalize_plate
+from .ledger_events import ledger_changed, schedule_cache_warmup
 from datetime import datetime
 
 
@@ -44,14 +46,6 @@ class AllowanceTransferView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Standardize plate numbers for matching
-            def standardize_plate(plate):
-                if not plate:
-                    return ''
-                return str(plate).replace(' ', '').replace('-', '').upper()
-            
-            standardized_source_plate = standardize_plate(source_plate_number)
-            
             # Get Driver's Allowance account type
             try:
                 driver_allowance_type = AccountType.objects.filter(name__icontains='Driver').filter(name__icontains='Allowance').first()
@@ -67,33 +61,23 @@ class AllowanceTransferView(APIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            # Get all trucking accounts with Driver's Allowance on source date
+            # Driver's Allowance accounts of the source truck on the source date (indexed plate match)
             source_records = TruckingAccount.objects.filter(
                 account_type=driver_allowance_type,
-                date=source_date_obj
+                date=source_date_obj,
+                truck__plate_normalized=normalize_plate(source_plate_number),
             ).select_related('truck', 'account_type')
-            
-            # Filter by plate number in Python since we need to standardize
+            # If entry_ids provided, only include those IDs
+            if entry_ids:
+                source_records = source_records.filter(id__in=entry_ids)
+
             matching_records = []
             locked_records = []
             for record in source_records:
-                record_plate = None
-                if record.truck and record.truck.plate_number:
-                    record_plate = record.truck.plate_number
-                
-                if record_plate and standardize_plate(record_plate) == standardized_source_plate:
-                    # If entry_ids provided, only include those IDs
-                    if entry_ids:
-                        if record.id in entry_ids:
-                            if record.is_locked:
-                                locked_records.append(record.id)
-                            else:
-                                matching_records.append(record)
-                    else:
-                        if record.is_locked:
-                            locked_records.append(record.id)
-                        else:
-                            matching_records.append(record)
+                if record.is_locked:
+                    locked_records.append(record.id)
+                else:
+                    matching_records.append(record)
             
             if locked_records:
                 return Response(
@@ -113,11 +97,17 @@ class AllowanceTransferView(APIView):
             # Update dates
             updated_count = 0
             updated_ids = []
-            for record in matching_records:
-                record.date = target_date_obj
-                record.save()
-                updated_count += 1
-                updated_ids.append(record.id)
+            trip_keys = set()
+            with transaction.atomic():
+                for record in matching_records:
+                    trip_keys.add((record.truck_id, record.date))
+                    record.date = target_date_obj
+                    record.save()
+                    trip_keys.add((record.truck_id, record.date))
+                    updated_count += 1
+                    updated_ids.append(record.id)
+                ledger_changed(trip_keys)
+                schedule_cache_warmup()
             
             return Response({
                 'success': True,
@@ -0,0 +1,79 @@
+"""
+Ledger archive: moves the rows of closed periods out of the hot TruckingAccount
+table into ArchivedTruckingAccount, keeping their ids.
+
+Only closed periods are archived, so their rows are locked and their totals
+already live in PeriodAggregate; the Trip rollup is left untouched. Reads that
+need history go through LedgerEntry, a UNION ALL view over both tables, so
+reports and detail endpoints see archived rows transparently while writes,
+lists of recent rows and their indexes only deal with the hot table.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedTruckingAccount, ClosedPeriod, LedgerEntry, TruckingAccount
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_CHUNK_SIZE = 2000
+ARCHIVE_FIELDS = [field.attname for field in ArchivedTruckingAccount._meta.concrete_fields]
+
+
+def reaches_archive(start_date=None, end_date=None):
+    """Whether a date range may include archived rows"""
+    archived = ClosedPeriod.objects.filter(archived_at__isnull=False)
+    if start_date:
+        archived = archived.filter(end_date__gte=start_date)
+    if end_date:
+        archived = archived.filter(start_date__lte=end_date)
+    return archived.exists()
+
+
+def ledger_queryset(start_date=None, end_date=None):
+    """
+    Rows of the whole ledger for a date range: the hot table alone when the range
+    does not reach archived periods, the LedgerEntry view otherwise.
+    The date range itself is not applied.
+    """
+    if reaches_archive(start_date, end_date):
+        return LedgerEntry.objects.all()
+    return TruckingAccount.objects.all()
+
+
+def archive_period(period):
+    """Move the rows linked to a closed period into the archive. Returns the number moved."""
+    if period.is_stale:
+        raise ValueError(f'Period {period} has stale aggregates; rebuild them before archiving')
+    moved = 0
+    with transaction.atomic():
+        rows = TruckingAccount.objects.filter(closed_period=period).order_by('id')
+        ids = list(rows.values_list('id', flat=True))
+        for start in range(0, len(ids), ARCHIVE_CHUNK_SIZE):
+            chunk = ids[start:start + ARCHIVE_CHUNK_SIZE]
+            ArchivedTruckingAccount.objects.bulk_create([
+                ArchivedTruckingAccount(**values)
+                for values in TruckingAccount.objects.filter(id__in=chunk).values(*ARCHIVE_FIELDS)
+            ])
+            TruckingAccount.objects.filter(id__in=chunk).delete()
+            moved += len(chunk)
+        period.archived_at = timezone.now()
+        period.save(update_fields=['archived_at'])
+    logger.info(f'Archived {moved} rows of closed period {period}')
+    return moved
+
+
+def archive_closed_periods(before=None):
+    """
+    Archive every closed, non-stale period ending before `before`
+    (default: LEDGER_ARCHIVE_AFTER_DAYS ago). Returns {period id: rows moved}.
+    """
+    if before is None:
+        before = timezone.localdate() - timedelta(days=getattr(settings, 'LEDGER_ARCHIVE_AFTER_DAYS', 365))
+    periods = ClosedPeriod.objects.filter(
+        end_date__lt=before, is_stale=False, archived_at__isnull=True
+    ).order_by('start_date')
+    return {period.id: archive_period(period) for period in periods}
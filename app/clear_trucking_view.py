@@ -2,7 +2,9 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.db import transaction
-from .models import TruckingAccount
+from .ledger_events import ledger_changed, schedule_cache_warmup
+from .archive import ledger_queryset
+from .models import ArchivedTruckingAccount, Trip, TruckingAccount
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,7 +17,7 @@ class ClearTruckingDataView(APIView):
     def delete(self, request):
         try:
             # Get count before deletion
-            count = TruckingAccount.objects.count()
+            count = ledger_queryset().count()
             
             if count == 0:
                 return Response({
@@ -26,6 +28,11 @@ class ClearTruckingDataView(APIView):
             # Use transaction to ensure atomicity
             with transaction.atomic():
                 deleted_count, deleted_dict = TruckingAccount.objects.all().delete()
+                archived_count, _ = ArchivedTruckingAccount.objects.all().delete()
+                deleted_count += archived_count
+                Trip.objects.all().delete()
+                ledger_changed(history_changed=True)
+                schedule_cache_warmup()
                 
             logger.info(f'Successfully deleted {deleted_count} trucking account records')
             
@@ -4,7 +4,8 @@ from rest_framework import status
 from django.db.models import Q, Sum, Count
 from collections import defaultdict
 from datetime import datetime
-from .models import TruckingAccount
+from .archive import ledger_queryset
+from .report_cache import cached_report
 from decimal import Decimal
 
 
@@ -15,6 +16,7 @@ class DriversSummaryView(APIView):
     - start_date: Filter by start date (YYYY-MM-DD or MM/DD/YYYY)
     - end_date: Filter by end date (YYYY-MM-DD or MM/DD/YYYY)
     """
+    @cached_report('drivers_summary', stale_while_revalidate=True)
     def get(self, request):
         try:
             # Get query parameters
@@ -22,7 +24,7 @@ class DriversSummaryView(APIView):
             end_date = request.query_params.get('end_date')
             
             # Base queryset with related objects
-            queryset = TruckingAccount.objects.select_related('truck', 'driver', 'route').all()
+            queryset = ledger_queryset().select_related('truck', 'driver', 'route').all()
             
             # Apply date filters if provided
             if start_date:
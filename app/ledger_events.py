@@ -0,0 +1,139 @@
+"""
+Single entry point for "the ledger changed" side effects.
+
+Every path that writes TruckingAccount rows (or the dimensions reports
+display) calls ledger_changed() so derived data stays consistent:
+materialized trips are re-synced and cached reports are invalidated.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Q
+
+from .account_ledger import balance_rows_changed
+from .archive import ledger_queryset
+from .ledger_sync import record_full_refresh
+from .periods import mark_periods_stale
+from .report_cache import bump_frozen_epoch, bump_ledger_generation
+from .trips import sync_trips
+
+logger = logging.getLogger(__name__)
+
+
+def ledger_changed(trip_keys=(), rows_changed=True, history_changed=False, refetch_rows=False):
+    """
+    Call after writing ledger rows.
+    trip_keys: (truck_id, date) pairs whose Trip must be recomputed; truck_id may be
+    None for truck-less rows, whose dates still invalidate balance checkpoints.
+    rows_changed: False when no amounts, dates or dimensions changed (e.g. locking).
+    history_changed: True when locked rows may have changed (locking, clearing,
+    deleting a dimension they reference); drops the permanent locked-period caches.
+    refetch_rows: True when what rows display changed without their updated_at
+    moving (a renamed dimension); delta sync clients refetch the whole list.
+    The report cache generation is bumped once the transaction commits. The trip
+    keys are journaled with it so ledger snapshots reload only those rows; writes
+    without keys make snapshots reload fully and delta sync clients refetch the
+    list. Account balance checkpoints are dropped from the month of the earliest
+    changed date on. With history_changed (and rows_changed) the closed period
+    aggregates are rebuilt in Celery.
+    """
+    if trip_keys:
+        sync_trips(trip_keys)
+    if rows_changed and trip_keys:
+        balance_rows_changed([trip_date for _, trip_date in trip_keys])
+    elif rows_changed and history_changed:
+        balance_rows_changed()
+    if rows_changed and history_changed:
+        # Rows linked to closed periods may have changed
+        mark_periods_stale()
+        schedule_period_rebuild()
+    if not rows_changed:
+        changes = []
+    elif trip_keys:
+        changes = sorted({(truck_id, trip_date) for truck_id, trip_date in trip_keys if truck_id and trip_date})
+    else:
+        changes = None
+    if refetch_rows or changes is None:
+        record_full_refresh()
+    transaction.on_commit(lambda: bump_ledger_generation(changes))
+    if history_changed:
+        transaction.on_commit(bump_frozen_epoch)
+
+
+def reports_changed():
+    """
+    Call after a write that changes no ledger row but shows in reports (a new driver,
+    route, truck...): cached reports are invalidated once the transaction commits,
+    ledger snapshots and delta sync clients keep their rows.
+    """
+    transaction.on_commit(lambda: bump_ledger_generation([]))
+
+
+def schedule_period_rebuild():
+    """Rebuild stale closed period aggregates in Celery once the current transaction commits"""
+    def enqueue():
+        try:
+            from .tasks import rebuild_period_aggregates
+            rebuild_period_aggregates.delay()
+        except Exception as e:
+            logger.warning(f'Failed to schedule period aggregate rebuild: {e}')
+    transaction.on_commit(enqueue)
+
+
+def schedule_cache_warmup():
+    """Warm the standard dashboard reports in Celery once the current transaction commits"""
+    def enqueue():
+        try:
+            from .tasks import warm_report_cache
+            warm_report_cache.delay()
+        except Exception as e:
+            logger.warning(f'Failed to schedule report cache warm-up: {e}')
+    transaction.on_commit(enqueue)
+
+
+class LedgerWriteMixin:
+    """
+    Generic view mixin for the dimensions ledger rows reference. Creating one changes
+    no row and only invalidates cached reports; updating one is a ledger change only
+    when a field the rows display (ledger_display_fields) changed. Deleting one nulls
+    or cascades into the rows found through ledger_lookups, whose trips are re-synced.
+    With resync_trips_on_update the trips are re-synced on updates too (Trip totals
+    are split by account type name).
+    """
+    ledger_display_fields = ('name',)
+    ledger_lookups = ()
+    resync_trips_on_update = False
+
+    def ledger_trip_keys(self, instance):
+        """(truck_id, date) keys of the ledger rows (archived ones included) referencing the instance"""
+        condition = Q()
+        for lookup in self.ledger_lookups:
+            condition |= Q(**{lookup: instance})
+        if not condition:
+            return set()
+        return set(ledger_queryset().filter(condition).values_list('truck_id', 'date').distinct())
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        reports_changed()
+
+    def perform_update(self, serializer):
+        before = [getattr(serializer.instance, field) for field in self.ledger_display_fields]
+        trip_keys = self.ledger_trip_keys(serializer.instance) if self.resync_trips_on_update else ()
+        super().perform_update(serializer)
+        after = [getattr(serializer.instance, field) for field in self.ledger_display_fields]
+        if after == before:
+            reports_changed()
+        else:
+            # Reports of locked periods show the names too
+            ledger_changed(trip_keys, rows_changed=False, history_changed=True, refetch_rows=True)
+
+    def perform_destroy(self, instance):
+        # Collected first: the delete nulls the references or cascades away the rows
+        trip_keys = self.ledger_trip_keys(instance)
+        super().perform_destroy(instance)
+        if trip_keys:
+            # Locked rows are affected as well
+            ledger_changed(trip_keys, history_changed=True, refetch_rows=True)
+        else:
+            reports_changed()
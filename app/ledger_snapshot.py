@@ -0,0 +1,237 @@
+"""
+In-process columnar snapshot of TruckingAccount for analytics.
+
+Each worker keeps the numeric columns of the ledger as NumPy arrays so
+report endpoints can aggregate in memory instead of scanning the table per
+request. Foreign keys are stored as int64 ids (0 for NULL), dates as
+ordinals and amounts as int64 cents, so sums are exact.
+
+The snapshot is tagged with the ledger generation it was loaded at. When the
+generation moves on, the change journal written by bump_ledger_generation()
+tells which (truck_id, date) trips were touched; only those rows, rows above
+the id watermark and rows without a truck are reloaded. A missing journal
+entry falls back to a full reload.
+"""
+import logging
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from .archive import ledger_queryset
+from .report_cache import get_ledger_generation, ledger_changes_key
+
+logger = logging.getLogger(__name__)
+
+# Snapshot column -> TruckingAccount field
+ID_COLUMNS = {
+    'id': 'id',
+    'truck_id': 'truck_id',
+    'account_type_id': 'account_type_id',
+    'driver_id': 'driver_id',
+    'route_id': 'route_id',
+    'front_load_id': 'front_load_id',
+    'back_load_id': 'back_load_id',
+}
+CENTS_COLUMNS = {
+    'debit': 'debit',
+    'credit': 'credit',
+    'final_total': 'final_total',
+    'quantity': 'quantity',
+}
+SNAPSHOT_FIELDS = list(ID_COLUMNS.values()) + ['date'] + list(CENTS_COLUMNS.values())
+
+LOAD_CHUNK_SIZE = 5000
+# Keys are packed as truck_id * KEY_FACTOR + date ordinal for vectorized membership tests
+KEY_FACTOR = 10 ** 7
+
+# Beyond this many generations behind, a full reload is cheaper than replaying the journal
+MAX_JOURNAL_REPLAY = 200
+
+LEDGER_SNAPSHOT_MAX_BYTES = getattr(settings, 'LEDGER_SNAPSHOT_MAX_BYTES', 256 * 1024 * 1024)
+LEDGER_SNAPSHOT_MIN_AVAILABLE_BYTES = getattr(settings, 'LEDGER_SNAPSHOT_MIN_AVAILABLE_BYTES', 256 * 1024 * 1024)
+LEDGER_SNAPSHOT_IDLE_SECONDS = getattr(settings, 'LEDGER_SNAPSHOT_IDLE_SECONDS', 30 * 60)
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+def _cents(value):
+    return int(value * 100) if value is not None else 0
+
+
+def _rows_to_columns(rows):
+    """Convert values_list rows (SNAPSHOT_FIELDS order) to column arrays"""
+    n_ids = len(ID_COLUMNS)
+    columns = {}
+    for i, column in enumerate(ID_COLUMNS):
+        columns[column] = np.fromiter((row[i] or 0 for row in rows), dtype=np.int64, count=len(rows))
+    columns['date'] = np.fromiter((row[n_ids].toordinal() for row in rows), dtype=np.int32, count=len(rows))
+    for i, column in enumerate(CENTS_COLUMNS, start=n_ids + 1):
+        columns[column] = np.fromiter((_cents(row[i]) for row in rows), dtype=np.int64, count=len(rows))
+    return columns
+
+
+def _load_columns(queryset):
+    rows = list(queryset.order_by('id').values_list(*SNAPSHOT_FIELDS).iterator(chunk_size=LOAD_CHUNK_SIZE))
+    return _rows_to_columns(rows)
+
+
+def _available_memory():
+    """MemAvailable from /proc/meminfo in bytes, or None where it is not available"""
+    try:
+        with open('/proc/meminfo') as meminfo:
+            for line in meminfo:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class LedgerSnapshot:
+    """Immutable set of column arrays at one ledger generation"""
+
+    def __init__(self, columns, generation):
+        self.columns = columns
+        self.generation = generation
+        self.watermark = int(columns['id'].max()) if len(columns['id']) else 0
+        self.last_used = time.monotonic()
+
+    def __len__(self):
+        return len(self.columns['id'])
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self.columns.values())
+
+    def trip_keys(self):
+        return self.columns['truck_id'] * KEY_FACTOR + self.columns['date']
+
+    def mask(self, start_date=None, end_date=None, **in_filters):
+        """
+        Boolean row mask for an inclusive date range and column__in style filters,
+        e.g. mask(start, end, account_type_id=[1, 2])
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if start_date:
+            mask &= self.columns['date'] >= start_date.toordinal()
+        if end_date:
+            mask &= self.columns['date'] <= end_date.toordinal()
+        for column, values in in_filters.items():
+            mask &= np.isin(self.columns[column], list(values))
+        return mask
+
+    def group_sum(self, by, measures, mask=None):
+        """
+        Sum measure columns per distinct value of the `by` column.
+        Returns {value: {measure: cents, ..., 'count': rows}}.
+        """
+        keys = self.columns[by]
+        if mask is not None:
+            keys = keys[mask]
+        groups, inverse = np.unique(keys, return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(groups))
+        sums = {}
+        for measure in measures:
+            values = self.columns[measure] if mask is None else self.columns[measure][mask]
+            totals = np.zeros(len(groups), dtype=np.int64)
+            np.add.at(totals, inverse, values)
+            sums[measure] = totals
+        return {
+            int(group): dict({m: int(sums[m][i]) for m in measures}, count=int(counts[i]))
+            for i, group in enumerate(groups)
+        }
+
+    def refreshed(self, generation, changed_keys):
+        """Return a new snapshot with the rows of changed trips, new ids and truck-less rows reloaded"""
+        truck_ids = {truck_id for truck_id, _ in changed_keys}
+        dates = {trip_date for _, trip_date in changed_keys}
+        condition = Q(id__gt=self.watermark) | Q(truck__isnull=True)
+        if changed_keys:
+            condition |= Q(truck_id__in=truck_ids, date__in=dates)
+        fresh = _load_columns(ledger_queryset().filter(condition))
+
+        # Drop rows that were reloaded, belong to a changed trip (possibly deleted) or have no truck
+        packed = np.array(
+            [truck_id * KEY_FACTOR + trip_date.toordinal() for truck_id, trip_date in changed_keys],
+            dtype=np.int64,
+        )
+        stale = np.isin(self.columns['id'], fresh['id']) | (self.columns['truck_id'] == 0)
+        if len(packed):
+            stale |= np.isin(self.trip_keys(), packed)
+        keep = ~stale
+
+        columns = {column: np.concatenate([array[keep], fresh[column]]) for column, array in self.columns.items()}
+        order = np.argsort(columns['id'], kind='stable')
+        return LedgerSnapshot({column: array[order] for column, array in columns.items()}, generation)
+
+
+def _pending_changes(since, generation):
+    """Union of journaled trip keys for generations after `since`, or None if any are unknown"""
+    if generation < since or generation - since > MAX_JOURNAL_REPLAY:
+        return None
+    entries = cache.get_many([ledger_changes_key(g) for g in range(since + 1, generation + 1)])
+    keys = set()
+    for g in range(since + 1, generation + 1):
+        changes = entries.get(ledger_changes_key(g))
+        if changes is None:
+            return None
+        keys.update(tuple(key) for key in changes)
+    return keys
+
+
+def _under_memory_pressure(snapshot):
+    if snapshot.nbytes > LEDGER_SNAPSHOT_MAX_BYTES:
+        return True
+    available = _available_memory()
+    return available is not None and available < LEDGER_SNAPSHOT_MIN_AVAILABLE_BYTES
+
+
+def evict_ledger_snapshot():
+    """Drop this process' snapshot; the next get_ledger_snapshot() reloads it"""
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+def get_ledger_snapshot():
+    """
+    Return the snapshot for the current ledger generation, loading or refreshing it
+    as needed. Under memory pressure the snapshot is returned but not retained.
+    """
+    global _snapshot
+    with _lock:
+        generation = get_ledger_generation()
+        snapshot = _snapshot
+        if snapshot is not None and time.monotonic() - snapshot.last_used > LEDGER_SNAPSHOT_IDLE_SECONDS:
+            snapshot = None  # Idle for long: reload rather than replaying a long journal
+
+        if snapshot is not None and snapshot.generation != generation:
+            changed_keys = _pending_changes(snapshot.generation, generation)
+            if changed_keys is None:
+                snapshot = None
+            else:
+                snapshot = snapshot.refreshed(generation, changed_keys)
+
+        if snapshot is None:
+            snapshot = LedgerSnapshot(_load_columns(ledger_queryset()), generation)
+
+        snapshot.last_used = time.monotonic()
+        if _under_memory_pressure(snapshot):
+            logger.warning(f'Ledger snapshot not retained ({snapshot.nbytes} bytes) due to memory pressure')
+            _snapshot = None
+        else:
+            _snapshot = snapshot
+        return snapshot
+
+
+def cents_to_float(cents):
+    """Convert int cents to a float amount (correctly rounded, same as float(Decimal))"""
+    return cents / 100
@@ -0,0 +1,101 @@
+"""
+Delta sync of TruckingAccount rows.
+
+Clients keep a copy of the ledger list and, instead of refetching it after an
+edit, ask for the changes since an opaque cursor: the rows whose `updated_at`
+moved past it and the ids deleted since (LedgerTombstone). The cursor holds the
+server time of the previous sync; rows are read from a little before it
+(SYNC_OVERLAP) because `updated_at` is set before the writing transaction
+commits, so a row may carry a time older than a cursor handed out meanwhile.
+Clients apply changed rows as upserts by id, which makes the overlap harmless.
+
+Writes that may touch any row (clearing the ledger, editing a dimension the
+rows display) leave a full-refresh marker instead of one tombstone per row;
+a sync across a marker, with a cursor older than the tombstone retention or
+with more than MAX_SYNC_CHANGES changed rows answers full_refresh_required and
+the client reloads the list.
+
+Archived rows are locked and only change when the ledger is cleared, so only
+the hot table is read.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import LedgerTombstone, TruckingAccount
+from .report_utils import decode_cursor, encode_cursor
+from .trucking_rows import flat_columns, flat_rows
+
+SYNC_OVERLAP = timedelta(seconds=30)
+MAX_SYNC_CHANGES = 5000
+
+
+def tombstone_retention():
+    return timedelta(days=getattr(settings, 'LEDGER_TOMBSTONE_RETENTION_DAYS', 30))
+
+
+def prune_tombstones():
+    """Drop tombstones older than the retention; cursors that old get a full refresh anyway"""
+    LedgerTombstone.objects.filter(deleted_at__lt=timezone.now() - tombstone_retention()).delete()
+
+
+def record_deletions(account_ids):
+    """Log deleted TruckingAccount ids for delta sync"""
+    LedgerTombstone.objects.bulk_create([LedgerTombstone(account_id=account_id) for account_id in account_ids])
+    prune_tombstones()
+
+
+def record_full_refresh():
+    """Log a change that may touch any row: clients syncing across it reload the whole list"""
+    LedgerTombstone.objects.create(account_id=None)
+    prune_tombstones()
+
+
+def sync_cursor(moment):
+    return encode_cursor({'since': moment.isoformat()})
+
+
+def parse_sync_cursor(cursor):
+    """The time held by a sync cursor (None if empty). Raises ValueError if malformed."""
+    position = decode_cursor(cursor)
+    if position is None:
+        return None
+    try:
+        since = datetime.fromisoformat(position['since'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('Invalid cursor')
+    if timezone.is_naive(since):
+        raise ValueError('Invalid cursor')
+    return since
+
+
+def changes_since(since, fields):
+    """
+    Rows changed and ids deleted since a sync cursor's time, as
+    {'cursor', 'full_refresh_required', 'changed', 'deleted'}. `changed` holds flat
+    rows (see app.trucking_rows) with the requested fields, oldest change first.
+    With full_refresh_required both lists are empty and the client reloads the list,
+    then syncs from the returned cursor.
+    """
+    now = timezone.now()
+    result = {'cursor': sync_cursor(now), 'full_refresh_required': True, 'changed': [], 'deleted': []}
+    if since is None or since < now - tombstone_retention():
+        return result
+
+    window_start = since - SYNC_OVERLAP
+    tombstones = LedgerTombstone.objects.filter(deleted_at__gte=window_start)
+    if tombstones.filter(account_id__isnull=True).exists():
+        return result
+    rows = list(
+        TruckingAccount.objects.filter(updated_at__gte=window_start)
+        .order_by('updated_at', 'id')
+        .values(*flat_columns(fields))[:MAX_SYNC_CHANGES + 1]
+    )
+    if len(rows) > MAX_SYNC_CHANGES:
+        return result
+
+    result['full_refresh_required'] = False
+    result['changed'] = flat_rows(rows, fields)
+    result['deleted'] = sorted(set(tombstones.values_list('account_id', flat=True)))
+    return result
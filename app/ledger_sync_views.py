@@ -0,0 +1,30 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+
+from .ledger_sync import changes_since, parse_sync_cursor
+from .trucking_rows import parse_fields
+
+
+class TruckingAccountChangesView(APIView):
+    """
+    GET: Trucking account rows created, updated or deleted since a sync cursor
+    Query params:
+      - since: cursor returned by the previous call; omit it to get a starting cursor
+      - fields: comma-separated flat fields of the changed rows (default: all, as in ?flat=1 lists)
+    Response:
+    {
+        "cursor": "...",                  // pass as `since` on the next call
+        "full_refresh_required": false,   // true: reload the list, then sync from `cursor`
+        "changed": [{...}],               // flat rows, upserted by id
+        "deleted": [12, 15]               // ids to drop
+    }
+    """
+
+    def get(self, request):
+        try:
+            since = parse_sync_cursor(request.query_params.get('since'))
+            fields = parse_fields(request.query_params.get('fields'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(changes_since(since, fields), status=status.HTTP_200_OK)
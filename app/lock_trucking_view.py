@@ -4,6 +4,7 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .ledger_events import ledger_changed, schedule_cache_warmup
 from .models import TruckingAccount
 
 
@@ -31,7 +32,10 @@ class LockTruckingAccountsView(APIView):
                     queryset = queryset.filter(id__in=ids)
 
                 locked_at = timezone.now()
-                updated_count = queryset.update(is_locked=True, locked_at=locked_at)
+                updated_count = queryset.update(is_locked=True, locked_at=locked_at, updated_at=locked_at)
+                if updated_count:
+                    ledger_changed(rows_changed=False, history_changed=True)
+                    schedule_cache_warmup()
 
             return Response(
                 {
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.archive import archive_closed_periods
+
+
+class Command(BaseCommand):
+    help = 'Move the rows of closed periods into the ledger archive table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before',
+            help='Archive closed periods ending before this date (YYYY-MM-DD). '
+                 'Default: LEDGER_ARCHIVE_AFTER_DAYS ago.',
+        )
+
+    def handle(self, *args, **options):
+        before = None
+        if options['before']:
+            try:
+                before = datetime.strptime(options['before'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--before must be a date in YYYY-MM-DD format')
+        moved = archive_closed_periods(before)
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {sum(moved.values())} rows from {len(moved)} closed periods'
+        ))
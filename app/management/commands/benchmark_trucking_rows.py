@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app.models import TruckingAccount
+from app.query_plans import seed_rows
+from app.serializers import TruckingAccountSerializer
+from app.trucking_rows import FLAT_FIELDS, flat_columns, flat_rows
+
+
+class Command(BaseCommand):
+    help = 'Compare rows per second of TruckingAccountSerializer and the flat fast path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Rows per run (default 10000)')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per path; the best one is reported')
+        parser.add_argument(
+            '--seed',
+            action='store_true',
+            help='Insert synthetic rows when the ledger has fewer than --rows (rolled back afterwards)',
+        )
+
+    def _best(self, run, repeat):
+        """Best (query seconds, serialize seconds, row count) over the runs"""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = run['query']()
+            queried = time.perf_counter()
+            run['serialize'](rows)
+            timings.append((queried - start, time.perf_counter() - queried, len(rows)))
+        return min(timings, key=lambda timing: timing[0] + timing[1])
+
+    def handle(self, *args, **options):
+        row_count = options['rows']
+        base = TruckingAccount.objects.order_by('-date', '-id')
+        paths = {
+            'serializer': {
+                'query': lambda: list(base.select_related(
+                    'account_type', 'truck', 'truck__truck_type', 'driver', 'route', 'front_load', 'back_load'
+                )[:row_count]),
+                'serialize': lambda rows: TruckingAccountSerializer(rows, many=True).data,
+            },
+            'flat': {
+                'query': lambda: list(base.values(*flat_columns(FLAT_FIELDS))[:row_count]),
+                'serialize': lambda rows: flat_rows(rows, FLAT_FIELDS),
+            },
+        }
+
+        with transaction.atomic():
+            missing = row_count - TruckingAccount.objects.count()
+            if missing > 0 and options['seed']:
+                seed_rows(missing)
+            for name, run in paths.items():
+                query, serialize, rows = self._best(run, options['repeat'])
+                total = query + serialize
+                self.stdout.write(
+                    f'{name:>10}: {rows} rows, query {query * 1000:.1f} ms, '
+                    f'serialize {serialize * 1000:.1f} ms, {rows / total if total else 0:,.0f} rows/s'
+                )
+            transaction.set_rollback(True)
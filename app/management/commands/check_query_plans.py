@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.query_plans import PlanCheckFailed, check_query_plans
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot ledger queries and fail when one needs a full table scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Insert this many synthetic ledger rows before checking (rolled back afterwards)',
+        )
+        parser.add_argument('--show-plans', action='store_true', help='Print every plan, not only failing ones')
+
+    def handle(self, *args, **options):
+        try:
+            results = check_query_plans(seed=options['seed'])
+        except PlanCheckFailed as e:
+            raise CommandError(str(e))
+
+        failed = []
+        for name, passed, plan in results:
+            self.stdout.write(f"{'ok' if passed else 'FULL SCAN'}: {name}")
+            if not passed:
+                failed.append(name)
+            if options['show_plans'] or not passed:
+                self.stdout.write(plan)
+        if failed:
+            raise CommandError(f"{len(failed)} hot queries scan a whole table: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS(f'All {len(results)} hot queries use an index'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from app.partitions import is_partitioned, maintain_partitions
+
+
+class Command(BaseCommand):
+    help = 'Create the monthly partitions of the trucking ledger and empty its default partition'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            help='Number of future months to create partitions for. Default: LEDGER_PARTITION_MONTHS_AHEAD.',
+        )
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            self.stdout.write('The trucking ledger is not partitioned in this database; nothing to do')
+            return
+        created = maintain_partitions(options['months_ahead'])
+        for name in created:
+            self.stdout.write(f'Created {name}')
+        self.stdout.write(self.style.SUCCESS(f'Created {len(created)} ledger partitions'))
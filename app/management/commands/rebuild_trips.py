@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app.trips import rebuild_trips
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the materialized Trip table from TruckingAccount rows'
+
+    def handle(self, *args, **options):
+        trip_count = rebuild_trips()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {trip_count} trips'))
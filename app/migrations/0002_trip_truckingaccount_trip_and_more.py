@@ -0,0 +1,178 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:56
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+# Same grouping and income allocation as app.trips at the time of this migration
+BUILD_CHUNK_SIZE = 500
+HAULING_INCOME = 'Hauling Income'
+FUEL_AND_OIL = 'Fuel and Oil'
+TRIP_CATEGORY_FIELDS = {
+    'allowance_total': "Driver's Allowance",
+    'insurance_total': 'Insurance Expense',
+    'repairs_total': 'Repairs and Maintenance Expense',
+    'taxes_permits_total': 'Taxes, Permits and Licenses Expense',
+    'tax_total': 'Tax Expense',
+    'salaries_total': 'Salaries and Wages',
+}
+TRIP_DIMENSION_FIELDS = ['driver_id', 'route_id', 'front_load_id', 'back_load_id']
+
+
+def trip_groups(rows):
+    income = Q(account_type__name=HAULING_INCOME)
+    fuel = Q(account_type__name=FUEL_AND_OIL)
+    return rows.values('date', 'truck_id').annotate(
+        income_total=Sum('final_total', filter=income),
+        fuel_total=Sum('final_total', filter=fuel),
+        fuel_liters=Sum('quantity', filter=fuel),
+        fuel_price=Max('price', filter=fuel),
+        entry_count=Count('id'),
+        **{
+            field: Sum('final_total', filter=Q(account_type__name=name))
+            for field, name in TRIP_CATEGORY_FIELDS.items()
+        },
+        # Prefer the values recorded on income rows, fall back to any row of the trip
+        **{
+            f'trip_{field}': Coalesce(Max(field, filter=income), Max(field))
+            for field in TRIP_DIMENSION_FIELDS
+        },
+    )
+
+
+def allocate_income(income_rows):
+    result = {
+        'account_number': '',
+        'reference_number': '',
+        'remarks': '',
+        'front_load_amount': Decimal('0.00'),
+        'back_load_amount': Decimal('0.00'),
+        'front_load_reference_number': '',
+        'back_load_reference_number': '',
+    }
+    by_reference = defaultdict(list)
+    for row in income_rows:
+        by_reference[row['reference_number'] or ''].append(row)
+
+    for ref_num, rows in by_reference.items():
+        for i, row in enumerate(rows):
+            amount = row['final_total'] or Decimal('0.00')
+            result['account_number'] = row['account_number'] or ''
+            result['remarks'] = row['remarks'] or ''
+            if len(rows) == 1:
+                result['reference_number'] = ref_num
+                if row['front_load_id'] and row['back_load_id']:
+                    result['front_load_amount'] += amount / 2
+                    result['back_load_amount'] += amount / 2
+                    result['front_load_reference_number'] = ref_num
+                    result['back_load_reference_number'] = ref_num
+                elif row['back_load_id']:
+                    result['back_load_amount'] += amount
+                    result['back_load_reference_number'] = ref_num
+                elif row['front_load_id']:
+                    result['front_load_amount'] += amount
+                    result['front_load_reference_number'] = ref_num
+            elif i == 0:
+                result['front_load_amount'] += amount
+                result['front_load_reference_number'] = ref_num
+            else:
+                result['back_load_amount'] += amount
+                result['back_load_reference_number'] = ref_num
+    return result
+
+
+def build_trips(apps, schema_editor):
+    """Materialize the trips of the existing ledger rows and link the rows to them"""
+    Trip = apps.get_model('app', 'Trip')
+    TruckingAccount = apps.get_model('app', 'TruckingAccount')
+    rows = TruckingAccount.objects.filter(truck__isnull=False)
+    keys = sorted(set(rows.values_list('truck_id', 'date').distinct()))
+
+    for start in range(0, len(keys), BUILD_CHUNK_SIZE):
+        chunk = set(keys[start:start + BUILD_CHUNK_SIZE])
+        chunk_rows = rows.filter(
+            truck_id__in={truck_id for truck_id, _ in chunk},
+            date__in={trip_date for _, trip_date in chunk},
+        )
+        income_by_trip = defaultdict(list)
+        for row in chunk_rows.filter(account_type__name=HAULING_INCOME).values(
+            'truck_id', 'date', 'account_number', 'reference_number', 'remarks',
+            'final_total', 'front_load_id', 'back_load_id'
+        ).order_by('id'):
+            income_by_trip[(row['truck_id'], row['date'])].append(row)
+
+        trips = []
+        for group in trip_groups(chunk_rows).order_by('date', 'truck_id'):
+            key = (group.pop('truck_id'), group.pop('date'))
+            # The IN filters also match other truck/date combinations
+            if key not in chunk:
+                continue
+            values = {field: group.pop(f'trip_{field}') for field in TRIP_DIMENSION_FIELDS}
+            values.update({field: value or 0 for field, value in group.items()})
+            values.update(allocate_income(income_by_trip[key]))
+            trips.append(Trip(truck_id=key[0], date=key[1], **values))
+        Trip.objects.bulk_create(trips)
+
+    # Link every row to its trip; the Trip table was created empty by this migration
+    rows.update(trip_id=Subquery(
+        Trip.objects.filter(truck_id=OuterRef('truck_id'), date=OuterRef('date')).values('id')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trip',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('account_number', models.CharField(blank=True, default='', max_length=255)),
+                ('reference_number', models.CharField(blank=True, default='', max_length=255)),
+                ('front_load_reference_number', models.CharField(blank=True, default='', max_length=255)),
+                ('back_load_reference_number', models.CharField(blank=True, default='', max_length=255)),
+                ('remarks', models.TextField(blank=True, default='')),
+                ('income_total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('front_load_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('back_load_amount', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('fuel_total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('fuel_liters', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('fuel_price', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('allowance_total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('insurance_total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('repairs_total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('taxes_permits_total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('tax_total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('salaries_total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('back_load', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='back_trips', to='app.loadtype')),
+                ('driver', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='app.driver')),
+                ('front_load', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='front_trips', to='app.loadtype')),
+                ('route', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='app.route')),
+                ('truck', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trips', to='app.truck')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='truckingaccount',
+            name='trip',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='accounts', to='app.trip'),
+        ),
+        migrations.AddIndex(
+            model_name='trip',
+            index=models.Index(fields=['date', 'truck'], name='app_trip_date_f36a20_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='trip',
+            constraint=models.UniqueConstraint(fields=('truck', 'date'), name='unique_trip_truck_date'),
+        ),
+        migrations.RunPython(build_trips, migrations.RunPython.noop),
+    ]
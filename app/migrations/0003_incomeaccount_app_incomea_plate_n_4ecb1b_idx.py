@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_trip_truckingaccount_trip_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='incomeaccount',
+            index=models.Index(fields=['plate_number', 'date'], name='app_incomea_plate_n_4ecb1b_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_incomeaccount_app_incomea_plate_n_4ecb1b_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountBalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account_number', models.CharField(max_length=255)),
+                ('month', models.DateField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=17)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='truckingaccount',
+            index=models.Index(fields=['account_number', 'date', 'id'], name='app_truckin_account_769c25_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accountbalancecheckpoint',
+            index=models.Index(fields=['month'], name='app_account_month_d7ac62_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='accountbalancecheckpoint',
+            constraint=models.UniqueConstraint(fields=('account_number', 'month'), name='unique_balance_checkpoint'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_account_balance_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClosedPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('is_stale', models.BooleanField(default=False)),
+                ('closed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['start_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PeriodAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20)),
+                ('key', models.CharField(blank=True, default='', max_length=255)),
+                ('debit', models.DecimalField(decimal_places=2, default=0, max_digits=17)),
+                ('credit', models.DecimalField(decimal_places=2, default=0, max_digits=17)),
+                ('final_total', models.DecimalField(decimal_places=2, default=0, max_digits=17)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aggregates', to='app.closedperiod')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='truckingaccount',
+            name='closed_period',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='accounts', to='app.closedperiod'),
+        ),
+        migrations.AddConstraint(
+            model_name='periodaggregate',
+            constraint=models.UniqueConstraint(fields=('period', 'dimension', 'key'), name='unique_period_aggregate'),
+        ),
+    ]
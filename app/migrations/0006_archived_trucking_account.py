@@ -0,0 +1,85 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+LEDGER_COLUMNS = (
+    'id, account_number, account_type_id, truck_id, description, debit, credit, final_total, '
+    'remarks, reference_number, date, quantity, price, driver_id, route_id, front_load_id, '
+    'back_load_id, created_at, is_locked, locked_at, trip_id, closed_period_id'
+)
+
+CREATE_LEDGER_VIEW = (
+    f'CREATE VIEW app_ledgerentry AS '
+    f'SELECT {LEDGER_COLUMNS} FROM app_truckingaccount '
+    f'UNION ALL SELECT {LEDGER_COLUMNS} FROM app_archivedtruckingaccount'
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_closed_period'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('account_number', models.CharField(max_length=255)),
+                ('description', models.TextField()),
+                ('debit', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('credit', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('final_total', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('remarks', models.TextField()),
+                ('reference_number', models.CharField(max_length=255, null=True)),
+                ('date', models.DateField()),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('is_locked', models.BooleanField()),
+                ('locked_at', models.DateTimeField(null=True)),
+            ],
+            options={
+                'db_table': 'app_ledgerentry',
+                'managed': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='closedperiod',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ArchivedTruckingAccount',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('account_number', models.CharField(max_length=255)),
+                ('description', models.TextField()),
+                ('debit', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('credit', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('final_total', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('remarks', models.TextField()),
+                ('reference_number', models.CharField(blank=True, max_length=255, null=True)),
+                ('date', models.DateField()),
+                ('quantity', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('is_locked', models.BooleanField(default=True)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('account_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app.accounttype')),
+                ('back_load', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app.loadtype')),
+                ('closed_period', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_accounts', to='app.closedperiod')),
+                ('driver', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app.driver')),
+                ('front_load', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app.loadtype')),
+                ('route', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app.route')),
+                ('trip', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app.trip')),
+                ('truck', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app.truck')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'truck'], name='app_archive_date_c4db3e_idx'), models.Index(fields=['account_number', 'date', 'id'], name='app_archive_account_5045b2_idx')],
+            },
+        ),
+        migrations.RunSQL(CREATE_LEDGER_VIEW, 'DROP VIEW IF EXISTS app_ledgerentry'),
+    ]
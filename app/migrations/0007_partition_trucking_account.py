@@ -0,0 +1,25 @@
+from django.db import migrations
+
+from app.partitions import partition_ledger_table, unpartition_ledger_table
+
+
+def partition(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        partition_ledger_table(cursor)
+
+
+def unpartition(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        unpartition_ledger_table(cursor)
+
+
+class Migration(migrations.Migration):
+    """Partition app_truckingaccount by month on PostgreSQL; other backends are left unchanged"""
+
+    dependencies = [
+        ('app', '0006_archived_trucking_account'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
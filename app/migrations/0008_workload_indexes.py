@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_partition_trucking_account'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='archivedtruckingaccount',
+            index=models.Index(fields=['account_type', 'date'], name='app_archive_account_494d70_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='truckingaccount',
+            index=models.Index(fields=['account_type', 'date'], name='app_truckin_account_126807_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='truckingaccount',
+            index=models.Index(fields=['truck', 'date'], name='app_truckin_truck_i_2f0bd6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='truckingaccount',
+            index=models.Index(fields=['date', 'id'], name='app_truckin_date_388274_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='truckingaccount',
+            index=models.Index(condition=models.Q(('is_locked', False)), fields=['date'], name='trucking_unlocked_date_idx'),
+        ),
+    ]
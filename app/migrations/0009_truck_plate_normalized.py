@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:02
+
+from django.db import migrations, models
+
+
+def normalize_plate(plate):
+    # Same rules as app.models.normalize_plate at the time of this migration
+    if not plate:
+        return ''
+    return str(plate).strip().upper().replace(' ', '').replace('-', '').replace('_', '')
+
+
+def fill_plate_normalized(apps, schema_editor):
+    Truck = apps.get_model('app', 'Truck')
+    trucks = list(Truck.objects.only('id', 'plate_number'))
+    for truck in trucks:
+        truck.plate_normalized = normalize_plate(truck.plate_number)
+    Truck.objects.bulk_update(trucks, ['plate_normalized'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_workload_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='truck',
+            name='plate_normalized',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_plate_normalized, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:41
+
+from django.db import migrations, models
+import django.utils.timezone
+
+OLD_LEDGER_COLUMNS = (
+    'id, account_number, account_type_id, truck_id, description, debit, credit, final_total, '
+    'remarks, reference_number, date, quantity, price, driver_id, route_id, front_load_id, '
+    'back_load_id, created_at, is_locked, locked_at, trip_id, closed_period_id'
+)
+LEDGER_COLUMNS = OLD_LEDGER_COLUMNS + ', updated_at'
+
+
+def ledger_view(columns):
+    return (
+        f'CREATE VIEW app_ledgerentry AS '
+        f'SELECT {columns} FROM app_truckingaccount '
+        f'UNION ALL SELECT {columns} FROM app_archivedtruckingaccount'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_truck_plate_normalized'),
+    ]
+
+    operations = [
+        migrations.RunSQL('DROP VIEW IF EXISTS app_ledgerentry', ledger_view(OLD_LEDGER_COLUMNS)),
+        migrations.AddField(
+            model_name='truckingaccount',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='archivedtruckingaccount',
+            name='updated_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='ledgerentry',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='LedgerTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account_id', models.BigIntegerField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.RunSQL(ledger_view(LEDGER_COLUMNS), 'DROP VIEW IF EXISTS app_ledgerentry'),
+    ]
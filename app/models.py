@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 
@@ -173,6 +174,11 @@ class IncomeAccount(models.Model):
     front_load = models.CharField(max_length=255)
     back_load = models.CharField(max_length=255)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['plate_number', 'date']),
+        ]
+
     def __str__(self):
         return self.account_number
 
@@ -186,11 +192,52 @@ class Route(models.Model):
     def __str__(self):
         return self.name
 
+def normalize_plate(plate):
+    """Plate number for matching: no surrounding whitespace, spaces, hyphens or underscores, uppercase"""
+    if not plate:
+        return ''
+    return str(plate).strip().upper().replace(' ', '').replace('-', '').replace('_', '')
+
+
+class TruckQuerySet(models.QuerySet):
+    """Keeps plate_normalized in sync on bulk writes, which bypass Truck.save()"""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for truck in objs:
+            truck.plate_normalized = normalize_plate(truck.plate_number)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        if 'plate_number' in fields:
+            for truck in objs:
+                truck.plate_normalized = normalize_plate(truck.plate_number)
+            fields = [*fields, 'plate_normalized']
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def update(self, **kwargs):
+        if isinstance(kwargs.get('plate_number'), str):
+            kwargs['plate_normalized'] = normalize_plate(kwargs['plate_number'])
+        return super().update(**kwargs)
+
+
 class Truck(models.Model):
     plate_number = models.CharField(max_length=255)
+    # normalize_plate(plate_number), so plate lookups are one indexed equality
+    plate_normalized = models.CharField(max_length=255, db_index=True, editable=False, default='')
     truck_type = models.ForeignKey(TruckType, on_delete=models.CASCADE, null=True, blank=True)
     company = models.CharField(max_length=255, null=True, blank=True)
 
+    objects = TruckQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        self.plate_normalized = normalize_plate(self.plate_number)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'plate_number' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'plate_normalized'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.plate_number
 
@@ -199,7 +246,51 @@ class LoadType(models.Model):
     def __str__(self):
         return self.name
 
+class Trip(models.Model):
+    """
+    One trip per (truck, date), materialized from its TruckingAccount rows.
+    Kept in sync by app.trips.sync_trips whenever ledger rows are written.
+    """
+    truck = models.ForeignKey(Truck, on_delete=models.CASCADE, related_name='trips')
+    date = models.DateField()
+    driver = models.ForeignKey(Driver, on_delete=models.SET_NULL, null=True, blank=True)
+    route = models.ForeignKey(Route, on_delete=models.SET_NULL, null=True, blank=True)
+    front_load = models.ForeignKey(LoadType, on_delete=models.SET_NULL, null=True, blank=True, related_name='front_trips')
+    back_load = models.ForeignKey(LoadType, on_delete=models.SET_NULL, null=True, blank=True, related_name='back_trips')
+    account_number = models.CharField(max_length=255, blank=True, default='')
+    reference_number = models.CharField(max_length=255, blank=True, default='')
+    front_load_reference_number = models.CharField(max_length=255, blank=True, default='')
+    back_load_reference_number = models.CharField(max_length=255, blank=True, default='')
+    remarks = models.TextField(blank=True, default='')
+    income_total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    front_load_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    back_load_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    fuel_total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    fuel_liters = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    fuel_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    allowance_total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    insurance_total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    repairs_total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    taxes_permits_total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    tax_total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    salaries_total = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    entry_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['truck', 'date'], name='unique_trip_truck_date'),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'truck']),
+        ]
+
+    def __str__(self):
+        return f"{self.truck} - {self.date}"
+
+
 class TruckingAccount(models.Model):
+    """Ledger row. On PostgreSQL the table is range-partitioned by month (see app.partitions)."""
     account_number = models.CharField(max_length=255)
     account_type = models.ForeignKey(AccountType, on_delete=models.CASCADE, null=True, blank=True)
     truck = models.ForeignKey(Truck, on_delete=models.SET_NULL, null=True, blank=True)
@@ -217,13 +308,183 @@ class TruckingAccount(models.Model):
     front_load = models.ForeignKey(LoadType, on_delete=models.SET_NULL, null=True, blank=True,related_name='front_trucking_accounts')
     back_load = models.ForeignKey(LoadType, on_delete=models.SET_NULL, null=True, blank=True, related_name='back_trucking_accounts')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bulk .update() calls set it explicitly; read by the delta sync endpoint (app.ledger_sync)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     is_locked = models.BooleanField(default=False)
     locked_at = models.DateTimeField(null=True, blank=True)
+    trip = models.ForeignKey(Trip, on_delete=models.SET_NULL, null=True, blank=True, related_name='accounts')
+    closed_period = models.ForeignKey('ClosedPeriod', on_delete=models.SET_NULL, null=True, blank=True, related_name='accounts')
+
+    class Meta:
+        # Derived from the hot queries; `python manage.py check_query_plans` fails when one scans the table
+        indexes = [
+            models.Index(fields=['account_number', 'date', 'id']),
+            models.Index(fields=['account_type', 'date']),
+            models.Index(fields=['truck', 'date']),
+            models.Index(fields=['date', 'id']),
+            models.Index(fields=['date'], condition=Q(is_locked=False), name='trucking_unlocked_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.account_number} - {self.description}"
 
 
+class ClosedPeriod(models.Model):
+    """
+    A closed accounting period: its rows are locked and linked to it, and their
+    totals per dimension are persisted in PeriodAggregate (see app.periods).
+    Archived periods have their rows moved to ArchivedTruckingAccount.
+    Stale periods are answered from the ledger until their aggregates are rebuilt.
+    """
+    start_date = models.DateField()
+    end_date = models.DateField()
+    entry_count = models.PositiveIntegerField(default=0)
+    is_stale = models.BooleanField(default=False)
+    closed_at = models.DateTimeField(auto_now_add=True)
+    archived_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['start_date']
+
+    def __str__(self):
+        return f"{self.start_date} - {self.end_date}"
+
+
+class PeriodAggregate(models.Model):
+    """Totals of one closed period for one value of a dimension ('' when the row has none)"""
+    period = models.ForeignKey(ClosedPeriod, on_delete=models.CASCADE, related_name='aggregates')
+    dimension = models.CharField(max_length=20)
+    key = models.CharField(max_length=255, blank=True, default='')
+    debit = models.DecimalField(max_digits=17, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=17, decimal_places=2, default=0)
+    final_total = models.DecimalField(max_digits=17, decimal_places=2, default=0)
+    entry_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'dimension', 'key'], name='unique_period_aggregate'),
+        ]
+
+    def __str__(self):
+        return f"{self.period} - {self.dimension}={self.key}"
+
+
+class ArchivedTruckingAccount(models.Model):
+    """
+    TruckingAccount rows of archived closed periods, moved out of the hot table
+    with their ids (see app.archive). Read together with TruckingAccount through
+    LedgerEntry.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    account_number = models.CharField(max_length=255)
+    account_type = models.ForeignKey(AccountType, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    truck = models.ForeignKey(Truck, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    description = models.TextField()
+    debit = models.DecimalField(max_digits=15, decimal_places=2)
+    credit = models.DecimalField(max_digits=15, decimal_places=2)
+    final_total = models.DecimalField(max_digits=15, decimal_places=2)
+    remarks = models.TextField()
+    reference_number = models.CharField(max_length=255, null=True, blank=True)
+    date = models.DateField()
+    quantity = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    driver = models.ForeignKey(Driver, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    route = models.ForeignKey(Route, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    front_load = models.ForeignKey(LoadType, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    back_load = models.ForeignKey(LoadType, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField(db_index=True)
+    is_locked = models.BooleanField(default=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    trip = models.ForeignKey(Trip, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    closed_period = models.ForeignKey(ClosedPeriod, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_accounts')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'truck']),
+            models.Index(fields=['account_number', 'date', 'id']),
+            models.Index(fields=['account_type', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.account_number} - {self.description}"
+
+
+class LedgerEntry(models.Model):
+    """
+    Read-only view over TruckingAccount UNION ALL ArchivedTruckingAccount (the whole
+    ledger). Reports and detail reads that may reach archived dates query this.
+    The view is created in migrations and must list the same columns as both tables.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    account_number = models.CharField(max_length=255)
+    account_type = models.ForeignKey(AccountType, on_delete=models.DO_NOTHING, null=True, related_name='+')
+    truck = models.ForeignKey(Truck, on_delete=models.DO_NOTHING, null=True, related_name='+')
+    description = models.TextField()
+    debit = models.DecimalField(max_digits=15, decimal_places=2)
+    credit = models.DecimalField(max_digits=15, decimal_places=2)
+    final_total = models.DecimalField(max_digits=15, decimal_places=2)
+    remarks = models.TextField()
+    reference_number = models.CharField(max_length=255, null=True)
+    date = models.DateField()
+    quantity = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    driver = models.ForeignKey(Driver, on_delete=models.DO_NOTHING, null=True, related_name='+')
+    route = models.ForeignKey(Route, on_delete=models.DO_NOTHING, null=True, related_name='+')
+    front_load = models.ForeignKey(LoadType, on_delete=models.DO_NOTHING, null=True, related_name='+')
+    back_load = models.ForeignKey(LoadType, on_delete=models.DO_NOTHING, null=True, related_name='+')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    is_locked = models.BooleanField()
+    locked_at = models.DateTimeField(null=True)
+    trip = models.ForeignKey(Trip, on_delete=models.DO_NOTHING, null=True, related_name='+')
+    closed_period = models.ForeignKey(ClosedPeriod, on_delete=models.DO_NOTHING, null=True, related_name='+')
+
+    class Meta:
+        managed = False
+        db_table = 'app_ledgerentry'
+
+    def __str__(self):
+        return f"{self.account_number} - {self.description}"
+
+
+class LedgerTombstone(models.Model):
+    """
+    A deleted TruckingAccount row, for delta sync (see app.ledger_sync). A tombstone
+    without account_id records a change that may touch any row (clearing the ledger,
+    editing a dimension): clients syncing across it refetch everything.
+    """
+    account_id = models.BigIntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.account_id or 'all'} - {self.deleted_at}"
+
+
+class AccountBalanceCheckpoint(models.Model):
+    """
+    Closing balance (sum of debit - credit) of one account_number through the end
+    of a month. Built lazily by app.account_ledger and deleted from the month of
+    any changed row onwards, so surviving checkpoints are always current.
+    """
+    account_number = models.CharField(max_length=255)
+    month = models.DateField()
+    balance = models.DecimalField(max_digits=17, decimal_places=2)
+    entry_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['account_number', 'month'], name='unique_balance_checkpoint'),
+        ]
+        indexes = [
+            models.Index(fields=['month']),
+        ]
+
+    def __str__(self):
+        return f"{self.account_number} - {self.month:%Y-%m}"
+
+
 class SalaryAccount(models.Model):
     account_number = models.CharField(max_length=255)
     truck_type = models.ForeignKey(TruckType, on_delete=models.CASCADE)
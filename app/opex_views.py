@@ -3,7 +3,8 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.db.models import Sum
 from collections import defaultdict
-from .models import TruckingAccount
+from .archive import ledger_queryset
+from .report_cache import cached_report
 
 
 class OPEXView(APIView):
@@ -11,14 +12,17 @@ class OPEXView(APIView):
     GET: Get OPEX breakdown by account types with percentages
     """
     
+    @cached_report('opex', stale_while_revalidate=True)
     def get(self, request):
         try:
             # Get OPEX amounts by account types
             opex_data = {}
+            # Whole ledger, including archived periods
+            ledger = ledger_queryset()
             
             # Helper function to get account breakdown for a given account type
             def get_account_breakdown(account_type):
-                records = TruckingAccount.objects.filter(account_type__name=account_type)
+                records = ledger.filter(account_type__name=account_type)
                 account_totals = defaultdict(float)
                 
                 for record in records:
@@ -0,0 +1,248 @@
+"""
+Monthly range partitioning of the TruckingAccount table on PostgreSQL.
+
+The table is declaratively partitioned by RANGE (date), one partition per
+month plus a DEFAULT partition that catches rows of months without one, so
+writes never fail. Report filters on `date` (apply_date_range, trip keys,
+period ranges) compare the column with constants, which lets the planner
+prune every partition outside the range; deleting or rebuilding a month only
+touches its partition.
+
+PostgreSQL needs the partition key in the primary key, so the table's key is
+(id, date); ids still come from one sequence and stay unique. Other backends
+(SQLite for local development) keep the plain table and every function here
+is a no-op on them.
+
+The table is converted by migration 0007. maintain_partitions() (management
+command `partition_ledger`, task `maintain_ledger_partitions`) creates the
+partitions of the coming months and moves rows that landed in the default
+partition into partitions of their own.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+LEDGER_TABLE = 'app_truckingaccount'
+LEDGER_VIEW = 'app_ledgerentry'
+DEFAULT_PARTITION = f'{LEDGER_TABLE}_default'
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def month_start(value):
+    return value.replace(day=1)
+
+
+def next_month(month):
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def month_range(start_date, end_date):
+    """First day of every month from start_date's through end_date's"""
+    month = month_start(start_date)
+    while month <= end_date:
+        yield month
+        month = next_month(month)
+
+
+def partition_name(month):
+    return f'{LEDGER_TABLE}_p{month:%Y_%m}'
+
+
+def supports_partitioning(using_connection=None):
+    return (using_connection or connection).vendor == 'postgresql'
+
+
+def is_partitioned(cursor=None):
+    """Whether the ledger table is a partitioned table in this database"""
+    if not supports_partitioning():
+        return False
+    if cursor is None:
+        with connection.cursor() as cursor:
+            return is_partitioned(cursor)
+    cursor.execute(
+        'SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [LEDGER_TABLE]
+    )
+    return cursor.fetchone() is not None
+
+
+def existing_partitions(cursor):
+    """Names of the partitions currently attached to the ledger table"""
+    cursor.execute(
+        'SELECT child.relname FROM pg_inherits '
+        'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+        'WHERE pg_inherits.inhparent = to_regclass(%s)',
+        [LEDGER_TABLE]
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _bounds(month):
+    return f"FROM ('{month:%Y-%m-%d}') TO ('{next_month(month):%Y-%m-%d}')"
+
+
+def _add_month_partition(cursor, month):
+    """
+    Create the partition of a month, moving its rows out of the default partition.
+    The partition is filled before it is attached, so the parent is never locked
+    for longer than the ATTACH check.
+    """
+    name = _quote(partition_name(month))
+    start, end = month, next_month(month)
+    cursor.execute(f'CREATE TABLE {name} (LIKE {_quote(LEDGER_TABLE)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM {_quote(DEFAULT_PARTITION)} WHERE date >= %s AND date < %s RETURNING *) '
+        f'INSERT INTO {name} SELECT * FROM moved',
+        [start, end]
+    )
+    cursor.execute(f'ALTER TABLE {_quote(LEDGER_TABLE)} ATTACH PARTITION {name} FOR VALUES {_bounds(month)}')
+
+
+def ensure_partitions(start_date, end_date):
+    """
+    Create the missing monthly partitions covering a date range.
+    Returns the names of the partitions created (none when the table is not partitioned).
+    """
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        if not is_partitioned(cursor):
+            return created
+        existing = existing_partitions(cursor)
+        for month in month_range(start_date, end_date):
+            if partition_name(month) not in existing:
+                _add_month_partition(cursor, month)
+                created.append(partition_name(month))
+    for name in created:
+        logger.info(f'Created ledger partition {name}')
+    return created
+
+
+def maintain_partitions(months_ahead=None):
+    """
+    Create the partitions of the current month and the next `months_ahead` months
+    (default: LEDGER_PARTITION_MONTHS_AHEAD), and partitions for every month that
+    has rows in the default partition. Returns the names of the partitions created.
+    """
+    if not is_partitioned():
+        return []
+    if months_ahead is None:
+        months_ahead = getattr(settings, 'LEDGER_PARTITION_MONTHS_AHEAD', 3)
+    months = set()
+    month = month_start(timezone.localdate())
+    for _ in range(months_ahead + 1):
+        months.add(month)
+        month = next_month(month)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT DISTINCT date_trunc('month', date)::date FROM {_quote(DEFAULT_PARTITION)}")
+        months.update(row[0] for row in cursor.fetchall())
+
+    created = []
+    for month in sorted(months):
+        created += ensure_partitions(month, month)
+    return created
+
+
+def _table_definitions(cursor, table):
+    """Secondary index and foreign key definitions of a table, to recreate them on its replacement"""
+    cursor.execute(
+        'SELECT pg_get_indexdef(indexrelid) FROM pg_index '
+        'WHERE indrelid = to_regclass(%s) AND NOT indisprimary',
+        [table]
+    )
+    indexes = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+        [table]
+    )
+    foreign_keys = cursor.fetchall()
+    return indexes, foreign_keys
+
+
+def _rebuild_ledger_table(cursor, partitioned):
+    """
+    Replace the ledger table with a partitioned (or plain) copy holding the same rows,
+    indexes, foreign keys and id sequence. The LedgerEntry view is recreated on top.
+    """
+    table = _quote(LEDGER_TABLE)
+    old_name = f'{LEDGER_TABLE}_old'
+    old = _quote(old_name)
+
+    indexes, foreign_keys = _table_definitions(cursor, LEDGER_TABLE)
+    cursor.execute('SELECT pg_get_viewdef(to_regclass(%s))', [LEDGER_VIEW])
+    view_definition = cursor.fetchone()[0]
+    cursor.execute(
+        "SELECT is_identity = 'YES' FROM information_schema.columns "
+        "WHERE table_name = %s AND column_name = 'id' AND table_schema = current_schema()",
+        [LEDGER_TABLE]
+    )
+    identity = cursor.fetchone()[0]
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [LEDGER_TABLE])
+    sequence = cursor.fetchone()[0]
+
+    if view_definition:
+        cursor.execute(f'DROP VIEW {_quote(LEDGER_VIEW)}')
+    cursor.execute(f'ALTER TABLE {table} RENAME TO {old}')
+    if sequence and not identity:
+        # A serial column's sequence is owned by the old table and must outlive it
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY NONE')
+
+    like = f'LIKE {old} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS'
+    if partitioned:
+        cursor.execute(f'CREATE TABLE {table} ({like}) PARTITION BY RANGE (date)')
+        primary_key = '(id, date)'
+        cursor.execute(f'SELECT MIN(date), MAX(date) FROM {old}')
+        first, last = cursor.fetchone()
+        today = timezone.localdate()
+        months_ahead = getattr(settings, 'LEDGER_PARTITION_MONTHS_AHEAD', 3)
+        last_month = today
+        for _ in range(months_ahead):
+            last_month = next_month(last_month)
+        for month in month_range(min(first or today, today), max(last or today, last_month)):
+            cursor.execute(
+                f'CREATE TABLE {_quote(partition_name(month))} PARTITION OF {table} FOR VALUES {_bounds(month)}'
+            )
+        cursor.execute(f'CREATE TABLE {_quote(DEFAULT_PARTITION)} PARTITION OF {table} DEFAULT')
+    else:
+        cursor.execute(f'CREATE TABLE {table} ({like})')
+        primary_key = '(id)'
+
+    cursor.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+    if identity:
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) "
+            f"FROM {table}",
+            [LEDGER_TABLE]
+        )
+    cursor.execute(f'DROP TABLE {old}')
+    # Added once the old table and its index names are gone
+    cursor.execute(f'ALTER TABLE {table} ADD PRIMARY KEY {primary_key}')
+    if sequence and not identity:
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {table}.id')
+
+    for definition in indexes:
+        # Definitions of indexes on a partitioned table read "ON ONLY <table>"
+        cursor.execute(definition.replace(' ON ONLY ', ' ON '))
+    for name, definition in foreign_keys:
+        cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {_quote(name)} {definition}')
+    if view_definition:
+        cursor.execute(f'CREATE VIEW {_quote(LEDGER_VIEW)} AS {view_definition}')
+
+
+def partition_ledger_table(cursor):
+    """Convert the plain ledger table into a partitioned one (PostgreSQL only, idempotent)"""
+    if supports_partitioning(cursor.db) and not is_partitioned(cursor):
+        _rebuild_ledger_table(cursor, partitioned=True)
+
+
+def unpartition_ledger_table(cursor):
+    """Convert the partitioned ledger table back into a plain one"""
+    if supports_partitioning(cursor.db) and is_partitioned(cursor):
+        _rebuild_ledger_table(cursor, partitioned=False)
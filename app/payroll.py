@@ -0,0 +1,182 @@
+"""
+Driver payroll and allowance reconciliation for a pay period.
+
+Each Driver's Allowance row is matched to the hauling trip of the same truck
+whose date is nearest to it, within a tolerance of a few days (allowances are
+often paid the day before or after the trip). Matching is a sorted merge on
+dates per truck (pandas.merge_asof) rather than a nested loop over trips.
+
+Allowances without a truck, or with no hauling trip within the tolerance, are
+reported as unmatched. Per-driver payroll totals combine the driver's trips,
+front/back load income and matched allowances. Amounts are handled as int64
+cents, so totals are exact.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .archive import ledger_queryset
+from .models import Driver, Trip
+from .report_utils import DRIVERS_ALLOWANCE
+
+DEFAULT_TOLERANCE_DAYS = 1
+MAX_TOLERANCE_DAYS = 31
+
+TRIP_COLUMNS = ['trip_id', 'truck_id', 'date', 'trip_driver_id', 'front_load_amount', 'back_load_amount', 'income_total']
+ALLOWANCE_COLUMNS = ['id', 'truck_id', 'date', 'driver_id', 'account_number', 'amount', 'truck__plate_number']
+
+
+def _cents(value):
+    return int(value * 100) if value is not None else 0
+
+
+def _to_amount(cents):
+    return int(cents) / 100
+
+
+def _load_trips(start_date, end_date):
+    """Hauling trips in the range as a DataFrame, dates as ordinals and amounts as cents"""
+    rows = Trip.objects.filter(
+        date__gte=start_date, date__lte=end_date
+    ).exclude(income_total=0).values_list(
+        'id', 'truck_id', 'date', 'driver_id', 'front_load_amount', 'back_load_amount', 'income_total'
+    )
+    frame = pd.DataFrame.from_records(list(rows), columns=TRIP_COLUMNS)
+    frame[['trip_id', 'truck_id']] = frame[['trip_id', 'truck_id']].astype(np.int64)
+    frame['date'] = frame['date'].map(date.toordinal).astype(np.int64)
+    frame['trip_driver_id'] = frame['trip_driver_id'].fillna(0).astype(np.int64)
+    for column in ('front_load_amount', 'back_load_amount', 'income_total'):
+        frame[column] = frame[column].map(_cents).astype(np.int64)
+    return frame
+
+
+def _load_allowances(start_date, end_date):
+    rows = ledger_queryset(start_date, end_date).filter(
+        account_type__name=DRIVERS_ALLOWANCE, date__gte=start_date, date__lte=end_date
+    ).values_list('id', 'truck_id', 'date', 'driver_id', 'account_number', 'final_total', 'truck__plate_number')
+    frame = pd.DataFrame.from_records(list(rows), columns=ALLOWANCE_COLUMNS)
+    frame['id'] = frame['id'].astype(np.int64)
+    frame['date'] = frame['date'].map(date.toordinal).astype(np.int64)
+    frame['truck_id'] = frame['truck_id'].fillna(0).astype(np.int64)
+    frame['driver_id'] = frame['driver_id'].fillna(0).astype(np.int64)
+    frame['amount'] = frame['amount'].map(_cents).astype(np.int64)
+    return frame
+
+
+def match_allowances(allowances, trips, tolerance_days):
+    """
+    Attach to each allowance the nearest trip of the same truck within tolerance_days.
+    Returns the allowances with trip_id (0 when unmatched), trip_date and trip_driver_id columns.
+    """
+    columns = ['trip_id', 'truck_id', 'date', 'trip_driver_id']
+    left = allowances.sort_values('date', kind='stable')
+    right = trips[columns].rename(columns={'date': 'trip_date'}).sort_values('trip_date', kind='stable')
+    right['date'] = right['trip_date']
+    matched = pd.merge_asof(
+        left, right, on='date', by='truck_id',
+        direction='nearest', tolerance=tolerance_days, allow_exact_matches=True,
+    )
+    matched['trip_id'] = matched['trip_id'].fillna(0).astype(np.int64)
+    matched['trip_date'] = matched['trip_date'].fillna(0).astype(np.int64)
+    matched['trip_driver_id'] = matched['trip_driver_id'].fillna(0).astype(np.int64)
+    return matched
+
+
+def reconcile_payroll(start_date, end_date, tolerance_days=DEFAULT_TOLERANCE_DAYS):
+    """
+    Reconcile one pay period. Allowances dated in the period may match trips up to
+    tolerance_days outside it; trip income counts only for trips inside the period.
+    """
+    margin = timedelta(days=tolerance_days)
+    trips = _load_trips(start_date - margin, end_date + margin)
+    allowances = _load_allowances(start_date, end_date)
+    matched = match_allowances(allowances, trips, tolerance_days)
+
+    # An allowance is paid to its own driver, or to the trip's driver when it has none
+    matched['payee_id'] = np.where(matched['driver_id'] != 0, matched['driver_id'], matched['trip_driver_id'])
+    is_matched = matched['trip_id'] != 0
+    driver_mismatch = is_matched & (matched['driver_id'] != 0) & (matched['trip_driver_id'] != 0) & (
+        matched['driver_id'] != matched['trip_driver_id']
+    )
+
+    period_trips = trips[(trips['date'] >= start_date.toordinal()) & (trips['date'] <= end_date.toordinal())]
+    trip_totals = period_trips.groupby('trip_driver_id').agg(
+        trip_count=('trip_id', 'size'),
+        total_front_load=('front_load_amount', 'sum'),
+        total_back_load=('back_load_amount', 'sum'),
+        total_income=('income_total', 'sum'),
+    )
+    allowance_totals = matched.assign(
+        matched_amount=np.where(is_matched, matched['amount'], 0),
+        unmatched_amount=np.where(is_matched, 0, matched['amount']),
+        unmatched_row=(~is_matched).astype(np.int64),
+    ).groupby('payee_id').agg(
+        allowance_count=('id', 'size'),
+        total_allowance=('matched_amount', 'sum'),
+        unmatched_allowance=('unmatched_amount', 'sum'),
+        unmatched_count=('unmatched_row', 'sum'),
+    )
+    totals = trip_totals.join(allowance_totals, how='outer').fillna(0).astype(np.int64)
+
+    driver_ids = set(totals.index) | set(matched['trip_driver_id'])
+    names = dict(Driver.objects.filter(id__in=[int(i) for i in driver_ids if i]).values_list('id', 'name'))
+    drivers = []
+    for driver_id, row in totals.iterrows():
+        drivers.append({
+            'driver_id': int(driver_id) or None,
+            'driver': names.get(int(driver_id), 'Unknown') if driver_id else 'Unassigned',
+            'trip_count': int(row['trip_count']),
+            'total_front_load': _to_amount(row['total_front_load']),
+            'total_back_load': _to_amount(row['total_back_load']),
+            'total_income': _to_amount(row['total_income']),
+            'allowance_count': int(row['allowance_count']),
+            'total_allowance': _to_amount(row['total_allowance']),
+            'unmatched_allowance': _to_amount(row['unmatched_allowance']),
+            'unmatched_count': int(row['unmatched_count']),
+        })
+    drivers.sort(key=lambda d: (-d['total_income'], d['driver']))
+
+    def allowance_entry(row, reason):
+        entry = {
+            'id': int(row['id']),
+            'date': date.fromordinal(int(row['date'])).strftime('%Y-%m-%d'),
+            'plate_number': row['truck__plate_number'],
+            'account_number': row['account_number'],
+            'driver': names.get(int(row['payee_id'])) if row['payee_id'] else None,
+            'amount': _to_amount(row['amount']),
+            'reason': reason,
+        }
+        if row['trip_id']:
+            entry['trip_id'] = int(row['trip_id'])
+            entry['trip_date'] = date.fromordinal(int(row['trip_date'])).strftime('%Y-%m-%d')
+            entry['trip_driver'] = names.get(int(row['trip_driver_id']))
+        return entry
+
+    unmatched = [
+        allowance_entry(row, 'no_truck' if not row['truck_id'] else 'no_trip_within_tolerance')
+        for _, row in matched[~is_matched].sort_values(['date', 'id']).iterrows()
+    ]
+    mismatched = [
+        allowance_entry(row, 'driver_mismatch')
+        for _, row in matched[driver_mismatch].sort_values(['date', 'id']).iterrows()
+    ]
+
+    return {
+        'start_date': start_date.strftime('%Y-%m-%d'),
+        'end_date': end_date.strftime('%Y-%m-%d'),
+        'tolerance_days': tolerance_days,
+        'drivers': drivers,
+        'unmatched_allowances': unmatched,
+        'driver_mismatches': mismatched,
+        'summary': {
+            'total_drivers': len([d for d in drivers if d['driver_id']]),
+            'total_trips': sum(d['trip_count'] for d in drivers),
+            'total_income': _to_amount(totals['total_income'].sum()) if len(totals) else 0.0,
+            'total_allowance': _to_amount(totals['total_allowance'].sum()) if len(totals) else 0.0,
+            'unmatched_allowance': _to_amount(totals['unmatched_allowance'].sum()) if len(totals) else 0.0,
+            'allowance_count': int(len(matched)),
+            'unmatched_count': len(unmatched),
+            'driver_mismatch_count': len(mismatched),
+        },
+    }
@@ -0,0 +1,70 @@
+import uuid
+
+from django.core.cache import cache
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from .payroll import DEFAULT_TOLERANCE_DAYS, MAX_TOLERANCE_DAYS
+from .report_utils import parse_date_range
+
+
+class PayrollReconciliationView(APIView):
+    """
+    POST: Start a driver payroll / allowance reconciliation for a pay period (Celery)
+    Request body:
+    {
+        "start_date": "2025-07-01",
+        "end_date": "2025-07-15",
+        "tolerance_days": 1  // Optional: allowance may be dated this many days from its trip
+    }
+    Returns a task_id; poll the result_url for the status and result.
+    """
+
+    def post(self, request):
+        try:
+            start_date, end_date = parse_date_range(request.data)
+            if not start_date or not end_date:
+                raise ValueError('Missing required fields: start_date, end_date')
+            tolerance_days = int(request.data.get('tolerance_days', DEFAULT_TOLERANCE_DAYS))
+            if not 0 <= tolerance_days <= MAX_TOLERANCE_DAYS:
+                raise ValueError(f'tolerance_days must be between 0 and {MAX_TOLERANCE_DAYS}')
+        except (TypeError, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            from .tasks import run_payroll_reconciliation
+
+            task_id = str(uuid.uuid4())
+            cache.set(f'payroll_reconciliation_{task_id}', {'status': 'queued', 'task_id': task_id}, timeout=3600)
+            run_payroll_reconciliation.delay(
+                task_id,
+                start_date.strftime('%Y-%m-%d'),
+                end_date.strftime('%Y-%m-%d'),
+                tolerance_days,
+            )
+            return Response({
+                'message': 'Payroll reconciliation started',
+                'task_id': task_id,
+                'result_url': f'/api/v1/payroll/reconciliation/{task_id}/',
+            }, status=status.HTTP_202_ACCEPTED)
+
+        except Exception as e:
+            return Response(
+                {'error': f'Failed to start payroll reconciliation: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class PayrollReconciliationResultView(APIView):
+    """
+    GET: Status and result of a payroll reconciliation by task_id
+    """
+
+    def get(self, request, task_id):
+        result = cache.get(f'payroll_reconciliation_{task_id}')
+        if not result:
+            return Response(
+                {'error': 'Payroll reconciliation not found. The task may have expired or never started.', 'task_id': task_id},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(result, status=status.HTTP_200_OK)
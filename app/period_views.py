@@ -0,0 +1,109 @@
+import calendar
+from datetime import datetime
+
+from django.db import transaction
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from .ledger_events import ledger_changed, schedule_cache_warmup
+from .models import ClosedPeriod
+from .periods import close_period, reopen_period
+from .report_utils import parse_date_range
+
+
+def serialize_period(period):
+    return {
+        'id': period.id,
+        'start_date': period.start_date.strftime('%Y-%m-%d'),
+        'end_date': period.end_date.strftime('%Y-%m-%d'),
+        'entry_count': period.entry_count,
+        'is_stale': period.is_stale,
+        'closed_at': period.closed_at,
+        'archived_at': period.archived_at,
+    }
+
+
+def parse_period_range(data):
+    """(start_date, end_date) from a month (YYYY-MM) or start_date/end_date. Raises ValueError."""
+    month = data.get('month')
+    if month:
+        try:
+            start_date = datetime.strptime(month, '%Y-%m').date()
+        except (TypeError, ValueError):
+            raise ValueError('Invalid month. Use YYYY-MM')
+        return start_date, start_date.replace(day=calendar.monthrange(start_date.year, start_date.month)[1])
+    start_date, end_date = parse_date_range(data)
+    if not start_date or not end_date:
+        raise ValueError('Provide month or both start_date and end_date')
+    return start_date, end_date
+
+
+class ClosedPeriodListView(APIView):
+    """
+    GET: List closed periods
+    POST: Close a period: lock its rows and persist their aggregates per account type,
+    account number, truck, driver and route
+    Request body:
+    {
+        "month": "2025-07"  // or "start_date": "2025-07-01", "end_date": "2025-07-31"
+    }
+    """
+
+    def get(self, request):
+        periods = ClosedPeriod.objects.all()
+        return Response([serialize_period(period) for period in periods], status=status.HTTP_200_OK)
+
+    def post(self, request):
+        try:
+            start_date, end_date = parse_period_range(request.data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            with transaction.atomic():
+                period, locked_count = close_period(start_date, end_date)
+                ledger_changed(rows_changed=False, history_changed=True)
+                schedule_cache_warmup()
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response(
+                {'error': f'Failed to close period: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        return Response(
+            dict(serialize_period(period), locked_count=locked_count),
+            status=status.HTTP_201_CREATED
+        )
+
+
+class ClosedPeriodDetailView(APIView):
+    """
+    GET: Retrieve a closed period
+    DELETE: Reopen the period; its frozen aggregates are dropped (rows stay locked).
+    Archived periods cannot be reopened.
+    """
+
+    def get(self, request, pk):
+        period = ClosedPeriod.objects.filter(pk=pk).first()
+        if not period:
+            return Response({'error': 'Closed period not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(serialize_period(period), status=status.HTTP_200_OK)
+
+    def delete(self, request, pk):
+        period = ClosedPeriod.objects.filter(pk=pk).first()
+        if not period:
+            return Response({'error': 'Closed period not found'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            with transaction.atomic():
+                reopen_period(period)
+                ledger_changed(rows_changed=False, history_changed=True)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response(
+                {'error': f'Failed to reopen period: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,160 @@
+"""
+Period close: frozen aggregates for locked history.
+
+Closing a period locks its rows, links them to a ClosedPeriod and persists
+their totals per account type, account number, truck, driver and route
+(PeriodAggregate). Reports then read the frozen totals of closed periods and
+aggregate only rows not linked to one, so their cost follows the open-period
+volume rather than total history.
+
+Rows uploaded into a closed date range later are not linked to the period and
+are aggregated live. When linked rows change anyway (a referenced dimension is
+deleted, the ledger is cleared), the periods are marked stale and answered
+from the ledger until rebuild_stale_periods() recomputes them.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .archive import ledger_queryset
+from .models import ClosedPeriod, PeriodAggregate, TruckingAccount
+
+# Dimension -> TruckingAccount column it is keyed by
+PERIOD_DIMENSIONS = {
+    'account_type': 'account_type_id',
+    'account_number': 'account_number',
+    'truck': 'truck_id',
+    'driver': 'driver_id',
+    'route': 'route_id',
+}
+PERIOD_MEASURES = ['debit', 'credit', 'final_total']
+ZERO = Decimal('0.00')
+
+
+def _key(value):
+    return '' if value is None else str(value)
+
+
+def build_period_aggregates(period):
+    """(Re)compute the frozen totals of a period from its linked rows"""
+    rows = ledger_queryset(period.start_date, period.end_date).filter(closed_period=period)
+    aggregates = []
+    for dimension, column in PERIOD_DIMENSIONS.items():
+        groups = rows.values(column).annotate(
+            entry_count=Count('id'),
+            **{measure: Sum(measure) for measure in PERIOD_MEASURES}
+        ).order_by()
+        for group in groups:
+            aggregates.append(PeriodAggregate(
+                period=period,
+                dimension=dimension,
+                key=_key(group[column]),
+                entry_count=group['entry_count'],
+                **{measure: group[measure] or ZERO for measure in PERIOD_MEASURES}
+            ))
+    with transaction.atomic():
+        period.aggregates.all().delete()
+        PeriodAggregate.objects.bulk_create(aggregates)
+        period.entry_count = rows.count()
+        period.is_stale = False
+        period.save(update_fields=['entry_count', 'is_stale'])
+    return period
+
+
+def overlapping_periods(start_date, end_date):
+    return ClosedPeriod.objects.filter(start_date__lte=end_date, end_date__gte=start_date)
+
+
+def close_period(start_date, end_date):
+    """
+    Lock every row dated in the range, link the rows to a new ClosedPeriod and persist
+    its aggregates. Raises ValueError if the range overlaps a closed period.
+    The caller reports the change with ledger_changed(rows_changed=False, history_changed=True).
+    """
+    if start_date > end_date:
+        raise ValueError('start_date must be on or before end_date')
+    with transaction.atomic():
+        if overlapping_periods(start_date, end_date).select_for_update().exists():
+            raise ValueError('The range overlaps an already closed period')
+        rows = TruckingAccount.objects.filter(date__gte=start_date, date__lte=end_date)
+        locked_at = timezone.now()
+        locked_count = rows.filter(is_locked=False).update(is_locked=True, locked_at=locked_at, updated_at=locked_at)
+        period = ClosedPeriod.objects.create(start_date=start_date, end_date=end_date)
+        rows.update(closed_period=period)
+        build_period_aggregates(period)
+    return period, locked_count
+
+
+def reopen_period(period):
+    """Drop a period's frozen totals; its rows stay locked and are aggregated live again"""
+    if period.archived_at:
+        raise ValueError('Archived periods cannot be reopened')
+    with transaction.atomic():
+        period.delete()
+
+
+def mark_periods_stale():
+    """Linked rows may have changed: answer closed periods from the ledger until rebuilt"""
+    ClosedPeriod.objects.filter(is_stale=False).update(is_stale=True)
+
+
+def rebuild_stale_periods():
+    """Recompute the aggregates of every stale period. Returns the number rebuilt."""
+    rebuilt = 0
+    for period in ClosedPeriod.objects.filter(is_stale=True):
+        build_period_aggregates(period)
+        rebuilt += 1
+    return rebuilt
+
+
+def frozen_periods(start_date=None, end_date=None):
+    """Non-stale closed periods lying entirely inside the (optional) range"""
+    periods = ClosedPeriod.objects.filter(is_stale=False)
+    if start_date:
+        periods = periods.filter(start_date__gte=start_date)
+    if end_date:
+        periods = periods.filter(end_date__lte=end_date)
+    return list(periods.values_list('id', flat=True))
+
+
+def dimension_totals(dimension, start_date=None, end_date=None):
+    """
+    Totals per value of a dimension over a date range: frozen aggregates of the closed
+    periods inside the range plus one grouped query over every other row.
+    Returns ({key: {measure: Decimal, 'count': int}}, number of frozen periods used);
+    keys are the column values (ids or account numbers, None for rows without one).
+    """
+    column = PERIOD_DIMENSIONS[dimension]
+    period_ids = frozen_periods(start_date, end_date)
+    totals = defaultdict(lambda: dict({measure: ZERO for measure in PERIOD_MEASURES}, count=0))
+
+    frozen = PeriodAggregate.objects.filter(period_id__in=period_ids, dimension=dimension).values(
+        'key'
+    ).annotate(count=Sum('entry_count'), **{measure: Sum(measure) for measure in PERIOD_MEASURES}).order_by()
+    for row in frozen:
+        key = row['key']
+        if column != 'account_number':
+            key = int(key) if key else None
+        for measure in PERIOD_MEASURES:
+            totals[key][measure] += row[measure] or ZERO
+        totals[key]['count'] += row['count']
+
+    live = ledger_queryset(start_date, end_date)
+    if start_date:
+        live = live.filter(date__gte=start_date)
+    if end_date:
+        live = live.filter(date__lte=end_date)
+    if period_ids:
+        live = live.filter(Q(closed_period__isnull=True) | ~Q(closed_period_id__in=period_ids))
+    groups = live.values(column).annotate(
+        count=Count('id'), **{measure: Sum(measure) for measure in PERIOD_MEASURES}
+    ).order_by()
+    for row in groups:
+        key = row[column]
+        for measure in PERIOD_MEASURES:
+            totals[key][measure] += row[measure] or ZERO
+        totals[key]['count'] += row['count']
+    return dict(totals), len(period_ids)
@@ -0,0 +1,301 @@
+"""
+Generic pivot over the ledger: group-by dimensions x measures x filters,
+compiled into one grouped query.
+
+Queries run against TruckingAccount, or against the materialized Trip table
+when it can answer them:
+- front_amount / back_amount only exist per trip, so they always use Trip
+  (trip-level dimensions only).
+- final_total for a single account type grouped by truck/date dimensions is
+  read from the matching Trip category column (e.g. fuel_total) as long as
+  no truck-less rows match, since those never belong to a trip.
+- a single ledger dimension of a closed period (account type, account number,
+  truck, driver, route) without filters combines the frozen period aggregates
+  with live aggregation of the remaining rows (app.periods).
+Every source returns the same groups, ordered by the grouped values with
+empty (None) values last.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, Exists, F, OuterRef, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+from .archive import ledger_queryset
+from .models import AccountType, Driver, Route, Trip, Truck
+from .periods import PERIOD_DIMENSIONS, dimension_totals, frozen_periods
+from .report_utils import (
+    DRIVERS_ALLOWANCE,
+    FUEL_AND_OIL,
+    HAULING_INCOME,
+    INSURANCE_EXPENSE,
+    REPAIRS_AND_MAINTENANCE,
+    SALARIES_AND_WAGES,
+    TAX_EXPENSE,
+    TAXES_PERMITS_LICENSES,
+    apply_date_range,
+    parse_date_range,
+)
+
+# Dimension -> lookup on TruckingAccount
+LEDGER_DIMENSIONS = {
+    'account_type': 'account_type__name',
+    'account_number': 'account_number',
+    'truck': 'truck__plate_number',
+    'truck_type': 'truck__truck_type__name',
+    'company': 'truck__company',
+    'driver': 'driver__name',
+    'route': 'route__name',
+    'front_load': 'front_load__name',
+    'back_load': 'back_load__name',
+}
+# Dimension -> lookup on Trip (driver/route/loads are the trip's values)
+TRIP_DIMENSIONS = {
+    'truck': 'truck__plate_number',
+    'truck_type': 'truck__truck_type__name',
+    'company': 'truck__company',
+    'driver': 'driver__name',
+    'route': 'route__name',
+    'front_load': 'front_load__name',
+    'back_load': 'back_load__name',
+}
+# Dimensions that are identical on a ledger row and its trip
+TRUCK_DIMENSIONS = {'truck', 'truck_type', 'company'}
+TIME_BUCKETS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+LEDGER_MEASURES = {
+    'debit': lambda: Sum('debit'),
+    'credit': lambda: Sum('credit'),
+    'final_total': lambda: Sum('final_total'),
+    'count': lambda: Count('id'),
+}
+TRIP_MEASURES = {
+    'front_amount': lambda: Sum('front_load_amount'),
+    'back_amount': lambda: Sum('back_load_amount'),
+    'trip_count': lambda: Count('id'),
+}
+DEFAULT_MEASURES = ['final_total', 'count']
+
+# Period dimension -> (model, label field) for keys that are ids
+PERIOD_LABELS = {
+    'account_type': (AccountType, 'name'),
+    'truck': (Truck, 'plate_number'),
+    'driver': (Driver, 'name'),
+    'route': (Route, 'name'),
+}
+
+# Account type -> Trip column holding that category's total
+ROLLUP_COLUMNS = {
+    HAULING_INCOME: 'income_total',
+    FUEL_AND_OIL: 'fuel_total',
+    DRIVERS_ALLOWANCE: 'allowance_total',
+    INSURANCE_EXPENSE: 'insurance_total',
+    REPAIRS_AND_MAINTENANCE: 'repairs_total',
+    TAXES_PERMITS_LICENSES: 'taxes_permits_total',
+    TAX_EXPENSE: 'tax_total',
+    SALARIES_AND_WAGES: 'salaries_total',
+}
+
+
+def _split_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()] if value else []
+
+
+class PivotQuery:
+    """
+    A parsed pivot request.
+    Query params:
+    - group_by: comma separated dimensions (see LEDGER_DIMENSIONS plus day/week/month), required
+    - measures: comma separated measures (debit, credit, final_total, count,
+      front_amount, back_amount, trip_count). Default: final_total,count
+    - start_date / end_date: inclusive date range
+    - <dimension>=<value>: filter by dimension value, repeat the param for several values
+    Raises ValueError for invalid input.
+    """
+
+    def __init__(self, query_params):
+        self.group_by = _split_list(query_params.get('group_by'))
+        self.measures = _split_list(query_params.get('measures')) or list(DEFAULT_MEASURES)
+        self.start_date, self.end_date = parse_date_range(query_params)
+        self.filters = {
+            dimension: query_params.getlist(dimension)
+            for dimension in LEDGER_DIMENSIONS
+            if query_params.getlist(dimension)
+        }
+
+        valid_dimensions = list(LEDGER_DIMENSIONS) + list(TIME_BUCKETS)
+        if not self.group_by:
+            raise ValueError(f'group_by is required. Valid: {", ".join(valid_dimensions)}')
+        unknown = [d for d in self.group_by if d not in valid_dimensions]
+        if unknown:
+            raise ValueError(f'Unknown group_by: {", ".join(unknown)}. Valid: {", ".join(valid_dimensions)}')
+        if len([d for d in self.group_by if d in TIME_BUCKETS]) > 1:
+            raise ValueError('Only one of day, week or month can be grouped by')
+        valid_measures = list(LEDGER_MEASURES) + list(TRIP_MEASURES)
+        unknown = [m for m in self.measures if m not in valid_measures]
+        if unknown:
+            raise ValueError(f'Unknown measures: {", ".join(unknown)}. Valid: {", ".join(valid_measures)}')
+
+        self.source = self._choose_source()
+
+    # Source selection -------------------------------------------------
+
+    def _trip_only(self):
+        return any(m in TRIP_MEASURES for m in self.measures)
+
+    def _rollup_column(self):
+        """Trip category column answering this query, or None"""
+        account_types = self.filters.get('account_type', [])
+        if len(account_types) != 1 or account_types[0] not in ROLLUP_COLUMNS:
+            return None
+        if any(m not in ('final_total',) + tuple(TRIP_MEASURES) for m in self.measures):
+            return None
+        dimensions = set(self.group_by) | (set(self.filters) - {'account_type'})
+        if any(d not in TRUCK_DIMENSIONS and d not in TIME_BUCKETS for d in dimensions):
+            return None
+        return ROLLUP_COLUMNS[account_types[0]]
+
+    def _choose_source(self):
+        if self._trip_only():
+            ledger_only = [m for m in self.measures if m in LEDGER_MEASURES and m != 'final_total']
+            if ledger_only:
+                raise ValueError(
+                    f'{", ".join(ledger_only)} cannot be combined with trip measures (front_amount, back_amount, trip_count)'
+                )
+            if ('final_total' in self.measures or 'account_type' in self.filters) and self._rollup_column() is None:
+                raise ValueError('final_total or an account_type filter with trip measures requires exactly one account_type')
+            dimensions = set(self.group_by) | (set(self.filters) - {'account_type'})
+            not_trip = [d for d in dimensions if d not in TRIP_DIMENSIONS and d not in TIME_BUCKETS]
+            if not_trip:
+                raise ValueError(f'Trip measures cannot be grouped or filtered by: {", ".join(sorted(not_trip))}')
+            return 'trips'
+        if self._rollup_column() and not self._truckless_rows().exists():
+            return 'trips'
+        if self._period_dimension() and frozen_periods(self.start_date, self.end_date):
+            return 'periods'
+        return 'ledger'
+
+    def _period_dimension(self):
+        """The dimension closed period aggregates can answer this query by, or None"""
+        if len(self.group_by) != 1 or self.group_by[0] not in PERIOD_DIMENSIONS or self.filters:
+            return None
+        if any(m not in LEDGER_MEASURES for m in self.measures):
+            return None
+        return self.group_by[0]
+
+    def _truckless_rows(self):
+        return self._filtered_ledger().filter(truck__isnull=True)
+
+    # Query compilation ------------------------------------------------
+
+    def _filtered_ledger(self):
+        queryset = apply_date_range(ledger_queryset(self.start_date, self.end_date), self.start_date, self.end_date)
+        for dimension, values in self.filters.items():
+            queryset = queryset.filter(**{f'{LEDGER_DIMENSIONS[dimension]}__in': values})
+        return queryset
+
+    def _filtered_trips(self):
+        queryset = apply_date_range(Trip.objects.all(), self.start_date, self.end_date)
+        for dimension, values in self.filters.items():
+            if dimension != 'account_type':
+                queryset = queryset.filter(**{f'{TRIP_DIMENSIONS[dimension]}__in': values})
+        if self._rollup_column():
+            # Only trips with rows of the account type belong to its category; a zero
+            # category total does not tell them apart from trips without such rows
+            queryset = queryset.filter(Exists(
+                ledger_queryset(self.start_date, self.end_date).filter(
+                    trip_id=OuterRef('id'), account_type__name=self.filters['account_type'][0]
+                )
+            ))
+        return queryset
+
+    def queryset(self):
+        """Compile to a single grouped values() queryset"""
+        if self.source == 'trips':
+            queryset, lookups = self._filtered_trips(), TRIP_DIMENSIONS
+            column = self._rollup_column()
+            measures = {
+                m: Sum(column) if m == 'final_total' else TRIP_MEASURES[m]()
+                for m in self.measures
+            }
+        else:
+            queryset, lookups = self._filtered_ledger(), LEDGER_DIMENSIONS
+            measures = {m: LEDGER_MEASURES[m]() for m in self.measures}
+
+        annotations = {}
+        group_fields = []
+        for dimension in self.group_by:
+            if dimension in TIME_BUCKETS:
+                annotations[f'_{dimension}'] = TIME_BUCKETS[dimension]('date')
+                group_fields.append(f'_{dimension}')
+            else:
+                group_fields.append(lookups[dimension])
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        # Measure names may clash with model fields (debit, credit, final_total): annotate with a prefix
+        measure_aliases = {f'm_{name}': expression for name, expression in measures.items()}
+        # Backends disagree on where NULLs sort; put them last as the period source does
+        ordering = [F(field).asc(nulls_last=True) for field in group_fields]
+        return queryset.values(*group_fields).annotate(**measure_aliases).order_by(*ordering)
+
+    def _period_rows(self):
+        """Rows from frozen period aggregates plus live rows, merged by display label"""
+        dimension = self._period_dimension()
+        totals, _ = dimension_totals(dimension, self.start_date, self.end_date)
+        if dimension in PERIOD_LABELS:
+            model, field = PERIOD_LABELS[dimension]
+            labels = dict(model.objects.filter(id__in=[key for key in totals if key]).values_list('id', field))
+        else:
+            labels = {key: key for key in totals}
+        merged = {}
+        for key, values in totals.items():
+            label = labels.get(key)
+            row = merged.setdefault(label, {dimension: label, **{m: 0 for m in self.measures}})
+            for measure in self.measures:
+                value = values['count'] if measure == 'count' else values[measure]
+                row[measure] += int(value) if measure == 'count' else value
+        rows = sorted(merged.values(), key=lambda row: (row[dimension] is None, row[dimension] or ''))
+        for row in rows:
+            for measure in self.measures:
+                if measure != 'count':
+                    row[measure] = float(row[measure])
+        return rows
+
+    def rows(self):
+        if self.source == 'periods':
+            return self._period_rows()
+        lookups = TRIP_DIMENSIONS if self.source == 'trips' else LEDGER_DIMENSIONS
+        rows = []
+        for group in self.queryset():
+            row = {}
+            for dimension in self.group_by:
+                if dimension in TIME_BUCKETS:
+                    value = group[f'_{dimension}']
+                    row[dimension] = value.strftime('%Y-%m-%d') if value else None
+                else:
+                    row[dimension] = group[lookups[dimension]]
+            for measure in self.measures:
+                value = group[f'm_{measure}']
+                row[measure] = float(value) if isinstance(value, Decimal) else (value or 0)
+            rows.append(row)
+        return rows
+
+
+def run_pivot(query_params):
+    """Parse and run a pivot request, returning the response payload"""
+    pivot = PivotQuery(query_params)
+    rows = pivot.rows()
+    totals = {}
+    for measure in pivot.measures:
+        total = sum(row[measure] for row in rows)
+        totals[measure] = round(total, 2) if isinstance(total, float) else total
+    return {
+        'group_by': pivot.group_by,
+        'measures': pivot.measures,
+        'source': pivot.source,
+        'rows': rows,
+        'totals': totals,
+    }
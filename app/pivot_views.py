@@ -0,0 +1,31 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from .pivot import run_pivot
+from .report_cache import cached_report
+
+
+class PivotReportView(APIView):
+    """
+    GET: Aggregate the ledger by any combination of dimensions and measures
+    Query params:
+    - group_by: account_type, account_number, truck, truck_type, company, driver,
+      route, front_load, back_load and one of day/week/month (comma separated)
+    - measures: debit, credit, final_total, count, front_amount, back_amount,
+      trip_count (comma separated, default: final_total,count)
+    - start_date / end_date: Date range (YYYY-MM-DD or MM/DD/YYYY)
+    - <dimension>=<value>: Filter, repeat the param for several values
+    Response: {'group_by', 'measures', 'source', 'rows', 'totals'}
+    """
+
+    @cached_report('pivot')
+    def get(self, request):
+        try:
+            return Response(run_pivot(request.query_params), status=status.HTTP_200_OK)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response(
+                {'error': f'Failed to compute pivot report: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -0,0 +1,125 @@
+from decimal import Decimal
+
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, Sum, Value, When
+from django.db.models.functions import Coalesce
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from .models import Trip
+from .report_cache import cached_report
+from .report_utils import apply_date_range, parse_date_range
+
+# P&L line -> Trip rollup column
+INCOME_LINE = ('hauling_income', 'income_total')
+EXPENSE_LINES = [
+    ('fuel', 'fuel_total'),
+    ('allowance', 'allowance_total'),
+    ('insurance', 'insurance_total'),
+    ('repairs_maintenance', 'repairs_total'),
+    ('taxes_permits_licenses', 'taxes_permits_total'),
+    ('tax', 'tax_total'),
+    ('salaries_wages', 'salaries_total'),
+]
+PNL_LINES = [INCOME_LINE] + EXPENSE_LINES
+
+# group_by -> values() fields identifying the group
+PNL_GROUPS = {
+    'truck': ['truck_id', 'truck__plate_number', 'truck__truck_type__name', 'truck__company'],
+    'truck_type': ['truck__truck_type__name'],
+    'company': ['truck__company'],
+}
+GROUP_LABELS = {
+    'truck_id': 'truck_id',
+    'truck__plate_number': 'plate_number',
+    'truck__truck_type__name': 'truck_type',
+    'truck__company': 'company',
+}
+RANK_FIELDS = ['profit', 'margin', 'total_expenses', 'trip_count'] + [line for line, _ in PNL_LINES]
+
+AMOUNT = DecimalField(max_digits=17, decimal_places=2)
+
+
+def _sum(column):
+    return Coalesce(Sum(column), Value(Decimal('0.00')), output_field=AMOUNT)
+
+
+class TruckPnLView(APIView):
+    """
+    GET: Profit and loss per truck, truck type or company for a period
+    Computed in one grouped query over the materialized trips.
+    Query params:
+    - start_date / end_date: Date range (YYYY-MM-DD or MM/DD/YYYY)
+    - group_by: truck (default), truck_type or company
+    - rank: profit (default), margin, total_expenses, trip_count or a P&L line
+    - order: desc (default) or asc
+    - top: Return only the first N groups after ranking
+    """
+
+    @cached_report('truck_pnl')
+    def get(self, request):
+        try:
+            start_date, end_date = parse_date_range(request.query_params)
+            group_by = request.query_params.get('group_by', 'truck')
+            if group_by not in PNL_GROUPS:
+                raise ValueError(f'group_by must be one of: {", ".join(PNL_GROUPS)}')
+            rank = request.query_params.get('rank', 'profit')
+            if rank not in RANK_FIELDS:
+                raise ValueError(f'rank must be one of: {", ".join(RANK_FIELDS)}')
+            descending = request.query_params.get('order', 'desc') != 'asc'
+            top = request.query_params.get('top')
+            top = int(top) if top else None
+            if top is not None and top < 1:
+                raise ValueError('top must be a positive integer')
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            queryset = apply_date_range(Trip.objects.all(), start_date, end_date)
+            lines = {line: _sum(column) for line, column in PNL_LINES}
+            income = F(INCOME_LINE[0])
+            expenses = sum((F(line) for line, _ in EXPENSE_LINES[1:]), F(EXPENSE_LINES[0][0]))
+            groups = queryset.values(*PNL_GROUPS[group_by]).annotate(
+                trip_count=Count('id'),
+                **lines
+            ).annotate(
+                total_expenses=ExpressionWrapper(expenses, output_field=AMOUNT),
+            ).annotate(
+                profit=ExpressionWrapper(income - F('total_expenses'), output_field=AMOUNT),
+                margin=Case(
+                    When(**{INCOME_LINE[0]: 0}, then=Value(None)),
+                    default=ExpressionWrapper(
+                        (income - F('total_expenses')) * Value(Decimal('100')) / income,
+                        output_field=AMOUNT,
+                    ),
+                    output_field=AMOUNT,
+                ),
+            )
+            ordering = F(rank).desc(nulls_last=True) if descending else F(rank).asc(nulls_last=True)
+            groups = groups.order_by(ordering, *PNL_GROUPS[group_by])
+            if top:
+                groups = groups[:top]
+
+            rows = []
+            for group in groups:
+                row = {GROUP_LABELS[field]: group[field] for field in PNL_GROUPS[group_by]}
+                for line, _ in PNL_LINES:
+                    row[line] = float(group[line])
+                row['total_expenses'] = float(group['total_expenses'])
+                row['profit'] = float(group['profit'])
+                row['margin'] = round(float(group['margin']), 2) if group['margin'] is not None else None
+                row['trip_count'] = group['trip_count']
+                rows.append(row)
+
+            return Response({
+                'group_by': group_by,
+                'start_date': start_date.strftime('%Y-%m-%d') if start_date else None,
+                'end_date': end_date.strftime('%Y-%m-%d') if end_date else None,
+                'rank': rank,
+                'rows': rows,
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response(
+                {'error': f'Failed to compute truck P&L: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -0,0 +1,144 @@
+"""
+Query plan regression checks for the hot ledger queries.
+
+Each hot query (report filters, trip sync, list pages, locking, account
+ledger, plate lookups) is EXPLAINed and its plan is searched for a full
+scan of the ledger or truck table. On PostgreSQL sequential scans are
+disabled for the check, so a seq scan in the plan means no index can serve
+the query at all, whatever the table size. `python manage.py
+check_query_plans` runs the checks, optionally on seeded rows that are
+rolled back afterwards.
+"""
+import re
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .models import AccountType, Truck, TruckingAccount
+from .report_utils import HAULING_INCOME, FUEL_AND_OIL, apply_date_range
+from .trips import filter_plate
+
+SEED_BATCH_SIZE = 2000
+SEED_TRUCKS = 20
+SEED_DAYS = 730
+
+PG_SEQ_SCAN = re.compile(r'Seq Scan on (\w+)')
+SQLITE_SCAN = re.compile(r'\bSCAN (\w+)(.*)')
+
+
+class PlanCheckFailed(Exception):
+    pass
+
+
+def seed_rows(count):
+    """Insert `count` synthetic ledger rows over SEED_DAYS days for SEED_TRUCKS trucks"""
+    account_types = [
+        AccountType.objects.get_or_create(name=name)[0] for name in (HAULING_INCOME, FUEL_AND_OIL)
+    ]
+    trucks = [Truck.objects.create(plate_number=f'PLAN {index:03d}') for index in range(SEED_TRUCKS)]
+    first_day = timezone.localdate() - timedelta(days=SEED_DAYS)
+    now = timezone.now()
+    batch = []
+    for index in range(count):
+        batch.append(TruckingAccount(
+            account_number=f'{5500000 + index % 50}',
+            account_type=account_types[index % len(account_types)],
+            truck=trucks[index % len(trucks)],
+            description='Query plan check',
+            debit=Decimal('100.00'),
+            credit=Decimal('0.00'),
+            final_total=Decimal('100.00'),
+            remarks='',
+            date=first_day + timedelta(days=index % SEED_DAYS),
+            created_at=now,
+            is_locked=index % 10 != 0,
+        ))
+        if len(batch) >= SEED_BATCH_SIZE:
+            TruckingAccount.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        TruckingAccount.objects.bulk_create(batch)
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {TruckingAccount._meta.db_table}')
+            cursor.execute(f'ANALYZE {Truck._meta.db_table}')
+
+
+def sample_parameters():
+    """Parameter values for the hot queries, taken from an existing row"""
+    row = TruckingAccount.objects.filter(truck__isnull=False).select_related('truck').order_by('-date', '-id').first()
+    if row is None:
+        raise PlanCheckFailed('The ledger has no rows with a truck to sample; seed some rows first')
+    return {
+        'date': row.date,
+        'id': row.id,
+        'start_date': row.date.replace(day=1),
+        'end_date': row.date,
+        'truck_id': row.truck_id,
+        'account_number': row.account_number,
+        'plate_number': row.truck.plate_number,
+    }
+
+
+def hot_queries(params):
+    """Name -> (table that must not be scanned, queryset), mirroring the queries of the report and list views"""
+    ledger = TruckingAccount.objects.all()
+    ledger_table = TruckingAccount._meta.db_table
+    start_date, end_date = params['start_date'], params['end_date']
+    return {
+        'report by account type and date range': (ledger_table, apply_date_range(
+            ledger.filter(account_type__name=HAULING_INCOME), start_date, end_date
+        ).values('truck_id').annotate(total=Sum('final_total')).order_by()),
+        'trip rows by (truck, date)': (ledger_table, ledger.filter(
+            truck_id__in=[params['truck_id']], date__in=[params['date']]
+        )),
+        'trucking list page': (ledger_table, ledger.order_by('-date', '-id')[:100]),
+        'trucking list date range': (ledger_table, apply_date_range(
+            ledger, start_date, end_date
+        ).order_by('-date', '-id')[:100]),
+        'trucking list cursor page': (ledger_table, ledger.filter(
+            Q(date__lt=params['date']) | Q(date=params['date'], id__lt=params['id']), date__lte=params['date']
+        ).order_by('-date', '-id')[:100]),
+        'first unlocked row': (ledger_table, ledger.filter(is_locked=False).order_by('date').values('date')[:1]),
+        'unlocked rows in range': (ledger_table, apply_date_range(ledger.filter(is_locked=False), start_date, end_date)),
+        'account ledger page': (ledger_table, ledger.filter(
+            account_number=params['account_number'], date__gte=start_date
+        ).order_by('date', 'id')[:100]),
+        'truck by plate': (Truck._meta.db_table, filter_plate(
+            Truck.objects.all(), params['plate_number'], field='plate_normalized'
+        )),
+    }
+
+
+def scanned_tables(plan):
+    """Tables read by a full scan in an EXPLAIN output"""
+    if connection.vendor == 'postgresql':
+        return set(PG_SEQ_SCAN.findall(plan))
+    return {table for table, rest in SQLITE_SCAN.findall(plan) if 'USING' not in rest}
+
+
+def _scans(table, scanned):
+    # Partitions of the ledger table are named <table>_p<month> / <table>_default
+    return any(name == table or name.startswith(f'{table}_') for name in scanned)
+
+
+def check_query_plans(seed=0):
+    """
+    EXPLAIN every hot query. Returns a list of (name, passed, plan).
+    Seeded rows and planner settings are rolled back.
+    """
+    results = []
+    with transaction.atomic():
+        if seed:
+            seed_rows(seed)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        for name, (table, queryset) in hot_queries(sample_parameters()).items():
+            plan = queryset.explain()
+            results.append((name, not _scans(table, scanned_tables(plan)), plan))
+        transaction.set_rollback(True)
+    return results
@@ -0,0 +1,409 @@
+"""
+Server-side cache for report responses.
+
+Cached responses are keyed by report name + normalized query params + the
+ledger generation, a counter in the shared (Redis) cache that every ledger
+write bumps. A response therefore stays valid until the next write, and no
+explicit invalidation of individual keys is needed.
+
+Reports registered with stale_while_revalidate=True also keep their last
+computed version. After a write that version is served immediately while a
+Celery task recomputes the report for the new generation; versions older than
+REPORT_MAX_STALE_SECONDS are recomputed in the request instead. Writes queue
+one delayed refresh per report, so a burst of writes costs one recompute.
+"""
+import calendar
+import hashlib
+import logging
+import time
+import uuid
+from datetime import date
+from functools import wraps
+from importlib import import_module
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest, QueryDict
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+LEDGER_GENERATION_KEY = 'ledger_generation'
+FROZEN_EPOCH_KEY = 'ledger_frozen_epoch'
+REPORT_CACHE_TIMEOUT = getattr(settings, 'REPORT_CACHE_TIMEOUT', 7 * 24 * 3600)
+# Single-flight: lock lifetime for the computing worker and how long others wait for it
+REPORT_LOCK_TIMEOUT = getattr(settings, 'REPORT_LOCK_TIMEOUT', 120)
+REPORT_WAIT_TIMEOUT = getattr(settings, 'REPORT_WAIT_TIMEOUT', 60)
+REPORT_WAIT_MIN_INTERVAL = 0.05
+REPORT_WAIT_MAX_INTERVAL = 0.5
+# Stale-while-revalidate: query variants per report refreshed after a write, how long
+# writes are coalesced before the refresh runs and the oldest version still served
+REPORT_MAX_REFRESH_VARIANTS = getattr(settings, 'REPORT_MAX_REFRESH_VARIANTS', 20)
+REPORT_REFRESH_DELAY = getattr(settings, 'REPORT_REFRESH_DELAY', 5)
+REPORT_MAX_STALE_SECONDS = getattr(settings, 'REPORT_MAX_STALE_SECONDS', 600)
+
+# Response headers stored with cached report data (pagination cursors)
+CACHED_HEADERS = ['X-Next-Cursor', 'Deprecation']
+
+# Report name -> (module, qualified name of the view's get method)
+REPORT_REGISTRY = {}
+STALE_WHILE_REVALIDATE_REPORTS = set()
+
+
+def get_ledger_generation():
+    """Return the current ledger generation, initializing it on first use"""
+    generation = cache.get(LEDGER_GENERATION_KEY)
+    if generation is None:
+        cache.add(LEDGER_GENERATION_KEY, 1, timeout=None)
+        generation = cache.get(LEDGER_GENERATION_KEY, 1)
+    return generation
+
+
+def get_frozen_epoch():
+    """
+    Epoch of the permanent caches for locked periods. Locked rows cannot be
+    edited, so it only moves when locked history changes (lock, clear, dimension delete).
+    """
+    epoch = cache.get(FROZEN_EPOCH_KEY)
+    if epoch is None:
+        cache.add(FROZEN_EPOCH_KEY, 1, timeout=None)
+        epoch = cache.get(FROZEN_EPOCH_KEY, 1)
+    return epoch
+
+
+def bump_frozen_epoch():
+    try:
+        return cache.incr(FROZEN_EPOCH_KEY)
+    except ValueError:
+        cache.add(FROZEN_EPOCH_KEY, 1, timeout=None)
+        return cache.incr(FROZEN_EPOCH_KEY)
+    except Exception as e:
+        logger.warning(f'Failed to bump frozen epoch: {e}')
+        return None
+
+
+def ledger_changes_key(generation):
+    return f'ledger_changes:{generation}'
+
+
+def bump_ledger_generation(changes=None):
+    """
+    Invalidate all cached reports by moving to a new ledger generation.
+    changes: (truck_id, date) trip keys whose rows changed, journaled for
+    incremental consumers (ledger snapshots); None means unknown/everything.
+    """
+    try:
+        generation = cache.incr(LEDGER_GENERATION_KEY)
+    except ValueError:
+        # Key missing (first write or evicted): start a generation no reader has cached yet
+        cache.add(LEDGER_GENERATION_KEY, 1, timeout=None)
+        generation = cache.incr(LEDGER_GENERATION_KEY)
+    except Exception as e:
+        logger.warning(f'Failed to bump ledger generation: {e}')
+        return None
+    if changes is not None:
+        try:
+            cache.set(ledger_changes_key(generation), list(changes), timeout=REPORT_CACHE_TIMEOUT)
+        except Exception as e:
+            logger.warning(f'Failed to journal ledger changes: {e}')
+    schedule_stale_refreshes()
+    return generation
+
+
+def normalize_params(query_params):
+    """Stable query string for a QueryDict: keys sorted, repeated values kept in order"""
+    return urlencode([
+        (key, value)
+        for key in sorted(query_params.keys())
+        for value in query_params.getlist(key)
+    ])
+
+
+def _params_hash(query_string):
+    return hashlib.md5(query_string.encode()).hexdigest()
+
+
+def report_cache_key(name, query_params, generation):
+    return f'report:{name}:{generation}:{_params_hash(normalize_params(query_params))}'
+
+
+def _latest_key(name, query_string):
+    return f'report:{name}:latest:{_params_hash(query_string)}'
+
+
+def _variants_key(name):
+    return f'report:{name}:variants'
+
+
+def _refresh_pending_key(name):
+    return f'report:{name}:refresh_pending'
+
+
+def _cached_response(cached, generation, state):
+    response = Response(cached['data'])
+    for header, value in cached['headers'].items():
+        response[header] = value
+    response['X-Report-Cache'] = state
+    response['X-Ledger-Generation'] = str(generation)
+    response['X-Report-Generation'] = str(cached.get('generation', generation))
+    return response
+
+
+def _acquire_compute_lock(key):
+    """Try to become the single worker computing a report key (SET NX in Redis)"""
+    token = uuid.uuid4().hex
+    if cache.add(f'{key}:lock', token, timeout=REPORT_LOCK_TIMEOUT):
+        return token
+    return None
+
+
+def _wait_or_lock(key):
+    """
+    Single-flight entry: returns (cached, None) once another worker stored the
+    report, or (None, token) when this worker must compute it. After
+    REPORT_WAIT_TIMEOUT returns (None, None) and the caller computes unlocked.
+    """
+    token = _acquire_compute_lock(key)
+    deadline = time.monotonic() + REPORT_WAIT_TIMEOUT
+    delay = REPORT_WAIT_MIN_INTERVAL
+    while token is None and time.monotonic() < deadline:
+        time.sleep(delay)
+        delay = min(delay * 2, REPORT_WAIT_MAX_INTERVAL)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached, None
+        # The computing worker failed or its lock expired: take over
+        token = _acquire_compute_lock(key)
+    return None, token
+
+
+def _release_compute_lock(key, token):
+    lock_key = f'{key}:lock'
+    try:
+        # Only release our own lock; an expired lock may have been taken over
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+    except Exception as e:
+        logger.warning(f'Failed to release report lock {lock_key}: {e}')
+
+
+def _remember_variant(name, query_string):
+    """Track recently computed query variants so a write can refresh them eagerly"""
+    variants = [v for v in cache.get(_variants_key(name), []) if v != query_string]
+    variants.insert(0, query_string)
+    cache.set(_variants_key(name), variants[:REPORT_MAX_REFRESH_VARIANTS], timeout=REPORT_CACHE_TIMEOUT)
+
+
+def _store_report(name, key, query_string, generation, response):
+    entry = {
+        'generation': generation,
+        'computed_at': time.time(),
+        'data': response.data,
+        'headers': {h: response[h] for h in CACHED_HEADERS if h in response},
+    }
+    try:
+        cache.set(key, entry, timeout=REPORT_CACHE_TIMEOUT)
+        if name in STALE_WHILE_REVALIDATE_REPORTS:
+            cache.set(_latest_key(name, query_string), entry, timeout=REPORT_CACHE_TIMEOUT)
+            _remember_variant(name, query_string)
+    except Exception as e:
+        logger.warning(f'Failed to store report cache for {name}: {e}')
+
+
+def _compute_report(name, get, view, request, args, kwargs, generation, key, token):
+    """Run the view while holding the compute lock and store a successful result"""
+    try:
+        response = get(view, request, *args, **kwargs)
+        if isinstance(response, Response) and response.status_code == 200:
+            _store_report(name, key, normalize_params(request.query_params), generation, response)
+            response['X-Report-Cache'] = 'MISS'
+            response['X-Ledger-Generation'] = str(generation)
+            response['X-Report-Generation'] = str(generation)
+        return response
+    finally:
+        if token is not None:
+            _release_compute_lock(key, token)
+
+
+def schedule_report_refresh(name, query_string):
+    """Queue a background recompute of one report variant for the current generation"""
+    try:
+        generation = get_ledger_generation()
+        refresh_key = f'report:{name}:{generation}:{_params_hash(query_string)}:refresh'
+        if not cache.add(refresh_key, 1, timeout=REPORT_LOCK_TIMEOUT):
+            return False  # Already queued for this generation
+        from .tasks import refresh_report_cache
+        refresh_report_cache.delay(name, query_string)
+        return True
+    except Exception as e:
+        logger.warning(f'Failed to schedule refresh of report {name}: {e}')
+        return False
+
+
+def _load_report_views():
+    """Report views register on import; Celery workers load them through the URLconf"""
+    if not REPORT_REGISTRY:
+        import_module(settings.ROOT_URLCONF)
+
+
+def schedule_stale_refreshes():
+    """
+    After a write, queue one delayed refresh of each stale-while-revalidate report.
+    Writes until it runs are coalesced into it: it recomputes the recently requested
+    variants for the generation current when it runs.
+    """
+    _load_report_views()
+    for name in STALE_WHILE_REVALIDATE_REPORTS:
+        try:
+            if not cache.add(_refresh_pending_key(name), 1, timeout=REPORT_REFRESH_DELAY + REPORT_LOCK_TIMEOUT):
+                continue  # A refresh is already queued
+            from .tasks import refresh_stale_reports
+            refresh_stale_reports.apply_async((name,), countdown=REPORT_REFRESH_DELAY)
+        except Exception as e:
+            logger.warning(f'Failed to schedule refresh of report {name}: {e}')
+
+
+def refresh_report_variants(name):
+    """Recompute the recently requested variants of a report for the current generation"""
+    # Writes from now on queue another refresh
+    cache.delete(_refresh_pending_key(name))
+    refreshed = 0
+    for query_string in cache.get(_variants_key(name), []):
+        if refresh_report(name, query_string) is not None:
+            refreshed += 1
+    return refreshed
+
+
+def _report_request(query_string):
+    """A GET request carrying only the stored query params, for computing a report outside of a request"""
+    http_request = HttpRequest()
+    http_request.method = 'GET'
+    http_request.GET = QueryDict(query_string)
+    return Request(http_request)
+
+
+def refresh_report(name, query_string, wait=False):
+    """
+    Compute a report for the current generation outside of a request (Celery).
+    Returns the generation computed, or None if it was already fresh or another
+    worker computed it. With wait=True an in-flight computation is awaited so the
+    report is cached when this returns.
+    """
+    _load_report_views()
+    module_name, qualname = REPORT_REGISTRY[name]
+    class_name, method_name = qualname.rsplit('.', 1)
+    view_class = getattr(import_module(module_name), class_name)
+
+    request = _report_request(query_string)
+    view = view_class()
+    view.request = request
+    view.args, view.kwargs = (), {}
+    view.format_kwarg = None
+    get = getattr(view_class, method_name).__wrapped__
+
+    generation = get_ledger_generation()
+    key = report_cache_key(name, request.query_params, generation)
+    if cache.get(key) is not None:
+        return None
+    if wait:
+        cached, token = _wait_or_lock(key)
+        if cached is not None:
+            return None
+    else:
+        token = _acquire_compute_lock(key)
+        if token is None:
+            return None  # A request is computing this version right now
+    _compute_report(name, get, view, request, (), {}, generation, key, token)
+    return generation
+
+
+def standard_report_variants(today=None):
+    """The dashboard report set warmed after bulk writes: summaries plus current-month trips"""
+    today = today or date.today()
+    month_start = today.replace(day=1)
+    month_end = month_start.replace(day=calendar.monthrange(today.year, today.month)[1])
+    return [
+        ('accounts_summary', ''),
+        ('opex', ''),
+        ('revenue_streams', ''),
+        ('drivers_summary', ''),
+        ('trips', urlencode([('end_date', month_end.isoformat()), ('start_date', month_start.isoformat())])),
+    ]
+
+
+def warm_reports(variants):
+    """
+    Pre-compute (name, query_string) report variants into the cache for the
+    current generation. Returns {name: {'query', 'seconds', 'computed'}}.
+    """
+    timings = {}
+    for name, query_string in variants:
+        started = time.monotonic()
+        try:
+            computed = refresh_report(name, query_string, wait=True) is not None
+        except Exception as e:
+            logger.warning(f'Failed to warm report {name}: {e}')
+            computed = False
+        timings[name] = {
+            'query': query_string,
+            'seconds': round(time.monotonic() - started, 3),
+            'computed': computed,
+        }
+    return timings
+
+
+def cached_report(name, stale_while_revalidate=False, bypass=None):
+    """
+    Decorator for APIView.get methods that caches successful Response data
+    per ledger generation. Streaming responses and errors are never cached;
+    requests for which bypass(request) is true (e.g. streamed exports) skip
+    the cache and its lock entirely.
+
+    Misses are single-flight: one worker holds a lock per cache key and
+    computes the report while concurrent identical requests wait for its
+    result. Waiters give up after REPORT_WAIT_TIMEOUT and compute themselves.
+
+    With stale_while_revalidate=True a miss is answered with the last
+    computed version (X-Report-Cache: STALE) and the current version is
+    recomputed by a Celery task. Only a cold cache, or a last version older
+    than REPORT_MAX_STALE_SECONDS, blocks on the recompute.
+
+    Headers: X-Report-Cache (HIT/MISS/SHARED/STALE), X-Ledger-Generation
+    (current) and X-Report-Generation (generation the data was computed at).
+    """
+    def decorator(get):
+        REPORT_REGISTRY[name] = (get.__module__, get.__qualname__)
+        if stale_while_revalidate:
+            STALE_WHILE_REVALIDATE_REPORTS.add(name)
+
+        @wraps(get)
+        def wrapper(view, request, *args, **kwargs):
+            if bypass is not None and bypass(request):
+                return get(view, request, *args, **kwargs)
+            try:
+                generation = get_ledger_generation()
+                key = report_cache_key(name, request.query_params, generation)
+                cached = cache.get(key)
+                if cached is not None:
+                    return _cached_response(cached, generation, 'HIT')
+
+                if stale_while_revalidate:
+                    query_string = normalize_params(request.query_params)
+                    stale = cache.get(_latest_key(name, query_string))
+                    # Past the max age (e.g. refreshes are not running) the request recomputes
+                    if stale is not None and time.time() - stale.get('computed_at', 0) <= REPORT_MAX_STALE_SECONDS:
+                        schedule_report_refresh(name, query_string)
+                        return _cached_response(stale, generation, 'STALE')
+
+                cached, token = _wait_or_lock(key)
+                if cached is not None:
+                    return _cached_response(cached, generation, 'SHARED')
+            except Exception as e:
+                logger.warning(f'Report cache unavailable for {name}: {e}')
+                return get(view, request, *args, **kwargs)
+
+            return _compute_report(name, get, view, request, args, kwargs, generation, key, token)
+        return wrapper
+    return decorator
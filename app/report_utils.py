@@ -0,0 +1,95 @@
+"""
+Shared helpers for report and list endpoints: query parameter parsing,
+account type names, opaque keyset cursors and count estimates.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.db import connections
+
+
+# Account type names as stored in AccountType.name
+HAULING_INCOME = 'Hauling Income'
+FUEL_AND_OIL = 'Fuel and Oil'
+DRIVERS_ALLOWANCE = 'Driver\'s Allowance'
+INSURANCE_EXPENSE = 'Insurance Expense'
+REPAIRS_AND_MAINTENANCE = 'Repairs and Maintenance Expense'
+TAXES_PERMITS_LICENSES = 'Taxes, Permits and Licenses Expense'
+TAX_EXPENSE = 'Tax Expense'
+SALARIES_AND_WAGES = 'Salaries and Wages'
+
+DATE_INPUT_FORMATS = ['%Y-%m-%d', '%m/%d/%Y']
+
+
+def parse_date_param(value):
+    """
+    Parse a date query parameter (YYYY-MM-DD or MM/DD/YYYY).
+    Returns None for empty values and raises ValueError for invalid ones.
+    """
+    if not value:
+        return None
+    for fmt in DATE_INPUT_FORMATS:
+        try:
+            return datetime.strptime(str(value).strip(), fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f'Invalid date "{value}". Use YYYY-MM-DD or MM/DD/YYYY')
+
+
+def parse_date_range(query_params):
+    """Return (start_date, end_date) from start_date/end_date query params"""
+    start_date = parse_date_param(query_params.get('start_date'))
+    end_date = parse_date_param(query_params.get('end_date'))
+    if start_date and end_date and start_date > end_date:
+        raise ValueError('start_date must be on or before end_date')
+    return start_date, end_date
+
+
+def apply_date_range(queryset, start_date, end_date, field='date'):
+    """Restrict a queryset to an inclusive date range"""
+    if start_date:
+        queryset = queryset.filter(**{f'{field}__gte': start_date})
+    if end_date:
+        queryset = queryset.filter(**{f'{field}__lte': end_date})
+    return queryset
+
+
+def parse_page_size(query_params, default, maximum):
+    """Read page_size from query params, clamped to 1..maximum"""
+    try:
+        page_size = int(query_params.get('page_size', default))
+    except (TypeError, ValueError):
+        raise ValueError('page_size must be an integer')
+    return max(1, min(page_size, maximum))
+
+
+def encode_cursor(position):
+    """Encode a keyset position (a JSON-serializable dict) as an opaque cursor"""
+    raw = json.dumps(position, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor. Raises ValueError if malformed."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(position, dict):
+        raise ValueError('Invalid cursor')
+    return position
+
+
+def estimated_count(queryset):
+    """
+    Row count of a queryset from the planner's estimate on PostgreSQL, without
+    scanning the rows; an exact COUNT(*) on other backends.
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return queryset.count()
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
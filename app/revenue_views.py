@@ -4,7 +4,9 @@ from rest_framework import status
 from django.db.models import Sum
 from collections import defaultdict
 from decimal import Decimal
-from .models import TruckingAccount, AllowanceAccount, FuelAccount
+from .models import AllowanceAccount, FuelAccount
+from .archive import ledger_queryset
+from .report_cache import cached_report
 
 
 class RevenueStreamsView(APIView):
@@ -12,10 +14,14 @@ class RevenueStreamsView(APIView):
     GET: Get revenue and expense streams data
     """
     
+    @cached_report('revenue_streams', stale_while_revalidate=True)
     def get(self, request):
         try:
+            # Whole ledger, including archived periods
+            ledger = ledger_queryset()
+            
             # Get hauling income accounts from TruckingAccount
-            hauling_accounts = TruckingAccount.objects.filter(account_type__name='Hauling Income')
+            hauling_accounts = ledger.filter(account_type__name='Hauling Income')
             
             # Initialize revenue streams
             front_load_amount = Decimal('0.00')
@@ -75,29 +81,29 @@ class RevenueStreamsView(APIView):
             
             # Calculate expense streams from TruckingAccount
             # Get allowance amounts (Driver's Allowance)
-            allowance_amount = TruckingAccount.objects.filter(account_type__name='Driver\'s Allowance').aggregate(
+            allowance_amount = ledger.filter(account_type__name='Driver\'s Allowance').aggregate(
                 total=Sum('final_total')
             )['total'] or 0
             
             # Get fuel amounts (Fuel and Oil)
-            fuel_amount = TruckingAccount.objects.filter(account_type__name='Fuel and Oil').aggregate(
+            fuel_amount = ledger.filter(account_type__name='Fuel and Oil').aggregate(
                 total=Sum('final_total')
             )['total'] or 0
             
             # Get OPEX amounts by account types - sum actual values (negative values will be subtracted)
-            insurance_records = TruckingAccount.objects.filter(account_type__name='Insurance Expense')
+            insurance_records = ledger.filter(account_type__name='Insurance Expense')
             insurance_amount = sum(float(record.final_total) for record in insurance_records)
             
-            repairs_records = TruckingAccount.objects.filter(account_type__name='Repairs and Maintenance Expense')
+            repairs_records = ledger.filter(account_type__name='Repairs and Maintenance Expense')
             repairs_amount = sum(float(record.final_total) for record in repairs_records)
             
-            taxes_permits_records = TruckingAccount.objects.filter(account_type__name='Taxes, Permits and Licenses Expense')
+            taxes_permits_records = ledger.filter(account_type__name='Taxes, Permits and Licenses Expense')
             taxes_permits_amount = sum(float(record.final_total) for record in taxes_permits_records)
             
-            salaries_records = TruckingAccount.objects.filter(account_type__name='Salaries and Wages')
+            salaries_records = ledger.filter(account_type__name='Salaries and Wages')
             salaries_amount = sum(float(record.final_total) for record in salaries_records)
             
-            tax_records = TruckingAccount.objects.filter(account_type__name='Tax Expense')
+            tax_records = ledger.filter(account_type__name='Tax Expense')
             tax_amount = sum(float(record.final_total) for record in tax_records)
             
             # Calculate total OPEX (excluding Driver's Allowance and Fuel)
@@ -258,6 +258,7 @@ class TruckingAccountSerializer(serializers.ModelSerializer):
     back_load_id = serializers.PrimaryKeyRelatedField(queryset=LoadType.objects.all(), source='back_load', write_only=True, required=False)
     locked_at = serializers.DateTimeField(read_only=True)
     created_at = serializers.DateTimeField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
     
     driver_id = serializers.PrimaryKeyRelatedField(queryset=Driver.objects.all(), source='driver', write_only=True, required=False)
     route_id = serializers.PrimaryKeyRelatedField(queryset=Route.objects.all(), source='route', write_only=True, required=False)
@@ -292,8 +293,9 @@ class TruckingAccountSerializer(serializers.ModelSerializer):
             'is_locked',
             'locked_at',
             'created_at',
+            'updated_at',
         ]
-        read_only_fields = ['id', 'is_locked', 'locked_at', 'created_at']
+        read_only_fields = ['id', 'is_locked', 'locked_at', 'created_at', 'updated_at']
 
     def update(self, instance, validated_data):
         if instance.is_locked:
@@ -301,6 +303,19 @@ class TruckingAccountSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
+class TruckingAccountBulkSerializer(TruckingAccountSerializer):
+    """
+    Input of the bulk create/patch endpoints: related objects are plain ids validated
+    (without a query per row) by app.trucking_bulk, which checks each id set at once.
+    """
+    account_type_id = serializers.IntegerField(write_only=True, required=False)
+    truck_id = serializers.IntegerField(write_only=True, required=False)
+    driver_id = serializers.IntegerField(write_only=True, required=False)
+    route_id = serializers.IntegerField(write_only=True, required=False)
+    front_load_id = serializers.IntegerField(write_only=True, required=False)
+    back_load_id = serializers.IntegerField(write_only=True, required=False)
+
+
 class SalaryAccountSerializer(serializers.ModelSerializer):
     date = serializers.DateField(format='%m/%d/%Y', input_formats=['%m/%d/%Y', '%Y-%m-%d'])
     
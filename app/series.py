@@ -0,0 +1,219 @@
+"""
+Time-bucketed totals per account type, truck or driver.
+
+Locked rows cannot be edited, so a bucket whose dates all lie before the
+earliest unlocked row never changes. Such buckets are cached permanently
+(keyed by the frozen epoch, which moves only when locked history changes);
+only the open tail and partial edge buckets are aggregated per request.
+"""
+import calendar
+import hashlib
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+from .archive import ledger_queryset
+from .models import AccountType, Driver, Truck, TruckingAccount
+from .report_cache import get_frozen_epoch
+from .report_utils import parse_date_range
+
+INTERVALS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+# Series dimension -> (TruckingAccount column, model used to label ids, label field)
+SERIES_DIMENSIONS = {
+    'account_type': ('account_type_id', AccountType, 'name'),
+    'truck': ('truck_id', Truck, 'plate_number'),
+    'driver': ('driver_id', Driver, 'name'),
+}
+MAX_BUCKETS = 5000
+
+
+def bucket_start(value, interval):
+    if interval == 'week':
+        return value - timedelta(days=value.weekday())
+    if interval == 'month':
+        return value.replace(day=1)
+    return value
+
+
+def bucket_end(start, interval):
+    if interval == 'week':
+        return start + timedelta(days=6)
+    if interval == 'month':
+        return start.replace(day=calendar.monthrange(start.year, start.month)[1])
+    return start
+
+
+def next_bucket(start, interval):
+    return bucket_end(start, interval) + timedelta(days=1)
+
+
+def merge_ranges(ranges):
+    """Merge adjacent or overlapping (start, end) date ranges"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class SeriesQuery:
+    """
+    Query params:
+    - interval: day, week or month (default: month)
+    - by: account_type, truck or driver (default: account_type)
+    - account_type: Filter by account type name, repeat for several
+    - start_date / end_date: Date range (default: whole ledger)
+    Raises ValueError for invalid input.
+    """
+
+    def __init__(self, query_params):
+        self.interval = query_params.get('interval', 'month')
+        if self.interval not in INTERVALS:
+            raise ValueError(f'interval must be one of: {", ".join(INTERVALS)}')
+        self.by = query_params.get('by', 'account_type')
+        if self.by not in SERIES_DIMENSIONS:
+            raise ValueError(f'by must be one of: {", ".join(SERIES_DIMENSIONS)}')
+        self.start_date, self.end_date = parse_date_range(query_params)
+        account_types = query_params.getlist('account_type')
+        # Resolve names to ids so frozen buckets survive renames
+        self.account_type_ids = sorted(
+            AccountType.objects.filter(name__in=account_types).values_list('id', flat=True)
+        ) if account_types else None
+        self.column = SERIES_DIMENSIONS[self.by][0]
+
+    def base_queryset(self):
+        queryset = ledger_queryset(self.start_date, self.end_date)
+        if self.account_type_ids is not None:
+            queryset = queryset.filter(account_type_id__in=self.account_type_ids)
+        return queryset
+
+    def signature(self):
+        raw = f'{self.by}:{self.interval}:{self.account_type_ids}'
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def buckets(self):
+        """Bucket start dates covering the requested (or whole ledger) range"""
+        start, end = self.start_date, self.end_date
+        if start is None or end is None:
+            bounds = self.base_queryset().aggregate(first=Min('date'), last=Max('date'))
+            start = start or bounds['first']
+            end = end or bounds['last']
+        if start is None or end is None or start > end:
+            return [], start, end
+        buckets = []
+        current = bucket_start(start, self.interval)
+        while current <= end:
+            buckets.append(current)
+            current = next_bucket(current, self.interval)
+            if len(buckets) > MAX_BUCKETS:
+                raise ValueError(f'Too many buckets (max {MAX_BUCKETS}); use a wider interval or a shorter range')
+        return buckets, start, end
+
+    def aggregate(self, ranges):
+        """
+        One grouped query over the given (start, end) date ranges.
+        Returns {bucket_start: {dimension_id: (total, count)}}.
+        """
+        condition = Q()
+        for start, end in merge_ranges(ranges):
+            condition |= Q(date__gte=start, date__lte=end)
+        rows = self.base_queryset().filter(condition).annotate(
+            bucket=INTERVALS[self.interval]('date')
+        ).values('bucket', self.column).annotate(
+            total=Sum('final_total'), count=Count('id')
+        ).order_by()
+        result = defaultdict(dict)
+        for row in rows:
+            bucket = row['bucket']
+            bucket = bucket.date() if hasattr(bucket, 'date') else bucket
+            result[bucket][row[self.column]] = (row['total'] or 0, row['count'])
+        return result
+
+    def run(self):
+        buckets, start, end = self.buckets()
+        if not buckets:
+            return {'buckets': {}, 'frozen': 0, 'computed': 0}
+
+        # Every bucket ending before the first unlocked row contains only locked rows
+        open_from = TruckingAccount.objects.filter(is_locked=False).aggregate(first=Min('date'))['first']
+        epoch = get_frozen_epoch()
+        signature = self.signature()
+
+        def frozen_key(bucket):
+            return f'series:{signature}:{epoch}:{bucket.isoformat()}'
+
+        frozen_candidates = [
+            bucket for bucket in buckets
+            if bucket >= start and bucket_end(bucket, self.interval) <= end
+            and (open_from is None or bucket_end(bucket, self.interval) < open_from)
+        ]
+        cached = cache.get_many([frozen_key(bucket) for bucket in frozen_candidates])
+        values = {}
+        for bucket in frozen_candidates:
+            if frozen_key(bucket) in cached:
+                values[bucket] = cached[frozen_key(bucket)]
+
+        # Closed buckets not cached yet are computed once and kept permanently
+        missing_frozen = [bucket for bucket in frozen_candidates if bucket not in values]
+        live = [bucket for bucket in buckets if bucket not in values and bucket not in missing_frozen]
+        ranges = [(bucket, bucket_end(bucket, self.interval)) for bucket in missing_frozen]
+        ranges += [(max(bucket, start), min(bucket_end(bucket, self.interval), end)) for bucket in live]
+        if ranges:
+            computed = self.aggregate(ranges)
+            for bucket in missing_frozen + live:
+                values[bucket] = computed.get(bucket, {})
+            if missing_frozen:
+                cache.set_many({frozen_key(bucket): values[bucket] for bucket in missing_frozen}, timeout=None)
+
+        return {
+            'buckets': values,
+            'frozen': len(frozen_candidates) - len(missing_frozen),
+            'computed': len(missing_frozen) + len(live),
+        }
+
+    def labels(self, ids):
+        _, model, field = SERIES_DIMENSIONS[self.by]
+        return dict(model.objects.filter(id__in=ids).values_list('id', field))
+
+
+def run_series(query_params):
+    """Parse and run a series request, returning the response payload"""
+    query = SeriesQuery(query_params)
+    result = query.run()
+    ordered_buckets = sorted(result['buckets'])
+
+    points_by_id = defaultdict(list)
+    for bucket in ordered_buckets:
+        for dimension_id, (total, count) in result['buckets'][bucket].items():
+            points_by_id[dimension_id].append({
+                'bucket': bucket.strftime('%Y-%m-%d'),
+                'total': float(total),
+                'count': count,
+            })
+    labels = query.labels([dimension_id for dimension_id in points_by_id if dimension_id])
+    series = [
+        {
+            'id': dimension_id,
+            'name': labels.get(dimension_id, 'Unknown') if dimension_id else 'Unknown',
+            'points': points,
+        }
+        for dimension_id, points in points_by_id.items()
+    ]
+    series.sort(key=lambda item: (item['name'] or '', item['id'] or 0))
+    return {
+        'interval': query.interval,
+        'by': query.by,
+        'buckets': [bucket.strftime('%Y-%m-%d') for bucket in ordered_buckets],
+        'series': series,
+        'frozen_buckets': result['frozen'],
+        'computed_buckets': result['computed'],
+    }
@@ -0,0 +1,29 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from .report_cache import cached_report
+from .series import run_series
+
+
+class ReportSeriesView(APIView):
+    """
+    GET: Totals per day/week/month for each account type, truck or driver
+    Query params:
+    - interval: day, week or month (default: month)
+    - by: account_type, truck or driver (default: account_type)
+    - account_type: Filter by account type name, repeat for several
+    - start_date / end_date: Date range (YYYY-MM-DD or MM/DD/YYYY)
+    Buckets made only of locked rows are served from a permanent cache.
+    """
+
+    @cached_report('series')
+    def get(self, request):
+        try:
+            return Response(run_series(request.query_params), status=status.HTTP_200_OK)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response(
+                {'error': f'Failed to compute report series: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -12,9 +12,16 @@ from datetime import datetime, date
 import re
 from .models import (
     TruckingAccount, Driver, Route, Truck, TruckType, 
-    AccountType, LoadType
+    AccountType, LoadType, normalize_plate
 )
 from .trucking_upload_view import clean_load_value, is_valid_load
+from .archive import archive_closed_periods, ledger_queryset
+from .partitions import maintain_partitions
+from .ledger_events import ledger_changed
+from .report_cache import refresh_report, refresh_report_variants, standard_report_variants, warm_reports
+from .payroll import reconcile_payroll
+from .periods import rebuild_stale_periods
+from .trips import trucks_by_plate
 
 
 def normalize_account_number_for_dedup(account_number):
@@ -281,7 +288,8 @@ def process_trucking_upload(self, file_path, exclude_preview_indices=None, task_
             df = df[df['account_type'].notna() & (df['account_type'] != '')]
         
         # Validate truck_type and plate_number against database
-        valid_trucks = Truck.objects.select_related('truck_type').all()
+        uploaded_plates = df['plate_number'].dropna() if 'plate_number' in df.columns else []
+        valid_trucks = trucks_by_plate(uploaded_plates).values()
         
         def standardize_plate(plate_str):
             if pd.isna(plate_str) or plate_str == '' or plate_str is None:
@@ -289,17 +297,15 @@ def process_trucking_upload(self, file_path, exclude_preview_indices=None, task_
             return str(plate_str).strip().upper().replace(' ', '').replace('-', '').replace('_', '')
         
         truck_plate_map = {}
-        truck_type_names = set()
+        truck_type_names = set(TruckType.objects.filter(truck__isnull=False).values_list('name', flat=True))
         for truck in valid_trucks:
             if truck.plate_number:
-                plate_key = standardize_plate(truck.plate_number)
+                plate_key = truck.plate_normalized
                 truck_plate_map[plate_key] = {
                     'plate_number': truck.plate_number,
                     'truck_type': truck.truck_type.name if truck.truck_type else None,
                     'truck': truck
                 }
-                if truck.truck_type:
-                    truck_type_names.add(truck.truck_type.name)
         
         if 'plate_number' in df.columns or 'truck_type' in df.columns:
             def validate_truck_data(row):
@@ -765,7 +771,7 @@ def process_trucking_upload(self, file_path, exclude_preview_indices=None, task_
         total_rows = len(df)
         
         # Get existing accounts for duplicate checking
-        existing_accounts = TruckingAccount.objects.all().values(
+        existing_accounts = ledger_queryset().values(
             'account_number', 'account_type_id', 'date', 'created_at'
         )
         existing_account_map = {}
@@ -780,6 +786,7 @@ def process_trucking_upload(self, file_path, exclude_preview_indices=None, task_
         batch_created_at = timezone.now()
         BATCH_SIZE = 100
         accounts_to_create = []
+        trip_keys = set()
         created_count = 0
         duplicate_count = 0
         errors = []
@@ -877,7 +884,7 @@ def process_trucking_upload(self, file_path, exclude_preview_indices=None, task_
                         if truck_type_str:
                             truck_type_instance, _ = TruckType.objects.get_or_create(name=truck_type_str)
                         
-                        existing_truck = Truck.objects.filter(plate_number=plate_number_standardized).first()
+                        existing_truck = Truck.objects.filter(plate_normalized=normalize_plate(plate_number_standardized)).first()
                         if existing_truck:
                             truck_instance = existing_truck
                         else:
@@ -921,6 +928,8 @@ def process_trucking_upload(self, file_path, exclude_preview_indices=None, task_
                 )
                 account.created_at = batch_created_at
                 accounts_to_create.append(account)
+                # Truck-less rows have no trip but still move account balances
+                trip_keys.add((truck_instance.id if truck_instance else None, account_date_value))
                 
                 # Bulk create when batch is full
                 if len(accounts_to_create) >= BATCH_SIZE:
@@ -957,6 +966,23 @@ def process_trucking_upload(self, file_path, exclude_preview_indices=None, task_
                     except Exception as save_error:
                         errors.append(f"Final batch: {str(save_error)}")
         
+        # Refresh trips and cached reports touched by this upload
+        ledger_changed(trip_keys)
+        
+        # Warm the dashboard reports so they are hot when the progress bar completes
+        cache.set(progress_key, {
+            'status': 'processing',
+            'progress': 97,
+            'total_rows': total_rows,
+            'processed_rows': total_rows,
+            'created_count': created_count,
+            'duplicate_count': duplicate_count,
+            'error_count': len(errors),
+            'errors': errors[-10:],
+            'message': 'Preparing reports...'
+        }, timeout=3600)
+        cache_warmup = warm_report_cache()
+        
         # Update final progress
         cache.set(progress_key, {
             'status': 'completed',
@@ -968,7 +994,8 @@ def process_trucking_upload(self, file_path, exclude_preview_indices=None, task_
             'error_count': len(errors),
             'errors': errors[:50],
             'message': f'Upload completed! Created {created_count} accounts.',
-            'parsing_stats': parsing_stats
+            'parsing_stats': parsing_stats,
+            'cache_warmup': cache_warmup
         }, timeout=3600)
         
         # Clean up file
@@ -981,7 +1008,8 @@ def process_trucking_upload(self, file_path, exclude_preview_indices=None, task_
             'duplicate_count': duplicate_count,
             'error_count': len(errors),
             'errors': errors[:50],
-            'parsing_stats': parsing_stats
+            'parsing_stats': parsing_stats,
+            'cache_warmup': cache_warmup
         }
         
     except Exception as e:
@@ -1006,3 +1034,80 @@ def process_trucking_upload(self, file_path, exclude_preview_indices=None, task_
             os.remove(file_path)
         
         raise
+
+
+@shared_task
+def refresh_report_cache(name, query_string):
+    """
+    Background task to recompute a cached report for the current ledger generation
+    (stale-while-revalidate: requests keep getting the previous version meanwhile)
+    """
+    return refresh_report(name, query_string)
+
+
+@shared_task
+def refresh_stale_reports(name):
+    """
+    Background task to recompute the recently requested variants of a
+    stale-while-revalidate report after writes (queued once per burst of writes)
+    """
+    return refresh_report_variants(name)
+
+
+@shared_task
+def warm_report_cache():
+    """
+    Pre-compute the standard dashboard reports for the current ledger generation.
+    Returns per-report timings and the total warm-up time in seconds.
+    """
+    timings = warm_reports(standard_report_variants())
+    return {
+        'reports': timings,
+        'total_seconds': round(sum(t['seconds'] for t in timings.values()), 3),
+    }
+
+
+@shared_task
+def run_payroll_reconciliation(task_id, start_date, end_date, tolerance_days):
+    """
+    Background task to reconcile driver payroll and allowances for a pay period.
+    Status and result are stored under payroll_reconciliation_{task_id}.
+    """
+    result_key = f'payroll_reconciliation_{task_id}'
+    cache.set(result_key, {'status': 'processing', 'task_id': task_id}, timeout=3600)
+    try:
+        result = reconcile_payroll(
+            datetime.strptime(start_date, '%Y-%m-%d').date(),
+            datetime.strptime(end_date, '%Y-%m-%d').date(),
+            tolerance_days,
+        )
+        cache.set(result_key, {'status': 'completed', 'task_id': task_id, 'result': result}, timeout=3600)
+    except Exception as e:
+        cache.set(result_key, {
+            'status': 'error',
+            'task_id': task_id,
+            'message': f'Payroll reconciliation failed: {str(e)}',
+        }, timeout=3600)
+        raise
+
+
+@shared_task
+def rebuild_period_aggregates():
+    """Recompute the frozen aggregates of closed periods marked stale"""
+    return rebuild_stale_periods()
+
+
+@shared_task
+def archive_ledger(before=None):
+    """
+    Move the rows of closed periods ending before `before` (YYYY-MM-DD, default:
+    LEDGER_ARCHIVE_AFTER_DAYS ago) into the ledger archive
+    """
+    before_date = datetime.strptime(before, '%Y-%m-%d').date() if before else None
+    return archive_closed_periods(before_date)
+
+
+@shared_task
+def maintain_ledger_partitions(months_ahead=None):
+    """Create the coming monthly ledger partitions and empty the default partition (PostgreSQL only)"""
+    return maintain_partitions(months_ahead)
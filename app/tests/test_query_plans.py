@@ -0,0 +1,14 @@
+from django.test import TestCase
+
+from app.query_plans import check_query_plans
+
+
+class QueryPlanTests(TestCase):
+    """The hot ledger queries must be served by an index (see app.query_plans)"""
+
+    def test_hot_queries_do_not_scan_tables(self):
+        results = check_query_plans(seed=2000)
+        self.assertTrue(results)
+        for name, passed, plan in results:
+            with self.subTest(query=name):
+                self.assertTrue(passed, f'{name} scans a table:\n{plan}')
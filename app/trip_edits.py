@@ -0,0 +1,163 @@
+"""
+Batch edits of trip fields (route, driver, front/back load).
+
+A batch is a list of (plate_number, date, field, value) edits. Trips are found
+with one query over every plate and date, their rows (and locked rows among
+them) with one query over every trip, dimension names are resolved (and missing
+ones created) with a couple of queries per dimension, and the rows are updated
+with one UPDATE per distinct (field, value) over the trip ids it applies to,
+all in one transaction.
+"""
+from collections import defaultdict
+from datetime import datetime
+
+from django.db import transaction
+from django.utils import timezone
+
+from .ledger_events import ledger_changed
+from .models import Driver, LoadType, Route, Trip, TruckingAccount, normalize_plate
+
+TRIP_EDIT_MAX = 1000
+
+# Editable trip field -> (TruckingAccount column, dimension model)
+TRIP_EDIT_FIELDS = {
+    'trip_route': ('route_id', Route),
+    'driver': ('driver_id', Driver),
+    'front_load': ('front_load_id', LoadType),
+    'back_load': ('back_load_id', LoadType),
+}
+
+
+class TripEditError(Exception):
+    """Per-edit errors: a list aligned with the edits, {} for valid ones"""
+
+    def __init__(self, errors):
+        super().__init__('Some edits cannot be applied')
+        self.errors = errors
+
+
+def parse_edits(edits):
+    """
+    Validate the shape of a batch. Returns [(normalized plate, date, field, value)].
+    Raises ValueError for a malformed batch and TripEditError for invalid edits.
+    """
+    if not isinstance(edits, list) or not edits:
+        raise ValueError('Provide a non-empty array of edits')
+    if len(edits) > TRIP_EDIT_MAX:
+        raise ValueError(f'At most {TRIP_EDIT_MAX} edits can be sent at once')
+    parsed = []
+    errors = []
+    seen = set()
+    for edit in edits:
+        if not isinstance(edit, dict):
+            raise ValueError('Every edit must be an object with plate_number, date, field and value')
+        plate = normalize_plate(edit.get('plate_number') or '')
+        field = edit.get('field')
+        value = edit.get('value')
+        edit_errors = {}
+        if not plate:
+            edit_errors['plate_number'] = ['This field is required.']
+        try:
+            trip_date = datetime.strptime(str(edit.get('date')), '%Y-%m-%d').date()
+        except ValueError:
+            trip_date = None
+            edit_errors['date'] = ['Invalid date format. Use YYYY-MM-DD']
+        if field not in TRIP_EDIT_FIELDS:
+            edit_errors['field'] = [f'Invalid field. Must be one of: {", ".join(TRIP_EDIT_FIELDS)}']
+        if value is not None and not isinstance(value, str):
+            edit_errors['value'] = ['Must be a string or null.']
+        key = (plate, trip_date, field)
+        if not edit_errors and key in seen:
+            edit_errors['non_field_errors'] = ['The same field of a trip is edited twice.']
+        seen.add(key)
+        errors.append(edit_errors)
+        parsed.append((plate, trip_date, field, value or None))
+    if any(errors):
+        raise TripEditError(errors)
+    return parsed
+
+
+def resolve_names(model, names):
+    """{name: id} for dimension names, creating the missing ones (the oldest row wins on duplicates)"""
+    if not names:
+        return {}
+    ids = {}
+    for row_id, name in model.objects.filter(name__in=names).order_by('id').values_list('id', 'name'):
+        ids.setdefault(name, row_id)
+    missing = [model(name=name) for name in sorted(names) if name not in ids]
+    if missing:
+        model.objects.bulk_create(missing)
+        ids.update((obj.name, obj.id) for obj in missing)
+    return ids
+
+
+def apply_trip_edits(edits):
+    """
+    Apply a batch of trip field edits atomically. Returns a list aligned with the
+    edits of {'trip_id', 'updated_count'}. Raises ValueError / TripEditError (nothing
+    is written) when an edit is malformed, its trip does not exist or has locked rows.
+    """
+    parsed = parse_edits(edits)
+    keys = {(plate, trip_date) for plate, trip_date, _, _ in parsed}
+
+    with transaction.atomic():
+        trips = {}
+        for trip in Trip.objects.filter(
+            truck__plate_normalized__in={plate for plate, _ in keys},
+            date__in={trip_date for _, trip_date in keys},
+        ).order_by('id').values('id', 'truck_id', 'date', 'truck__plate_normalized'):
+            key = (trip['truck__plate_normalized'], trip['date'])
+            # The IN filters also match other plate/date combinations
+            if key in keys:
+                trips.setdefault(key, trip)
+
+        trip_ids = {trip['id'] for trip in trips.values()}
+        counts = defaultdict(int)
+        locked = defaultdict(list)
+        for trip_id, account_id, is_locked in TruckingAccount.objects.filter(
+            trip_id__in=trip_ids
+        ).values_list('trip_id', 'id', 'is_locked'):
+            counts[trip_id] += 1
+            if is_locked:
+                locked[trip_id].append(account_id)
+
+        errors = []
+        for plate, trip_date, _, _ in parsed:
+            trip = trips.get((plate, trip_date))
+            if trip is None:
+                errors.append({'non_field_errors': ['No matching trucking accounts found']})
+            elif not counts[trip['id']]:
+                # Trips of archived periods keep their rows in the (locked) archive
+                errors.append({'non_field_errors': ['The trucking accounts of this trip are archived and cannot be modified.']})
+            elif locked[trip['id']]:
+                errors.append({
+                    'non_field_errors': ['Some trucking accounts of this trip are locked and cannot be modified.'],
+                    'locked_account_ids': sorted(locked[trip['id']]),
+                })
+            else:
+                errors.append({})
+        if any(errors):
+            raise TripEditError(errors)
+
+        names = defaultdict(set)
+        for _, _, field, value in parsed:
+            if value:
+                names[TRIP_EDIT_FIELDS[field][1]].add(value)
+        name_ids = {model: resolve_names(model, model_names) for model, model_names in names.items()}
+
+        # One UPDATE per (column, value) over every trip it applies to
+        updates = defaultdict(set)
+        for plate, trip_date, field, value in parsed:
+            column, model = TRIP_EDIT_FIELDS[field]
+            updates[(column, name_ids[model][value] if value else None)].add(trips[(plate, trip_date)]['id'])
+        now = timezone.now()
+        for (column, value_id), update_trip_ids in updates.items():
+            TruckingAccount.objects.filter(trip_id__in=update_trip_ids).update(**{column: value_id, 'updated_at': now})
+
+        ledger_changed([(trip['truck_id'], trip['date']) for trip in trips.values()])
+
+    results = []
+    for plate, trip_date, _, _ in parsed:
+        trip_id = trips[(plate, trip_date)]['id']
+        results.append({'trip_id': trip_id, 'updated_count': counts[trip_id]})
+    return results
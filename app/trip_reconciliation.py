@@ -0,0 +1,118 @@
+"""
+Trip reconciliation: classify every (truck, date) group of the ledger by the
+account types present and flag anomalies.
+
+The whole ledger is classified by one grouped query (per-category row counts
+with conditional COUNTs); anomaly classes are HAVING conditions on those
+counts, so counting and filtering happen in the database. Only the requested
+page is turned into Python dicts.
+"""
+from django.db.models import BooleanField, Count, ExpressionWrapper, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .archive import ledger_queryset
+from .trips import filter_plate
+from .report_utils import (
+    DRIVERS_ALLOWANCE,
+    FUEL_AND_OIL,
+    HAULING_INCOME,
+    INSURANCE_EXPENSE,
+    REPAIRS_AND_MAINTENANCE,
+    SALARIES_AND_WAGES,
+    TAX_EXPENSE,
+    TAXES_PERMITS_LICENSES,
+    apply_date_range,
+)
+
+# Category -> account type name counted per group
+CATEGORIES = {
+    'income': HAULING_INCOME,
+    'fuel': FUEL_AND_OIL,
+    'allowance': DRIVERS_ALLOWANCE,
+    'insurance': INSURANCE_EXPENSE,
+    'repairs': REPAIRS_AND_MAINTENANCE,
+    'taxes_permits': TAXES_PERMITS_LICENSES,
+    'tax': TAX_EXPENSE,
+    'salaries': SALARIES_AND_WAGES,
+}
+
+# A trip carries at most a front and a back load, so more income rows are duplicates
+MAX_INCOME_ROWS = 2
+
+# Anomaly class -> condition on the group annotations
+ANOMALY_CLASSES = {
+    'income_without_fuel': Q(income_count__gt=0, fuel_count=0),
+    'missing_income': Q(income_count=0, fuel_count__gt=0),
+    'allowance_without_trip': Q(income_count=0, allowance_count__gt=0),
+    'duplicate_income': Q(income_count__gt=MAX_INCOME_ROWS),
+    'no_truck': Q(truck_key=0),
+}
+
+
+def _any_anomaly():
+    condition = Q()
+    for anomaly in ANOMALY_CLASSES.values():
+        condition |= anomaly
+    return condition
+
+
+def reconciliation_groups(start_date=None, end_date=None, plate_number=None):
+    """
+    One row per (truck, date) with per-category row counts, the income total
+    and an is_<class> flag per anomaly class. Truck-less rows have truck_key 0.
+    """
+    queryset = apply_date_range(ledger_queryset(start_date, end_date), start_date, end_date)
+    if plate_number:
+        queryset = filter_plate(queryset, plate_number)
+    counts = {
+        f'{category}_count': Count('id', filter=Q(account_type__name=name))
+        for category, name in CATEGORIES.items()
+    }
+    groups = queryset.annotate(
+        truck_key=Coalesce('truck_id', Value(0)),
+    ).values('date', 'truck_key').annotate(
+        entry_count=Count('id'),
+        income_total=Sum('final_total', filter=Q(account_type__name=HAULING_INCOME)),
+        **counts
+    )
+    return groups.annotate(**{
+        f'is_{anomaly}': ExpressionWrapper(condition, output_field=BooleanField())
+        for anomaly, condition in ANOMALY_CLASSES.items()
+    })
+
+
+def anomaly_counts(groups):
+    """Number of groups in each anomaly class, plus total and clean groups, in one query"""
+    any_anomaly = _any_anomaly()
+    return groups.aggregate(
+        total_groups=Count('truck_key'),
+        clean=Count('truck_key', filter=~any_anomaly),
+        **{anomaly: Count('truck_key', filter=condition) for anomaly, condition in ANOMALY_CLASSES.items()}
+    )
+
+
+def filter_groups(groups, anomalies=None, include_clean=False):
+    """Restrict to groups in any of the given anomaly classes (default: any class)"""
+    if anomalies:
+        condition = Q()
+        for anomaly in anomalies:
+            condition |= ANOMALY_CLASSES[anomaly]
+        return groups.filter(condition)
+    if include_clean:
+        return groups
+    return groups.filter(_any_anomaly())
+
+
+def describe_group(group):
+    """Response row for one group"""
+    return {
+        'date': group['date'].strftime('%Y-%m-%d'),
+        'truck_id': group['truck_key'] or None,
+        'entry_count': group['entry_count'],
+        'income_total': float(group['income_total'] or 0),
+        'account_types': [
+            CATEGORIES[category] for category in CATEGORIES if group[f'{category}_count']
+        ],
+        'counts': {category: group[f'{category}_count'] for category in CATEGORIES},
+        'anomalies': [anomaly for anomaly in ANOMALY_CLASSES if group[f'is_{anomaly}']],
+    }
@@ -0,0 +1,98 @@
+from django.db.models import Q
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from .models import Truck
+from .report_cache import cached_report
+from .report_utils import decode_cursor, encode_cursor, parse_date_param, parse_date_range, parse_page_size
+from .trip_reconciliation import (
+    ANOMALY_CLASSES,
+    anomaly_counts,
+    describe_group,
+    filter_groups,
+    reconciliation_groups,
+)
+from .trips import standardize_plate
+
+RECONCILIATION_DEFAULT_PAGE_SIZE = 200
+RECONCILIATION_MAX_PAGE_SIZE = 1000
+
+
+class TripReconciliationView(APIView):
+    """
+    GET: Classify every (truck, date) group by the account types present and flag anomalies
+    Anomaly classes: income_without_fuel, missing_income (fuel but no income),
+    allowance_without_trip (allowance but no income), duplicate_income (more than
+    two income rows) and no_truck (rows without a truck).
+    Query params:
+    - start_date / end_date: Date range (YYYY-MM-DD or MM/DD/YYYY)
+    - plate_number: Only groups of this truck
+    - anomaly: Only groups in this class, repeat for several (default: any class)
+    - include_clean: 1 to list groups without anomalies too
+    - page_size: Groups per page (default 200, max 1000)
+    - cursor: next_cursor from the previous page
+    counts holds the number of groups per class over the whole filtered range.
+    """
+
+    @cached_report('trip_reconciliation')
+    def get(self, request):
+        try:
+            start_date, end_date = parse_date_range(request.query_params)
+            anomalies = request.query_params.getlist('anomaly')
+            unknown = [anomaly for anomaly in anomalies if anomaly not in ANOMALY_CLASSES]
+            if unknown:
+                raise ValueError(f'Unknown anomaly: {", ".join(unknown)}. Valid: {", ".join(ANOMALY_CLASSES)}')
+            include_clean = request.query_params.get('include_clean') in ('1', 'true')
+            page_size = parse_page_size(
+                request.query_params, RECONCILIATION_DEFAULT_PAGE_SIZE, RECONCILIATION_MAX_PAGE_SIZE
+            )
+            position = decode_cursor(request.query_params.get('cursor'))
+            after_date = parse_date_param(position['date']) if position else None
+            after_truck = int(position['truck_id']) if position else None
+        except (ValueError, KeyError, TypeError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            plate_number = standardize_plate(request.query_params.get('plate_number'))
+            groups = reconciliation_groups(start_date, end_date, plate_number)
+            counts = anomaly_counts(groups)
+
+            page_groups = filter_groups(groups, anomalies, include_clean)
+            if after_date:
+                page_groups = page_groups.filter(
+                    Q(date__gt=after_date) | Q(date=after_date, truck_key__gt=after_truck)
+                )
+            page = list(page_groups.order_by('date', 'truck_key')[:page_size + 1])
+            has_more = len(page) > page_size
+            page = page[:page_size]
+
+            plates = dict(Truck.objects.filter(
+                id__in={group['truck_key'] for group in page if group['truck_key']}
+            ).values_list('id', 'plate_number'))
+            rows = []
+            for group in page:
+                row = describe_group(group)
+                row['plate_number'] = plates.get(group['truck_key'])
+                rows.append(row)
+
+            next_cursor = None
+            if has_more:
+                last = page[-1]
+                next_cursor = encode_cursor({
+                    'date': last['date'].strftime('%Y-%m-%d'),
+                    'truck_id': last['truck_key'],
+                })
+            response = Response({
+                'counts': counts,
+                'rows': rows,
+                'next_cursor': next_cursor,
+            }, status=status.HTTP_200_OK)
+            if next_cursor:
+                response['X-Next-Cursor'] = next_cursor
+            return response
+
+        except Exception as e:
+            return Response(
+                {'error': f'Failed to reconcile trips: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
@@ -0,0 +1,251 @@
+"""
+Trip materialization: keeps the Trip table in sync with TruckingAccount rows.
+
+A trip is every TruckingAccount row of one truck on one date. Write paths
+collect the (truck_id, date) keys they touch and call sync_trips(), which
+recomputes only those trips with grouped queries.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .archive import ledger_queryset
+from .models import Trip, Truck, TruckingAccount, normalize_plate
+from .report_utils import (
+    HAULING_INCOME,
+    FUEL_AND_OIL,
+    DRIVERS_ALLOWANCE,
+    INSURANCE_EXPENSE,
+    REPAIRS_AND_MAINTENANCE,
+    TAXES_PERMITS_LICENSES,
+    TAX_EXPENSE,
+    SALARIES_AND_WAGES,
+)
+
+SYNC_CHUNK_SIZE = 500
+
+# Trip fields copied from the grouped query on every sync
+TRIP_TOTAL_FIELDS = [
+    'income_total', 'fuel_total', 'fuel_liters', 'fuel_price', 'allowance_total',
+    'insurance_total', 'repairs_total', 'taxes_permits_total', 'tax_total',
+    'salaries_total', 'entry_count',
+]
+TRIP_DIMENSION_FIELDS = ['driver_id', 'route_id', 'front_load_id', 'back_load_id']
+TRIP_INCOME_FIELDS = [
+    'account_number', 'reference_number', 'remarks', 'front_load_amount', 'back_load_amount',
+    'front_load_reference_number', 'back_load_reference_number',
+]
+TRIP_UPDATE_FIELDS = TRIP_TOTAL_FIELDS + TRIP_DIMENSION_FIELDS + TRIP_INCOME_FIELDS + ['updated_at']
+
+
+def trip_groups_queryset(queryset):
+    """
+    Aggregate TruckingAccount rows into one row per (date, truck) trip.
+    All expense categories are computed with conditional sums in a single grouped query.
+    """
+    income = Q(account_type__name=HAULING_INCOME)
+    fuel = Q(account_type__name=FUEL_AND_OIL)
+    return queryset.values('date', 'truck_id').annotate(
+        income_total=Sum('final_total', filter=income),
+        fuel_total=Sum('final_total', filter=fuel),
+        fuel_liters=Sum('quantity', filter=fuel),
+        fuel_price=Max('price', filter=fuel),
+        allowance_total=Sum('final_total', filter=Q(account_type__name=DRIVERS_ALLOWANCE)),
+        insurance_total=Sum('final_total', filter=Q(account_type__name=INSURANCE_EXPENSE)),
+        repairs_total=Sum('final_total', filter=Q(account_type__name=REPAIRS_AND_MAINTENANCE)),
+        taxes_permits_total=Sum('final_total', filter=Q(account_type__name=TAXES_PERMITS_LICENSES)),
+        tax_total=Sum('final_total', filter=Q(account_type__name=TAX_EXPENSE)),
+        salaries_total=Sum('final_total', filter=Q(account_type__name=SALARIES_AND_WAGES)),
+        entry_count=Count('id'),
+        # Prefer the values recorded on income rows, fall back to any row of the trip
+        trip_driver_id=Coalesce(Max('driver_id', filter=income), Max('driver_id')),
+        trip_route_id=Coalesce(Max('route_id', filter=income), Max('route_id')),
+        trip_front_load_id=Coalesce(Max('front_load_id', filter=income), Max('front_load_id')),
+        trip_back_load_id=Coalesce(Max('back_load_id', filter=income), Max('back_load_id')),
+    ).order_by('date', 'truck_id')
+
+
+def allocate_income(income_rows):
+    """
+    Split hauling income rows of one trip into front/back load amounts.
+    Rows are grouped by reference number:
+    - single entry: both loads set -> split in half, otherwise all to the load that is set
+    - multiple entries: first is front_load, the rest are back_load
+    """
+    result = {
+        'account_number': '',
+        'reference_number': '',
+        'remarks': '',
+        'front_load_amount': Decimal('0.00'),
+        'back_load_amount': Decimal('0.00'),
+        'front_load_reference_number': '',
+        'back_load_reference_number': '',
+    }
+    by_reference = defaultdict(list)
+    for row in income_rows:
+        by_reference[row['reference_number'] or ''].append(row)
+
+    for ref_num, rows in by_reference.items():
+        for i, row in enumerate(rows):
+            amount = row['final_total'] or Decimal('0.00')
+            result['account_number'] = row['account_number'] or ''
+            result['remarks'] = row['remarks'] or ''
+            if len(rows) == 1:
+                result['reference_number'] = ref_num
+                if row['front_load_id'] and row['back_load_id']:
+                    result['front_load_amount'] += amount / 2
+                    result['back_load_amount'] += amount / 2
+                    result['front_load_reference_number'] = ref_num
+                    result['back_load_reference_number'] = ref_num
+                elif row['back_load_id']:
+                    result['back_load_amount'] += amount
+                    result['back_load_reference_number'] = ref_num
+                elif row['front_load_id']:
+                    result['front_load_amount'] += amount
+                    result['front_load_reference_number'] = ref_num
+            elif i == 0:
+                result['front_load_amount'] += amount
+                result['front_load_reference_number'] = ref_num
+            else:
+                result['back_load_amount'] += amount
+                result['back_load_reference_number'] = ref_num
+    return result
+
+
+def trip_keys_for(queryset):
+    """Return the set of (truck_id, date) trip keys covered by a TruckingAccount queryset"""
+    return set(
+        queryset.filter(truck__isnull=False).values_list('truck_id', 'date').distinct()
+    )
+
+
+def standardize_plate(plate):
+    """Standardize plate number for matching (see models.normalize_plate)"""
+    return normalize_plate(plate)
+
+
+def filter_plate(queryset, plate_number, field='truck__plate_normalized'):
+    """Restrict to rows whose truck plate matches plate_number in any formatting (indexed column)"""
+    return queryset.filter(**{field: normalize_plate(plate_number)})
+
+
+def trucks_by_plate(plates):
+    """{normalized plate: Truck} for the given plates, in one indexed query"""
+    normalized = {normalize_plate(plate) for plate in plates} - {''}
+    trucks = Truck.objects.filter(plate_normalized__in=normalized).select_related('truck_type').order_by('id')
+    return {truck.plate_normalized: truck for truck in trucks}
+
+
+def find_trip(plate_number, trip_date):
+    """Find the Trip of a truck (by plate number, any formatting) on a date"""
+    return filter_plate(Trip.objects.filter(date=trip_date), plate_number).select_related('truck').first()
+
+
+def _apply_group(trip, group, income):
+    for field in TRIP_TOTAL_FIELDS:
+        setattr(trip, field, group[field] or 0)
+    trip.driver_id = group['trip_driver_id']
+    trip.route_id = group['trip_route_id']
+    trip.front_load_id = group['trip_front_load_id']
+    trip.back_load_id = group['trip_back_load_id']
+    for field in TRIP_INCOME_FIELDS:
+        setattr(trip, field, income[field])
+
+
+def _sync_chunk(keys):
+    truck_ids = {truck_id for truck_id, _ in keys}
+    dates = {trip_date for _, trip_date in keys}
+    # Trips of archived dates are computed over archived rows too
+    rows = ledger_queryset(min(dates), max(dates)).filter(truck_id__in=truck_ids, date__in=dates)
+
+    groups = {}
+    for group in trip_groups_queryset(rows):
+        key = (group['truck_id'], group['date'])
+        if key in keys:
+            groups[key] = group
+
+    income_by_trip = defaultdict(list)
+    income_rows = rows.filter(account_type__name=HAULING_INCOME).values(
+        'truck_id', 'date', 'account_number', 'reference_number', 'remarks',
+        'final_total', 'front_load_id', 'back_load_id'
+    ).order_by('id')
+    for row in income_rows:
+        key = (row['truck_id'], row['date'])
+        if key in keys:
+            income_by_trip[key].append(row)
+
+    existing = {}
+    for trip in Trip.objects.filter(truck_id__in=truck_ids, date__in=dates):
+        key = (trip.truck_id, trip.date)
+        if key in keys:
+            existing[key] = trip
+
+    to_create = []
+    to_update = []
+    to_delete = []
+    # bulk_update() does not apply auto_now
+    now = timezone.now()
+    for key in keys:
+        group = groups.get(key)
+        trip = existing.get(key)
+        if group is None:
+            if trip is not None:
+                to_delete.append(trip.id)
+            continue
+        if trip is None:
+            trip = Trip(truck_id=key[0], date=key[1])
+            to_create.append(trip)
+        else:
+            trip.updated_at = now
+            to_update.append(trip)
+        _apply_group(trip, group, allocate_income(income_by_trip[key]))
+
+    with transaction.atomic():
+        if to_delete:
+            Trip.objects.filter(id__in=to_delete).delete()
+        if to_create:
+            Trip.objects.bulk_create(to_create)
+        if to_update:
+            Trip.objects.bulk_update(to_update, TRIP_UPDATE_FIELDS)
+        # Link every row of these trips to its Trip in one statement. Match the keys
+        # themselves: truck_id__in/date__in would also rewrite rows of other trips.
+        key_filter = Q()
+        for truck_id, trip_date in keys:
+            key_filter |= Q(truck_id=truck_id, date=trip_date)
+        TruckingAccount.objects.filter(key_filter).update(trip_id=Subquery(
+            Trip.objects.filter(truck_id=OuterRef('truck_id'), date=OuterRef('date')).values('id')[:1]
+        ))
+        # Rows whose truck was cleared no longer belong to any trip
+        TruckingAccount.objects.filter(
+            truck__isnull=True, trip_id__in=[trip.id for trip in existing.values()]
+        ).update(trip=None)
+
+    return len(to_create) + len(to_update) + len(to_delete)
+
+
+def sync_trips(keys):
+    """
+    Recompute the Trip rows for the given (truck_id, date) keys and link their accounts.
+    Keys without any remaining TruckingAccount rows have their Trip deleted.
+    Returns the number of trips created, updated or deleted.
+    """
+    keys = sorted({(truck_id, trip_date) for truck_id, trip_date in keys if truck_id and trip_date})
+    changed = 0
+    for start in range(0, len(keys), SYNC_CHUNK_SIZE):
+        changed += _sync_chunk(set(keys[start:start + SYNC_CHUNK_SIZE]))
+    return changed
+
+
+def rebuild_trips():
+    """Rebuild the whole Trip table from TruckingAccount. Returns the number of trips."""
+    keys = trip_keys_for(ledger_queryset())
+    sync_trips(keys)
+    # Drop trips whose rows were moved or deleted outside of sync_trips
+    stale = set(Trip.objects.values_list('truck_id', 'date')) - keys
+    if stale:
+        sync_trips(stale)
+    return Trip.objects.count()
@@ -1,22 +1,29 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Sum
-from collections import defaultdict
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 import re
 from datetime import datetime
 from .models import (
-    RepairAndMaintenanceAccount, 
-    InsuranceAccount, 
-    FuelAccount, 
-    TaxAccount, 
-    AllowanceAccount, 
-    IncomeAccount,
-    TruckingAccount,
+    Trip,
     Driver,
     Route,
     LoadType
 )
+from .report_cache import cached_report
+from .report_utils import (
+    apply_date_range,
+    decode_cursor,
+    encode_cursor,
+    parse_date_param,
+    parse_date_range,
+    parse_page_size,
+)
+from .ledger_events import ledger_changed
+from .trip_edits import TripEditError, apply_trip_edits
+from .trips import filter_plate, find_trip
 
 
 def parse_remarks(remarks):
@@ -72,201 +79,110 @@ def parse_remarks(remarks):
     return driver, route, front_load, back_load
 
 
+TRIPS_DEFAULT_PAGE_SIZE = 500
+TRIPS_MAX_PAGE_SIZE = 2000
+
+
 class TripsView(APIView):
     """
-    GET: Get consolidated trips data grouped by plate number and date
+    GET: Get trips from the materialized Trip table, one per (truck, date)
+    Query params:
+    - start_date / end_date: Date range (YYYY-MM-DD or MM/DD/YYYY)
+    - plate_number: Only trips of this truck
+    - driver / route: Only trips of this driver / route
+    - page_size: Trips per page (default 500 when paginating, max 2000)
+    - cursor: Opaque cursor from the X-Next-Cursor header of the previous page
+    The body is an array of trips. Without page_size or cursor it holds every trip;
+    otherwise X-Next-Cursor is set when more trips follow.
     """
-    
+
+    @cached_report('trips')
     def get(self, request):
         try:
-            # Dictionary to store trips grouped by (plate_number, date)
-            trips = defaultdict(lambda: {
-                'account_number': '',
-                'plate_number': '',
-                'date': '',
-                'trip_route': '',
-                'driver': '',
-                'allowance': 0,
-                'reference_number': '',
-                'fuel_liters': 0,
-                'fuel_price': 0,
-                'front_load': '',
-                'front_load_reference_number': '',
-                'front_load_amount': 0,
-                'back_load_reference_number': '',
-                'back_load_amount': 0,
-                'front_and_back_load_amount': 0,
-                'remarks': '',
-                'insurance_expense': 0,
-                'repairs_maintenance_expense': 0,
-                'taxes_permits_licenses_expense': 0,
-                'salaries_allowance': 0
-            })
-            
-            # Process Income Accounts for front_load and back_load
-            income_accounts = IncomeAccount.objects.select_related('plate_number').all()
-            
-            # Group income by plate, date, and reference number
-            income_grouped = defaultdict(list)
-            for account in income_accounts:
-                key = (account.plate_number.number, account.date, account.reference_number)
-                income_grouped[key].append(account)
-            
-            # Process each income group
-            for (plate_num, date, ref_num), accounts in income_grouped.items():
-                trip_key = (plate_num, date)
-                
-                if len(accounts) == 1:
-                    # Single entry - check if front_load has value
-                    account = accounts[0]
-                    front_load_value = str(account.front_load).strip().lower()
-                    back_load_value = str(account.back_load).strip().lower()
-                    
-                    trips[trip_key]['account_number'] = account.account_number
-                    trips[trip_key]['plate_number'] = plate_num
-                    trips[trip_key]['date'] = date.strftime('%Y-%m-%d')
-                    trips[trip_key]['trip_route'] = account.route
-                    trips[trip_key]['driver'] = account.driver
-                    trips[trip_key]['reference_number'] = ref_num
-                    
-                    # Set front_load name from income record if not already set
-                    if not trips[trip_key]['front_load'] and account.front_load:
-                        trips[trip_key]['front_load'] = str(account.front_load)
-                    
-                    trips[trip_key]['remarks'] = account.remarks
-                    
-                    # Check if front_load has a meaningful value (not empty, 'n', 'nan', etc.)
-                    if (front_load_value and front_load_value != '' and 
-                        front_load_value not in ['n', 'nan', 'none', '0'] and
-                        back_load_value and back_load_value != '' and 
-                        back_load_value not in ['nan', 'none', '0']):
-                        # Both front_load and back_load have meaningful values - divide by 2
-                        half_amount = float(account.final_total) / 2
-                        trips[trip_key]['front_load_amount'] += half_amount
-                        trips[trip_key]['back_load_amount'] += half_amount
-                        trips[trip_key]['front_load_reference_number'] = ref_num
-                        trips[trip_key]['back_load_reference_number'] = ref_num
-                    elif (back_load_value and back_load_value != '' and 
-                          back_load_value not in ['nan', 'none', '0']):
-                        # Only back_load has value - all goes to back_load, front_load = 0
-                        trips[trip_key]['front_load_amount'] = 0  # Explicitly set to 0
-                        trips[trip_key]['back_load_amount'] += float(account.final_total)
-                        trips[trip_key]['back_load_reference_number'] = ref_num
-                    elif (front_load_value and front_load_value != '' and 
-                          front_load_value not in ['n', 'nan', 'none', '0']):
-                        # Only front_load has value - all goes to front_load, back_load = 0
-                        trips[trip_key]['front_load_amount'] += float(account.final_total)
-                        trips[trip_key]['back_load_amount'] = 0  # Explicitly set to 0
-                        trips[trip_key]['front_load_reference_number'] = ref_num
-                    else:
-                        # Neither has meaningful value - still keep the names if they exist
-                        pass
-                else:
-                    # Multiple entries - first is front_load, rest are back_load
-                    for i, account in enumerate(accounts):
-                        trips[trip_key]['account_number'] = account.account_number
-                        trips[trip_key]['plate_number'] = plate_num
-                        trips[trip_key]['date'] = date.strftime('%Y-%m-%d')
-                        trips[trip_key]['trip_route'] = account.route
-                        trips[trip_key]['driver'] = account.driver
-                        
-                        if not trips[trip_key]['front_load'] and account.front_load:
-                            trips[trip_key]['front_load'] = str(account.front_load)
-                            
-                        trips[trip_key]['remarks'] = account.remarks
-                        
-                        if i == 0:
-                            # First entry is front_load
-                            trips[trip_key]['front_load_amount'] += float(account.final_total)
-                            trips[trip_key]['front_load_reference_number'] = ref_num
-                        else:
-                            # Subsequent entries are back_load
-                            trips[trip_key]['back_load_amount'] += float(account.final_total)
-                            trips[trip_key]['back_load_reference_number'] = ref_num
-            
-            # Process Fuel Accounts
-            fuel_accounts = FuelAccount.objects.select_related('plate_number', 'front_load', 'back_load').all()
-            for account in fuel_accounts:
-                trip_key = (account.plate_number.number, account.date)
-                if trip_key in trips or not trips[trip_key]['plate_number']:
-                    trips[trip_key]['plate_number'] = account.plate_number.number
-                    trips[trip_key]['date'] = account.date.strftime('%Y-%m-%d')
-                    trips[trip_key]['fuel_liters'] += float(account.liters or 0)
-                    trips[trip_key]['fuel_price'] = float(account.price or 0)
-                    if not trips[trip_key]['driver']:
-                        trips[trip_key]['driver'] = account.driver
-                    if not trips[trip_key]['trip_route']:
-                        trips[trip_key]['trip_route'] = account.route
-                    if not trips[trip_key]['front_load'] and account.front_load:
-                        trips[trip_key]['front_load'] = str(account.front_load)
-            
-            # Process Allowance Accounts
-            allowance_accounts = AllowanceAccount.objects.select_related('plate_number').all()
-            for account in allowance_accounts:
-                trip_key = (account.plate_number.number, account.date)
-                if trip_key in trips or not trips[trip_key]['plate_number']:
-                    trips[trip_key]['plate_number'] = account.plate_number.number
-                    trips[trip_key]['date'] = account.date.strftime('%Y-%m-%d')
-                    trips[trip_key]['allowance'] += float(account.final_total)
-                    trips[trip_key]['salaries_allowance'] += float(account.final_total)
-            
-            # Process Insurance Accounts
-            insurance_accounts = InsuranceAccount.objects.select_related('plate_number').all()
-            for account in insurance_accounts:
-                trip_key = (account.plate_number.number, account.date)
-                if trip_key in trips or not trips[trip_key]['plate_number']:
-                    trips[trip_key]['plate_number'] = account.plate_number.number
-                    trips[trip_key]['date'] = account.date.strftime('%Y-%m-%d')
-                    trips[trip_key]['insurance_expense'] += float(account.final_total)
-            
-            # Process Repair and Maintenance Accounts
-            repair_accounts = RepairAndMaintenanceAccount.objects.select_related('plate_number').all()
-            for account in repair_accounts:
-                trip_key = (account.plate_number.number, account.date)
-                if trip_key in trips or not trips[trip_key]['plate_number']:
-                    trips[trip_key]['plate_number'] = account.plate_number.number
-                    trips[trip_key]['date'] = account.date.strftime('%Y-%m-%d')
-                    trips[trip_key]['repairs_maintenance_expense'] += float(account.final_total)
-            
-            # Process Tax Accounts
-            tax_accounts = TaxAccount.objects.select_related('plate_number').all()
-            for account in tax_accounts:
-                trip_key = (account.plate_number.number, account.date)
-                if trip_key in trips or not trips[trip_key]['plate_number']:
-                    trips[trip_key]['plate_number'] = account.plate_number.number
-                    trips[trip_key]['date'] = account.date.strftime('%Y-%m-%d')
-                    trips[trip_key]['taxes_permits_licenses_expense'] += float(account.final_total)
-            
-            # Also process TruckingAccount for any missing metadata (like front_load set via modal)
-            trucking_accounts = TruckingAccount.objects.filter(is_locked=False).select_related('truck', 'front_load', 'back_load').all()
-            for account in trucking_accounts:
-                if not account.truck or not account.truck.plate_number:
-                    continue
-                trip_key = (account.truck.plate_number, account.date)
-                if trip_key in trips:
-                    if not trips[trip_key]['front_load'] and account.front_load:
-                        trips[trip_key]['front_load'] = str(account.front_load.name)
-            
-            # Calculate front_and_back_load_amount for each trip
-            # Include all trips (route is optional - can be set later)
-            trips_list = []
-            for trip_data in trips.values():
-                # Skip trips with 'nan' as route, but allow empty routes
-                route = str(trip_data.get('trip_route', '')).strip().lower()
-                if route == 'nan':
-                    trip_data['trip_route'] = ''  # Set to empty string instead of skipping
-                    
-                trip_data['front_and_back_load_amount'] = (
-                    trip_data['front_load_amount'] + trip_data['back_load_amount']
+            try:
+                start_date, end_date = parse_date_range(request.query_params)
+                paginate = 'page_size' in request.query_params or 'cursor' in request.query_params
+                page_size = parse_page_size(request.query_params, TRIPS_DEFAULT_PAGE_SIZE, TRIPS_MAX_PAGE_SIZE)
+                position = decode_cursor(request.query_params.get('cursor'))
+                after_date = parse_date_param(position['date']) if position else None
+                after_truck = int(position['truck_id']) if position else None
+            except (ValueError, KeyError, TypeError) as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            queryset = apply_date_range(Trip.objects.all(), start_date, end_date)
+
+            plate_number = request.query_params.get('plate_number')
+            if plate_number:
+                queryset = filter_plate(queryset, plate_number)
+            driver = request.query_params.get('driver')
+            if driver:
+                queryset = queryset.filter(driver__name__iexact=driver)
+            route = request.query_params.get('route')
+            if route:
+                queryset = queryset.filter(route__name__iexact=route)
+
+            if after_date:
+                queryset = queryset.filter(
+                    Q(date__gt=after_date) | Q(date=after_date, truck_id__gt=after_truck)
                 )
-                trips_list.append(trip_data)
-            
-            # Sort by date and plate number
-            trips_list.sort(key=lambda x: (x['date'], x['plate_number']))
-            
-            # Return array directly as frontend expects an array
-            return Response(trips_list, status=status.HTTP_200_OK)
-            
+
+            rows = queryset.values(
+                'date', 'truck_id', 'truck__plate_number', 'driver__name', 'route__name',
+                'front_load__name', 'back_load__name', 'account_number', 'reference_number',
+                'front_load_reference_number', 'back_load_reference_number', 'remarks',
+                'front_load_amount', 'back_load_amount', 'fuel_liters', 'fuel_price',
+                'allowance_total', 'insurance_total', 'repairs_total', 'taxes_permits_total', 'tax_total',
+            ).order_by('date', 'truck_id')
+            if paginate:
+                page = list(rows[:page_size + 1])
+                has_more = len(page) > page_size
+                page = page[:page_size]
+            else:
+                page = list(rows)
+                has_more = False
+
+            trips_list = []
+            for trip in page:
+                allowance = float(trip['allowance_total'])
+                front_load_amount = float(trip['front_load_amount'])
+                back_load_amount = float(trip['back_load_amount'])
+                route_name = trip['route__name'] or ''
+                if route_name.strip().lower() == 'nan':
+                    route_name = ''
+                trips_list.append({
+                    'account_number': trip['account_number'],
+                    'plate_number': trip['truck__plate_number'],
+                    'date': trip['date'].strftime('%Y-%m-%d'),
+                    'trip_route': route_name,
+                    'driver': trip['driver__name'] or '',
+                    'allowance': allowance,
+                    'reference_number': trip['reference_number'],
+                    'fuel_liters': float(trip['fuel_liters']),
+                    'fuel_price': float(trip['fuel_price']),
+                    'front_load': trip['front_load__name'] or '',
+                    'back_load': trip['back_load__name'] or '',
+                    'front_load_reference_number': trip['front_load_reference_number'],
+                    'front_load_amount': front_load_amount,
+                    'back_load_reference_number': trip['back_load_reference_number'],
+                    'back_load_amount': back_load_amount,
+                    'front_and_back_load_amount': front_load_amount + back_load_amount,
+                    'remarks': trip['remarks'],
+                    'insurance_expense': float(trip['insurance_total']),
+                    'repairs_maintenance_expense': float(trip['repairs_total']),
+                    'taxes_permits_licenses_expense': float(trip['taxes_permits_total'] + trip['tax_total']),
+                    'salaries_allowance': allowance,
+                })
+
+            # Return array directly as frontend expects an array; pagination goes in headers
+            response = Response(trips_list, status=status.HTTP_200_OK)
+            if has_more:
+                last = page[-1]
+                response['X-Next-Cursor'] = encode_cursor({
+                    'date': last['date'].strftime('%Y-%m-%d'),
+                    'truck_id': last['truck_id'],
+                })
+            return response
+
         except Exception as e:
             return Response(
                 {'error': f'Failed to fetch trips data: {str(e)}'},
@@ -310,31 +226,24 @@ class UpdateTripFieldView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Standardize plate number for matching
-            def standardize_plate(plate):
-                if not plate:
-                    return ''
-                return str(plate).replace(' ', '').replace('-', '').upper()
+            # Find the trip by standardized plate number and date
+            trip = find_trip(plate_number, date_obj)
             
-            standardized_plate = standardize_plate(plate_number)
-            
-            # Get all TruckingAccount records matching the plate number and date
-            matching_accounts = TruckingAccount.objects.filter(date=date_obj).select_related('truck')
+            if not trip:
+                return Response(
+                    {'error': 'No matching trucking accounts found'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
             
-            # Filter by plate number
-            accounts_to_update = []
-            locked_accounts = []
-            for account in matching_accounts:
-                account_plate = None
-                if account.truck and account.truck.plate_number:
-                    account_plate = account.truck.plate_number
-                
-                if account_plate and standardize_plate(account_plate) == standardized_plate:
-                    if account.is_locked:
-                        locked_accounts.append(account.id)
-                    else:
-                        accounts_to_update.append(account)
+            accounts = list(trip.accounts.values_list('id', 'is_locked'))
+            if not accounts:
+                # Trips of archived periods keep their rows in the (locked) archive
+                return Response(
+                    {'error': 'The trucking accounts of the selected trip are archived and cannot be modified.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             
+            locked_accounts = [account_id for account_id, is_locked in accounts if is_locked]
             if locked_accounts:
                 return Response(
                     {
@@ -344,42 +253,19 @@ class UpdateTripFieldView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            if not accounts_to_update:
-                return Response(
-                    {'error': 'No matching trucking accounts found'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
+            # Resolve the new value once, then update all accounts of the trip in one statement
+            if field == 'trip_route':
+                update_fields = {'route': Route.objects.get_or_create(name=value)[0] if value else None}
+            elif field == 'driver':
+                update_fields = {'driver': Driver.objects.get_or_create(name=value)[0] if value else None}
+            elif field == 'front_load':
+                update_fields = {'front_load': LoadType.objects.get_or_create(name=value)[0] if value else None}
+            else:
+                update_fields = {'back_load': LoadType.objects.get_or_create(name=value)[0] if value else None}
             
-            # Update the field for all matching accounts
-            updated_count = 0
-            for account in accounts_to_update:
-                if field == 'trip_route':
-                    if value:
-                        route, created = Route.objects.get_or_create(name=value)
-                        account.route = route
-                    else:
-                        account.route = None
-                elif field == 'driver':
-                    if value:
-                        driver, created = Driver.objects.get_or_create(name=value)
-                        account.driver = driver
-                    else:
-                        account.driver = None
-                elif field == 'front_load':
-                    if value:
-                        load_type, created = LoadType.objects.get_or_create(name=value)
-                        account.front_load = load_type
-                    else:
-                        account.front_load = None
-                elif field == 'back_load':
-                    if value:
-                        load_type, created = LoadType.objects.get_or_create(name=value)
-                        account.back_load = load_type
-                    else:
-                        account.back_load = None
-                
-                account.save()
-                updated_count += 1
+            with transaction.atomic():
+                updated_count = trip.accounts.update(updated_at=timezone.now(), **update_fields)
+                ledger_changed([(trip.truck_id, trip.date)])
             
             return Response({
                 'success': True,
@@ -397,3 +283,35 @@ class UpdateTripFieldView(APIView):
                 {'error': f'Failed to update trip field: {str(e)}', 'traceback': traceback.format_exc()},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class BatchUpdateTripFieldView(APIView):
+    """
+    POST: Apply many UpdateTripFieldView edits in one request and one transaction
+    Request body: an array of edits (at most 1000), each updating one field of one trip:
+    [
+        {"plate_number": "ABC 123", "date": "2025-07-01", "field": "driver", "value": "Juan"},
+        {"plate_number": "ABC 123", "date": "2025-07-02", "field": "trip_route", "value": null}
+    ]
+    field: trip_route, driver, front_load or back_load; an empty value clears the field.
+    Nothing is written when any edit is invalid, has no trip or touches locked rows: the
+    400 response then holds `errors`, a list aligned with the edits ({} for valid ones).
+    """
+
+    def post(self, request):
+        try:
+            results = apply_trip_edits(request.data)
+        except TripEditError as e:
+            return Response({'error': str(e), 'errors': e.errors}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response(
+                {'error': f'Failed to update trip fields: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        return Response({
+            'success': True,
+            'updated_count': sum(result['updated_count'] for result in results),
+            'results': results,
+        }, status=status.HTTP_200_OK)
@@ -1,9 +1,20 @@
+from django.db.models import Q
 from rest_framework.exceptions import ValidationError
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.views import APIView
 
+from .archive import ledger_queryset
 from .models import TruckingAccount
+from .report_utils import decode_cursor, encode_cursor, estimated_count, parse_date_param, parse_page_size
 from .serializers import TruckingAccountSerializer
+from .trucking_bulk import BulkValidationError, bulk_create_accounts, bulk_update_accounts
+from .trucking_rows import flat_columns, flat_rows, parse_fields
+from .ledger_events import ledger_changed
+from .ledger_sync import record_deletions
 
 
 class TruckingAccountPagination(PageNumberPagination):
@@ -13,21 +24,98 @@ class TruckingAccountPagination(PageNumberPagination):
     max_page_size = 1000
 
 
+class TruckingAccountCursorPagination(BasePagination):
+    """
+    Keyset pagination on (date, id), newest first: `cursor` is the position after the
+    last row of the previous page, so a deep page costs the same as the first one.
+    With estimate_count=1 the response carries a planner-estimated total instead of
+    an exact COUNT(*). Keyset mode is opt-in (pagination=cursor or a `cursor`);
+    other requests keep the page-number pagination and its response shape.
+    """
+    page_size = 100
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_number_pagination = None
+        keyset = 'cursor' in request.query_params or request.query_params.get('pagination') == 'cursor'
+        if not keyset:
+            self.page_number_pagination = TruckingAccountPagination()
+            return self.page_number_pagination.paginate_queryset(queryset, request, view)
+
+        try:
+            page_size = parse_page_size(request.query_params, self.page_size, self.max_page_size)
+            position = decode_cursor(request.query_params.get('cursor'))
+            after_date = parse_date_param(position['date']) if position else None
+            after_id = int(position['id']) if position else None
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValidationError({'error': str(e)})
+
+        self.count = None
+        if request.query_params.get('estimate_count') in ('1', 'true'):
+            self.count = estimated_count(queryset)
+        if after_date:
+            # date__lte bounds the index range; the OR only filters rows of the cursor's date
+            queryset = queryset.filter(
+                Q(date__lt=after_date) | Q(date=after_date, id__lt=after_id), date__lte=after_date
+            )
+
+        rows = list(queryset[:page_size + 1])
+        self.next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            if isinstance(last, dict):
+                last_date, last_id = last['date'], last['id']
+            else:
+                last_date, last_id = last.date, last.id
+            self.next_cursor = encode_cursor({'date': last_date.strftime('%Y-%m-%d'), 'id': last_id})
+        return rows
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(remove_query_param(url, 'page'), 'cursor', self.next_cursor)
+
+    def get_paginated_response(self, data):
+        if self.page_number_pagination:
+            return self.page_number_pagination.get_paginated_response(data)
+        body = {'next_cursor': self.next_cursor, 'next': self.get_next_link()}
+        if self.count is not None:
+            body['count'] = self.count
+            body['count_is_estimate'] = True
+        body['results'] = data
+        response = Response(body)
+        if self.next_cursor:
+            response['X-Next-Cursor'] = self.next_cursor
+        return response
+
+
 class TruckingAccountListView(ListCreateAPIView):
     """
-    GET: List all trucking accounts with optimized queries
+    GET: List trucking accounts, newest first
+    Query params:
+      - page, page_size: page-number pagination with an exact count (default 100 rows, max 1000)
+      - pagination: `cursor` for keyset pagination ({next_cursor, next, results}), which
+        keeps deep pages as cheap as the first one
+      - cursor: next_cursor of the previous keyset page (implies pagination=cursor)
+      - estimate_count: 1 to include an estimated total in keyset pages (planner statistics on PostgreSQL)
+      - flat: 1 for flat rows built without the nested serializer (related objects as name/id pairs)
+      - fields: comma-separated flat fields to return (implies flat)
     POST: Create a new trucking account
     """
     serializer_class = TruckingAccountSerializer
-    pagination_class = TruckingAccountPagination
+    pagination_class = TruckingAccountCursorPagination
     
     def get_queryset(self):
         """
         Optimize queries by using select_related to fetch all ForeignKey relationships
         in a single query instead of N+1 queries. This dramatically improves performance
         when accessing remote databases like Railway Postgres.
+        Reads include archived rows.
         """
-        return TruckingAccount.objects.select_related(
+        return ledger_queryset().select_related(
             'account_type',      # ForeignKey to AccountType
             'truck',             # ForeignKey to Truck
             'truck__truck_type', # ForeignKey from Truck to TruckType
@@ -37,6 +125,21 @@ class TruckingAccountListView(ListCreateAPIView):
             'back_load',         # ForeignKey to LoadType
         ).order_by('-date', '-id')  # Order by date descending (most recent first)
 
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('flat') not in ('1', 'true') and not request.query_params.get('fields'):
+            return super().list(request, *args, **kwargs)
+        try:
+            fields = parse_fields(request.query_params.get('fields'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = ledger_queryset().order_by('-date', '-id').values(*flat_columns(fields))
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(flat_rows(page, fields))
+
+    def perform_create(self, serializer):
+        instance = serializer.save()
+        ledger_changed([(instance.truck_id, instance.date)])
+
 
 class TruckingAccountDetailView(RetrieveUpdateDestroyAPIView):
     """
@@ -49,9 +152,11 @@ class TruckingAccountDetailView(RetrieveUpdateDestroyAPIView):
     
     def get_queryset(self):
         """
-        Optimize queries by using select_related to fetch all ForeignKey relationships
+        Optimize queries by using select_related to fetch all ForeignKey relationships.
+        Archived rows can be retrieved but not changed.
         """
-        return TruckingAccount.objects.select_related(
+        base = ledger_queryset() if self.request.method == 'GET' else TruckingAccount.objects.all()
+        return base.select_related(
             'account_type',
             'truck',
             'truck__truck_type',
@@ -61,8 +166,53 @@ class TruckingAccountDetailView(RetrieveUpdateDestroyAPIView):
             'back_load',
         )
 
+    def perform_update(self, serializer):
+        previous_key = (serializer.instance.truck_id, serializer.instance.date)
+        instance = serializer.save()
+        ledger_changed([previous_key, (instance.truck_id, instance.date)])
+
     def perform_destroy(self, instance):
         if instance.is_locked:
             raise ValidationError('Locked trucking accounts cannot be deleted.')
+        trip_key = (instance.truck_id, instance.date)
+        account_id = instance.id
         instance.delete()
+        record_deletions([account_id])
+        ledger_changed([trip_key])
+
+
+
+class TruckingAccountBulkView(APIView):
+    """
+    POST: Create many trucking accounts in one request
+    PATCH: Partially update many trucking accounts in one request
+    Request body: an array of trucking accounts, as for the single-row endpoints
+    (PATCH rows also carry their "id"), at most 1000 rows:
+    [
+        {"id": 12, "remarks": "Corrected", "driver_id": 3},
+        {"id": 15, "date": "2025-07-02"}
+    ]
+    All rows are written in one transaction, or none when any row is invalid: the
+    400 response then holds `errors`, a list aligned with the rows ({} for valid ones).
+    Locked rows cannot be modified. Responds with the written rows as flat rows.
+    """
+
+    def post(self, request):
+        return self._write(bulk_create_accounts, request.data, status.HTTP_201_CREATED)
+
+    def patch(self, request):
+        return self._write(bulk_update_accounts, request.data, status.HTTP_200_OK)
 
+    def _write(self, write, items, success_status):
+        try:
+            rows = write(items)
+        except BulkValidationError as e:
+            return Response({'error': str(e), 'errors': e.errors}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response(
+                {'error': f'Failed to write trucking accounts: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        return Response({'count': len(rows), 'results': rows}, status=success_status)
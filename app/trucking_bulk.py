@@ -0,0 +1,144 @@
+"""
+Bulk create and bulk patch of TruckingAccount rows.
+
+A whole array is validated with TruckingAccountBulkSerializer (no queries per
+row), then every referenced id set is checked with one query per related model
+and the rows to patch are loaded, with their is_locked flags, in one query.
+Rows are written with bulk_create/bulk_update in a single transaction and the
+change is reported once with every (truck, date) key touched.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .ledger_events import ledger_changed
+from .models import AccountType, Driver, LoadType, Route, Truck, TruckingAccount
+from .serializers import TruckingAccountBulkSerializer
+from .trucking_rows import FLAT_FIELDS, flat_columns, flat_rows
+
+BULK_MAX_ROWS = 1000
+BULK_BATCH_SIZE = 500
+
+# Input id field -> model it references
+RELATED_FIELDS = {
+    'account_type_id': AccountType,
+    'truck_id': Truck,
+    'driver_id': Driver,
+    'route_id': Route,
+    'front_load_id': LoadType,
+    'back_load_id': LoadType,
+}
+
+
+class BulkValidationError(Exception):
+    """Per-row errors: a list aligned with the input rows, {} for valid rows"""
+
+    def __init__(self, errors):
+        super().__init__('Validation failed')
+        self.errors = errors
+
+
+def _check_items(items):
+    if not isinstance(items, list) or not items:
+        raise ValueError('Provide a non-empty array of trucking accounts')
+    if len(items) > BULK_MAX_ROWS:
+        raise ValueError(f'At most {BULK_MAX_ROWS} trucking accounts can be sent at once')
+
+
+def _validate_rows(items, partial):
+    """Field-level validation of every row. Returns (validated rows, errors)."""
+    rows = []
+    errors = []
+    for item in items:
+        serializer = TruckingAccountBulkSerializer(data=item, partial=partial)
+        if serializer.is_valid():
+            rows.append(serializer.validated_data)
+            errors.append({})
+        else:
+            rows.append(None)
+            errors.append(dict(serializer.errors))
+    return rows, errors
+
+
+def _check_related_ids(rows, errors):
+    """Flag ids of related objects that do not exist, one query per related model"""
+    for field, model in RELATED_FIELDS.items():
+        ids = {row[field] for row in rows if row and field in row}
+        if not ids:
+            continue
+        existing = set(model.objects.filter(id__in=ids).values_list('id', flat=True))
+        for row, row_errors in zip(rows, errors):
+            if row and field in row and row[field] not in existing:
+                row_errors.setdefault(field, []).append(f'Invalid pk "{row[field]}" - object does not exist.')
+
+
+def _raise_errors(errors):
+    if any(errors):
+        raise BulkValidationError(errors)
+
+
+def _result_rows(ids):
+    rows = TruckingAccount.objects.filter(id__in=ids).order_by('id').values(*flat_columns(FLAT_FIELDS))
+    return flat_rows(rows, FLAT_FIELDS)
+
+
+def bulk_create_accounts(items):
+    """
+    Create trucking accounts from an array of TruckingAccountSerializer inputs.
+    Returns the created rows as flat rows. Raises ValueError for a malformed array
+    and BulkValidationError when any row is invalid (nothing is written).
+    """
+    _check_items(items)
+    rows, errors = _validate_rows(items, partial=False)
+    _check_related_ids(rows, errors)
+    _raise_errors(errors)
+
+    accounts = [TruckingAccount(**row) for row in rows]
+    with transaction.atomic():
+        TruckingAccount.objects.bulk_create(accounts, batch_size=BULK_BATCH_SIZE)
+        ledger_changed([(account.truck_id, account.date) for account in accounts])
+    return _result_rows([account.id for account in accounts])
+
+
+def bulk_update_accounts(items):
+    """
+    Partially update trucking accounts from an array of inputs that each carry an `id`.
+    Locked and unknown (or archived) rows are rejected. Returns the updated rows as
+    flat rows. Raises ValueError / BulkValidationError like bulk_create_accounts.
+    """
+    _check_items(items)
+    ids = []
+    for item in items:
+        account_id = item.get('id') if isinstance(item, dict) else None
+        if not isinstance(account_id, int) or isinstance(account_id, bool):
+            raise ValueError('Every trucking account must have an integer id')
+        ids.append(account_id)
+    if len(set(ids)) != len(ids):
+        raise ValueError('Each trucking account id may appear only once')
+
+    rows, errors = _validate_rows(items, partial=True)
+    _check_related_ids(rows, errors)
+
+    with transaction.atomic():
+        accounts = TruckingAccount.objects.select_for_update().in_bulk(ids)
+        for account_id, row_errors in zip(ids, errors):
+            account = accounts.get(account_id)
+            if account is None:
+                row_errors.setdefault('id', []).append('Trucking account not found.')
+            elif account.is_locked:
+                row_errors.setdefault('non_field_errors', []).append('Locked trucking accounts cannot be modified.')
+        _raise_errors(errors)
+
+        now = timezone.now()
+        fields = {'updated_at'}
+        trip_keys = set()
+        for account_id, row in zip(ids, rows):
+            account = accounts[account_id]
+            trip_keys.add((account.truck_id, account.date))
+            for field, value in row.items():
+                setattr(account, field, value)
+            account.updated_at = now
+            fields.update(row)
+            trip_keys.add((account.truck_id, account.date))
+        TruckingAccount.objects.bulk_update(accounts.values(), sorted(fields), batch_size=BULK_BATCH_SIZE)
+        ledger_changed(trip_keys)
+    return _result_rows(ids)
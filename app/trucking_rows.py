@@ -0,0 +1,152 @@
+"""
+Flat fast path for reading TruckingAccount rows.
+
+TruckingAccountSerializer nests a serializer per related object and runs
+DRF's field machinery for every value, which dominates list latency. The
+fast path reads only the requested columns with values(), resolves the
+dimension names from id -> name maps loaded once per request, and formats
+dates, decimals and datetimes the way the serializer does. Related objects
+come back as flat `<name>` / `<name>_id` pairs instead of nested objects.
+"""
+from django.utils import timezone
+
+from .models import AccountType, Driver, LoadType, Route, Truck
+
+# Output field -> ledger column read for it
+COLUMN_FIELDS = {
+    'id': 'id',
+    'account_number': 'account_number',
+    'account_type_id': 'account_type_id',
+    'truck_id': 'truck_id',
+    'description': 'description',
+    'debit': 'debit',
+    'credit': 'credit',
+    'final_total': 'final_total',
+    'remarks': 'remarks',
+    'reference_number': 'reference_number',
+    'date': 'date',
+    'quantity': 'quantity',
+    'price': 'price',
+    'driver_id': 'driver_id',
+    'route_id': 'route_id',
+    'front_load_id': 'front_load_id',
+    'back_load_id': 'back_load_id',
+    'is_locked': 'is_locked',
+    'locked_at': 'locked_at',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+
+# Output field -> (id column, name map)
+NAME_FIELDS = {
+    'account_type': ('account_type_id', 'account_types'),
+    'plate_number': ('truck_id', 'plates'),
+    'truck_type': ('truck_id', 'truck_types'),
+    'driver': ('driver_id', 'drivers'),
+    'route': ('route_id', 'routes'),
+    'front_load': ('front_load_id', 'loads'),
+    'back_load': ('back_load_id', 'loads'),
+}
+
+FLAT_FIELDS = [
+    'id', 'account_number', 'account_type', 'account_type_id', 'plate_number', 'truck_type', 'truck_id',
+    'description', 'debit', 'credit', 'final_total', 'remarks', 'reference_number', 'date',
+    'quantity', 'price', 'driver', 'driver_id', 'route', 'route_id', 'front_load', 'front_load_id',
+    'back_load', 'back_load_id', 'is_locked', 'locked_at', 'created_at',
+    'updated_at',
+]
+
+DECIMAL_FIELDS = {'debit', 'credit', 'final_total', 'quantity', 'price'}
+DATETIME_FIELDS = {'locked_at', 'created_at', 'updated_at'}
+
+
+def parse_fields(value):
+    """Requested output fields from a comma-separated `fields` param (all flat fields if empty)"""
+    if not value:
+        return list(FLAT_FIELDS)
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in FLAT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(FLAT_FIELDS)}")
+    return fields
+
+
+def flat_columns(fields):
+    """Ledger columns to read for the fields; id and date are always read for keyset paging"""
+    columns = {'id', 'date'}
+    for field in fields:
+        columns.add(NAME_FIELDS[field][0] if field in NAME_FIELDS else COLUMN_FIELDS[field])
+    return sorted(columns)
+
+
+def name_maps(fields):
+    """The id -> name maps needed by the fields, one small query each"""
+    needed = {NAME_FIELDS[field][1] for field in fields if field in NAME_FIELDS}
+    maps = {}
+    if 'account_types' in needed:
+        maps['account_types'] = dict(AccountType.objects.values_list('id', 'name'))
+    if 'drivers' in needed:
+        maps['drivers'] = dict(Driver.objects.values_list('id', 'name'))
+    if 'routes' in needed:
+        maps['routes'] = dict(Route.objects.values_list('id', 'name'))
+    if 'loads' in needed:
+        maps['loads'] = dict(LoadType.objects.values_list('id', 'name'))
+    if needed & {'plates', 'truck_types'}:
+        trucks = Truck.objects.values_list('id', 'plate_number', 'truck_type__name')
+        maps['plates'] = {truck_id: plate for truck_id, plate, _ in trucks}
+        maps['truck_types'] = {truck_id: truck_type for truck_id, _, truck_type in trucks}
+    return maps
+
+
+def _format_datetime(value, tz):
+    # Same output as DRF's DateTimeField
+    if value is None:
+        return None
+    text = value.astimezone(tz).isoformat()
+    if text.endswith('+00:00'):
+        text = text[:-6] + 'Z'
+    return text
+
+
+def flat_rows(rows, fields):
+    """
+    Turn values() dicts holding flat_columns(fields) into response rows with the
+    requested fields.
+    """
+    maps = name_maps(fields)
+    plain = []
+    named = []
+    decimals = []
+    datetimes = []
+    for field in fields:
+        if field in NAME_FIELDS:
+            column, map_name = NAME_FIELDS[field]
+            named.append((field, column, maps[map_name]))
+        elif field in DECIMAL_FIELDS:
+            decimals.append(field)
+        elif field in DATETIME_FIELDS:
+            datetimes.append(field)
+        elif field != 'date':
+            plain.append(field)
+    with_date = 'date' in fields
+    # Rows share few distinct dates, so each is formatted once
+    dates = {}
+    tz = timezone.get_current_timezone()
+
+    result = []
+    for row in rows:
+        item = {field: row[field] for field in plain}
+        for field, column, names in named:
+            item[field] = names.get(row[column])
+        for field in decimals:
+            value = row[field]
+            item[field] = None if value is None else str(value)
+        for field in datetimes:
+            item[field] = _format_datetime(row[field], tz)
+        if with_date:
+            value = row['date']
+            if value not in dates:
+                dates[value] = value.strftime('%m/%d/%Y')
+            item['date'] = dates[value]
+        result.append(item)
+    return result
@@ -4,7 +4,7 @@ from rest_framework import status
 from django.db.models import Sum, Count, Q
 from collections import defaultdict
 from datetime import datetime
-from .models import TruckingAccount
+from .archive import ledger_queryset
 from decimal import Decimal
 
 
@@ -22,7 +22,7 @@ class TruckingDriversSummaryView(APIView):
             end_date = request.query_params.get('end_date')
             
             # Base queryset with related objects
-            queryset = TruckingAccount.objects.select_related('truck', 'driver', 'route').all()
+            queryset = ledger_queryset().select_related('truck', 'driver', 'route').all()
             
             # Apply date filters if provided
             if start_date:
@@ -181,7 +181,7 @@ class TruckingRevenueStreamsView(APIView):
             end_date = request.query_params.get('end_date')
             
             # Base queryset with related objects
-            queryset = TruckingAccount.objects.select_related('truck', 'driver', 'route').all()
+            queryset = ledger_queryset().select_related('truck', 'driver', 'route').all()
             
             # Apply date filters if provided
             if start_date:
@@ -340,7 +340,7 @@ class TruckingAccountsSummaryView(APIView):
             end_date = request.query_params.get('end_date')
             
             # Base queryset with related objects
-            queryset = TruckingAccount.objects.select_related('truck', 'truck__truck_type').all()
+            queryset = ledger_queryset().select_related('truck', 'truck__truck_type').all()
             
             # Apply date filters if provided
             if start_date:
@@ -437,7 +437,7 @@ class TruckingTripsSummaryView(APIView):
             plate_number = request.query_params.get('plate_number')
             
             # Base queryset with related objects
-            queryset = TruckingAccount.objects.select_related('truck', 'driver', 'route').all()
+            queryset = ledger_queryset().select_related('truck', 'driver', 'route').all()
             
             # Apply date filters if provided
             if start_date:
@@ -3,7 +3,10 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.utils import timezone
-from .models import TruckingAccount, Driver, Route, Truck, TruckType, AccountType, LoadType
+from .models import TruckingAccount, Driver, Route, Truck, TruckType, AccountType, LoadType, normalize_plate
+from .archive import ledger_queryset
+from .ledger_events import ledger_changed, schedule_cache_warmup
+from .trips import trucks_by_plate
 import pandas as pd
 import re
 from datetime import datetime, date
@@ -346,8 +349,9 @@ class TruckingAccountPreviewView(APIView):
                 df = df[df['account_type'].notna() & (df['account_type'] != '')]
             
             # Validate truck_type and plate_number against /api/v1/trucks/ endpoint (PREVIEW VIEW)
-            # Get valid trucks from Truck model
-            valid_trucks = Truck.objects.select_related('truck_type').all()
+            # Get the trucks of the uploaded plates with one indexed query
+            uploaded_plates = df['plate_number'].dropna() if 'plate_number' in df.columns else []
+            valid_trucks = trucks_by_plate(uploaded_plates).values()
             
             # Standardize plate number function - removes spaces and hyphens for comparison
             def standardize_plate(plate_str):
@@ -358,18 +362,16 @@ class TruckingAccountPreviewView(APIView):
             
             # Create a mapping of normalized plate_number -> (original_plate_number, truck_type_name, truck_object)
             truck_plate_map = {}
-            truck_type_names = set()
+            truck_type_names = set(TruckType.objects.filter(truck__isnull=False).values_list('name', flat=True))
             for truck in valid_trucks:
                 if truck.plate_number:
-                    plate_key = standardize_plate(truck.plate_number)
+                    plate_key = truck.plate_normalized
                     # Store original plate number, truck type, and truck object
                     truck_plate_map[plate_key] = {
                         'plate_number': truck.plate_number,  # Original format from database
                         'truck_type': truck.truck_type.name if truck.truck_type else None,
                         'truck': truck
                     }
-                    if truck.truck_type:
-                        truck_type_names.add(truck.truck_type.name)
             
             # Validate truck_type and plate_number - both must exist in /api/v1/trucks/
             # Always validate if plate_number or truck_type columns exist (even if empty)
@@ -1377,8 +1379,9 @@ class TruckingAccountUploadView(APIView):
                 df = df[df['account_type'].notna() & (df['account_type'] != '')]
             
             # Validate truck_type and plate_number against /api/v1/trucks/ endpoint (UPLOAD VIEW)
-            # Get valid trucks from Truck model
-            valid_trucks = Truck.objects.select_related('truck_type').all()
+            # Get the trucks of the uploaded plates with one indexed query
+            uploaded_plates = df['plate_number'].dropna() if 'plate_number' in df.columns else []
+            valid_trucks = trucks_by_plate(uploaded_plates).values()
             
             # Standardize plate number function - removes spaces and hyphens for comparison
             def standardize_plate(plate_str):
@@ -1389,18 +1392,16 @@ class TruckingAccountUploadView(APIView):
             
             # Create a mapping of normalized plate_number -> (original_plate_number, truck_type_name, truck_object)
             truck_plate_map = {}
-            truck_type_names = set()
+            truck_type_names = set(TruckType.objects.filter(truck__isnull=False).values_list('name', flat=True))
             for truck in valid_trucks:
                 if truck.plate_number:
-                    plate_key = standardize_plate(truck.plate_number)
+                    plate_key = truck.plate_normalized
                     # Store original plate number, truck type, and truck object
                     truck_plate_map[plate_key] = {
                         'plate_number': truck.plate_number,  # Original format from database
                         'truck_type': truck.truck_type.name if truck.truck_type else None,
                         'truck': truck
                     }
-                    if truck.truck_type:
-                        truck_type_names.add(truck.truck_type.name)
             
             # Validate truck_type and plate_number - both must exist in /api/v1/trucks/
             # Always validate if plate_number or truck_type columns exist (even if empty)
@@ -2044,8 +2045,9 @@ class TruckingAccountUploadView(APIView):
             # Batch size for bulk_create to prevent connection timeouts
             BATCH_SIZE = 100
             accounts_to_create = []
+            trip_keys = set()
 
-            existing_accounts = TruckingAccount.objects.all().values(
+            existing_accounts = ledger_queryset().values(
                 'account_number',
                 'account_type_id',
                 'date',
@@ -2214,7 +2216,7 @@ class TruckingAccountUploadView(APIView):
                             truck_type_instance, _ = TruckType.objects.get_or_create(name=truck_type_str)
                         
                         # Check if truck already exists
-                        existing_truck = Truck.objects.filter(plate_number=plate_number).first()
+                        existing_truck = Truck.objects.filter(plate_normalized=normalize_plate(plate_number)).first()
                         
                         if existing_truck:
                             # Update existing truck if new data is provided
@@ -2289,6 +2291,8 @@ class TruckingAccountUploadView(APIView):
                     
                     # Add to batch instead of saving immediately
                     accounts_to_create.append(account)
+                    # Truck-less rows have no trip but still move account balances
+                    trip_keys.add((truck_instance.id if truck_instance else None, account_date_value))
                     
                     # Bulk create when batch is full
                     if len(accounts_to_create) >= BATCH_SIZE:
@@ -2324,6 +2328,10 @@ class TruckingAccountUploadView(APIView):
                         except Exception as save_error:
                             errors.append(f"Final batch: {str(save_error)}")
             
+            # Refresh trips and cached reports touched by this upload
+            ledger_changed(trip_keys)
+            schedule_cache_warmup()
+            
             return Response({
                 'message': f'Successfully created {created_count} trucking accounts',
                 'created_count': created_count,
@@ -2401,7 +2409,7 @@ class TruckUploadView(APIView):
                         truck_type_instance, _ = TruckType.objects.get_or_create(name=truck_type_str)
                     
                     # Check if truck already exists
-                    existing_truck = Truck.objects.filter(plate_number=plate_number).first()
+                    existing_truck = Truck.objects.filter(plate_normalized=normalize_plate(plate_number)).first()
                     
                     if existing_truck:
                         # Update existing truck
@@ -2425,6 +2433,9 @@ class TruckUploadView(APIView):
                     error_count += 1
                     continue
             
+            if created_count or updated_count:
+                ledger_changed()
+            
             return Response({
                 'message': f'Successfully processed {created_count + updated_count} trucks',
                 'created_count': created_count,
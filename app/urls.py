@@ -48,12 +48,20 @@ from .revenue_views import RevenueStreamsView
 from .opex_views import OPEXView
 from .accounts_views import AccountsSummaryView, TruckingAccountSummaryView
 from .accounts_detail_views import AccountsDetailView
-from .trips_views import TripsView, UpdateTripFieldView
+from .trips_views import TripsView, UpdateTripFieldView, BatchUpdateTripFieldView
 from .allowance_transfer_view import AllowanceTransferView
 from .clear_trucking_view import ClearTruckingDataView
 from .lock_trucking_view import LockTruckingAccountsView
-from .trucking_account_views import TruckingAccountListView, TruckingAccountDetailView
+from .trucking_account_views import TruckingAccountListView, TruckingAccountDetailView, TruckingAccountBulkView
+from .ledger_sync_views import TruckingAccountChangesView
 from .upload_progress_views import UploadProgressView
+from .pivot_views import PivotReportView
+from .series_views import ReportSeriesView
+from .pnl_views import TruckPnLView
+from .account_ledger_views import AccountLedgerView
+from .period_views import ClosedPeriodListView, ClosedPeriodDetailView
+from .trip_reconciliation_views import TripReconciliationView
+from .payroll_views import PayrollReconciliationView, PayrollReconciliationResultView
 
 urlpatterns = [
     # OTP Authentication
@@ -119,11 +127,16 @@ urlpatterns = [
     # Trucking Account URLs
     path('trucking/', TruckingAccountListView.as_view(), name='trucking-list'),
     path('trucking/<int:pk>/', TruckingAccountDetailView.as_view(), name='trucking-detail'),
+    path('trucking/changes/', TruckingAccountChangesView.as_view(), name='trucking-changes'),
+    path('trucking/bulk/', TruckingAccountBulkView.as_view(), name='trucking-bulk'),
     path('trucking/upload/', TruckingAccountUploadView.as_view(), name='trucking-upload'),
     path('trucking/preview/', TruckingAccountPreviewView.as_view(), name='trucking-preview'),
     path('trucking/clear/', ClearTruckingDataView.as_view(), name='trucking-clear'),
     path('trucking/lock/', LockTruckingAccountsView.as_view(), name='trucking-lock'),
     path('trucking/upload-progress/<str:task_id>/', UploadProgressView.as_view(), name='trucking-upload-progress'),
+    path('trucking/ledger/', AccountLedgerView.as_view(), name='trucking-ledger'),
+    path('trucking/periods/', ClosedPeriodListView.as_view(), name='trucking-period-list'),
+    path('trucking/periods/<int:pk>/', ClosedPeriodDetailView.as_view(), name='trucking-period-detail'),
     
     
     path('drivers/summary/', DriversSummaryView.as_view(), name='drivers-summary'),
@@ -143,9 +156,20 @@ urlpatterns = [
     # Accounts Detail URL
     path('accounts/detail/', AccountsDetailView.as_view(), name='accounts-detail'),
     
+    # Pivot Report URL
+    path('reports/pivot/', PivotReportView.as_view(), name='reports-pivot'),
+    path('reports/series/', ReportSeriesView.as_view(), name='reports-series'),
+    path('reports/truck-pnl/', TruckPnLView.as_view(), name='reports-truck-pnl'),
+    path('reports/trip-reconciliation/', TripReconciliationView.as_view(), name='reports-trip-reconciliation'),
+    
     # Trips URL
     path('trips/', TripsView.as_view(), name='trips'),
     path('trips/update-field/', UpdateTripFieldView.as_view(), name='trips-update-field'),
+    path('trips/update-field/batch/', BatchUpdateTripFieldView.as_view(), name='trips-update-field-batch'),
+    
+    # Payroll Reconciliation URLs
+    path('payroll/reconciliation/', PayrollReconciliationView.as_view(), name='payroll-reconciliation'),
+    path('payroll/reconciliation/<str:task_id>/', PayrollReconciliationResultView.as_view(), name='payroll-reconciliation-result'),
     
     # Allowance Transfer URL
     path('allowance/transfer/', AllowanceTransferView.as_view(), name='allowance-transfer'),
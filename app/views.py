@@ -5,12 +5,14 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
 from rest_framework.exceptions import ValidationError
-from django.db.models import Q, Sum, Count
+from django.db.models import Q, Sum, Count, F, OuterRef, Subquery, Value, Window
+from django.db.models.functions import Coalesce, RowNumber
 from collections import defaultdict
 from django.contrib.auth import get_user_model
 from .models import Role, Driver, RepairAndMaintenanceAccount, InsuranceAccount, FuelAccount, Route, TaxAccount, AllowanceAccount, IncomeAccount, Truck, TruckingAccount, SalaryAccount, TruckType, AccountType, PlateNumber, LoadType
 from .trucking_upload_view import TruckingAccountUploadView, TruckUploadView
 from .salary_upload_view import SalaryAccountUploadView
+from .ledger_events import LedgerWriteMixin
 from .serializers import (
     RoleSerializer,
     CustomUserSerializer,
@@ -202,38 +204,42 @@ class ChangePasswordView(APIView):
         )
 
 
-class DriverListView(ListCreateAPIView):
+class DriverListView(LedgerWriteMixin, ListCreateAPIView):
     queryset = Driver.objects.all()
     serializer_class = DriverSerializer
 
 
-class DriverDetailView(RetrieveUpdateDestroyAPIView):
+class DriverDetailView(LedgerWriteMixin, RetrieveUpdateDestroyAPIView):
     queryset = Driver.objects.all()
     serializer_class = DriverSerializer
+    ledger_lookups = ('driver',)
 
 
-class RouteListView(ListCreateAPIView):
+class RouteListView(LedgerWriteMixin, ListCreateAPIView):
     queryset = Route.objects.all()
     serializer_class = RouteSerializer
 
 
-class RouteDetailView(RetrieveUpdateDestroyAPIView):
+class RouteDetailView(LedgerWriteMixin, RetrieveUpdateDestroyAPIView):
     queryset = Route.objects.all()
     serializer_class = RouteSerializer
+    ledger_lookups = ('route',)
 
 
-class TruckListView(ListCreateAPIView):
+class TruckListView(LedgerWriteMixin, ListCreateAPIView):
     queryset = Truck.objects.all()
     serializer_class = TruckSerializer
 
 
-class TruckDetailView(RetrieveUpdateDestroyAPIView):
+class TruckDetailView(LedgerWriteMixin, RetrieveUpdateDestroyAPIView):
     queryset = Truck.objects.all()
     serializer_class = TruckSerializer
+    ledger_display_fields = ('plate_number', 'truck_type_id')
+    ledger_lookups = ('truck',)
 
 
 # TruckType Views
-class TruckTypeListView(ListCreateAPIView):
+class TruckTypeListView(LedgerWriteMixin, ListCreateAPIView):
     """
     GET: List all truck types
     POST: Create a new truck type
@@ -242,7 +248,7 @@ class TruckTypeListView(ListCreateAPIView):
     serializer_class = TruckTypeSerializer
 
 
-class TruckTypeDetailView(RetrieveUpdateDestroyAPIView):
+class TruckTypeDetailView(LedgerWriteMixin, RetrieveUpdateDestroyAPIView):
     """
     GET: Retrieve a specific truck type
     PUT: Update a specific truck type
@@ -251,10 +257,11 @@ class TruckTypeDetailView(RetrieveUpdateDestroyAPIView):
     """
     queryset = TruckType.objects.all()
     serializer_class = TruckTypeSerializer
+    ledger_lookups = ('truck__truck_type',)
 
 
 # AccountType Views
-class AccountTypeListView(ListCreateAPIView):
+class AccountTypeListView(LedgerWriteMixin, ListCreateAPIView):
     """
     GET: List all account types
     POST: Create a new account type
@@ -263,7 +270,7 @@ class AccountTypeListView(ListCreateAPIView):
     serializer_class = AccountTypeSerializer
 
 
-class AccountTypeDetailView(RetrieveUpdateDestroyAPIView):
+class AccountTypeDetailView(LedgerWriteMixin, RetrieveUpdateDestroyAPIView):
     """
     GET: Retrieve a specific account type
     PUT: Update a specific account type
@@ -272,10 +279,12 @@ class AccountTypeDetailView(RetrieveUpdateDestroyAPIView):
     """
     queryset = AccountType.objects.all()
     serializer_class = AccountTypeSerializer
+    ledger_lookups = ('account_type',)
+    resync_trips_on_update = True
 
 
 # LoadType Views
-class LoadTypeListView(ListCreateAPIView):
+class LoadTypeListView(LedgerWriteMixin, ListCreateAPIView):
     """
     GET: List all load types
     POST: Create a new load type
@@ -284,7 +293,7 @@ class LoadTypeListView(ListCreateAPIView):
     serializer_class = LoadTypeSerializer
 
 
-class LoadTypeDetailView(RetrieveUpdateDestroyAPIView):
+class LoadTypeDetailView(LedgerWriteMixin, RetrieveUpdateDestroyAPIView):
     """
     GET: Retrieve a specific load type
     PUT: Update a specific load type
@@ -293,6 +302,7 @@ class LoadTypeDetailView(RetrieveUpdateDestroyAPIView):
     """
     queryset = LoadType.objects.all()
     serializer_class = LoadTypeSerializer
+    ledger_lookups = ('front_load', 'back_load')
 
 
 # PlateNumber Views
@@ -7270,125 +7280,14 @@ class AllowanceAccountUploadView(APIView):
 class DriversSummaryView(APIView):
     """
     GET: Get drivers summary with front_load, back_load, and allowance amounts
+    Runs a fixed number of queries: one for income rows (grouping done with window
+    functions) and one for allowances pre-joined to their driver by (plate_number, date).
     """
     def get(self, request):
         try:
             drivers_data = {}
             
-            # Process IncomeAccount (for front_load and back_load)
-            income_accounts = IncomeAccount.objects.all().order_by('reference_number', 'account_number', 'date', 'id')
-            
-            # Group by reference_number, account_number, and date
-            grouped_income = defaultdict(list)
-            for account in income_accounts:
-                key = (account.reference_number, account.account_number, account.date)
-                grouped_income[key].append(account)
-            
-            for key, accounts in grouped_income.items():
-                reference_number, account_number, date = key
-                
-                # Sort by ID to ensure consistent ordering
-                accounts.sort(key=lambda x: x.id)
-                
-                # Check if there's only 1 entry for this combination
-                if len(accounts) == 1:
-                    # Split the single entry equally between front_load and back_load
-                    account = accounts[0]
-                    
-                    # Skip if no route
-                    if not account.route or str(account.route).strip() == '' or str(account.route).lower() == 'nan':
-                        continue
-                    
-                    driver = account.driver
-                    half_amount = float(account.final_total) / 2
-                    
-                    if driver not in drivers_data:
-                        drivers_data[driver] = {
-                            'driver_name': driver,
-                            'front_load_amount': 0,
-                            'back_load_amount': 0,
-                            'allowance_amount': 0,
-                            'total_loads': 0,
-                            'details': []
-                        }
-                    
-                    # Add half to front_load and half to back_load
-                    drivers_data[driver]['front_load_amount'] += half_amount
-                    drivers_data[driver]['back_load_amount'] += half_amount
-                    drivers_data[driver]['total_loads'] += 1
-                    
-                    # Add details for both front and back load
-                    drivers_data[driver]['details'].append({
-                        'reference_number': reference_number,
-                        'account_number': account_number,
-                        'date': date.strftime('%Y-%m-%d'),
-                        'amount': half_amount,
-                        'load_type': 'front_load',
-                        'route': account.route,
-                        'description': account.description
-                    })
-                    drivers_data[driver]['details'].append({
-                        'reference_number': reference_number,
-                        'account_number': account_number,
-                        'date': date.strftime('%Y-%m-%d'),
-                        'amount': half_amount,
-                        'load_type': 'back_load',
-                        'route': account.route,
-                        'description': account.description
-                    })
-                else:
-                    # Multiple entries - use original logic
-                    for i, account in enumerate(accounts):
-                        # Skip if no route
-                        if not account.route or str(account.route).strip() == '' or str(account.route).lower() == 'nan':
-                            continue
-                        
-                        driver = account.driver
-                        if driver not in drivers_data:
-                            drivers_data[driver] = {
-                                'driver_name': driver,
-                                'front_load_amount': 0,
-                                'back_load_amount': 0,
-                                'allowance_amount': 0,
-                                'total_loads': 0,
-                                'details': []
-                            }
-                        
-                        # First occurrence is front_load, subsequent are back_load
-                        if i == 0:
-                            load_type = 'front_load'
-                            drivers_data[driver]['front_load_amount'] += float(account.final_total)
-                        else:
-                            load_type = 'back_load'
-                            drivers_data[driver]['back_load_amount'] += float(account.final_total)
-                        
-                        drivers_data[driver]['total_loads'] += 1
-                        drivers_data[driver]['details'].append({
-                            'reference_number': reference_number,
-                            'account_number': account_number,
-                            'date': date.strftime('%Y-%m-%d'),
-                            'amount': float(account.final_total),
-                            'load_type': load_type,
-                            'route': account.route,
-                            'description': account.description
-                        })
-            
-            # Process AllowanceAccount (for allowances)
-            # Match allowance accounts with income accounts by date and plate number to get driver name
-            allowance_accounts = AllowanceAccount.objects.all()
-            for allowance in allowance_accounts:
-                # Find matching income account by date and plate number to get driver name
-                matching_income = IncomeAccount.objects.filter(
-                    date=allowance.date,
-                    plate_number=allowance.plate_number
-                ).first()
-                
-                if matching_income:
-                    driver = matching_income.driver
-                else:
-                    # Fallback: try to get driver from allowance if it exists
-                    driver = allowance.driver if hasattr(allowance, 'driver') else 'Unknown'
-                
+            def get_driver_entry(driver):
                 if driver not in drivers_data:
                     drivers_data[driver] = {
                         'driver_name': driver,
@@ -7398,8 +7297,68 @@ class DriversSummaryView(APIView):
                         'total_loads': 0,
                         'details': []
                     }
+                return drivers_data[driver]
+            
+            # Process IncomeAccount (for front_load and back_load)
+            # Group size and position within (reference_number, account_number, date) come from window functions
+            group_partition = [F('reference_number'), F('account_number'), F('date')]
+            income_accounts = IncomeAccount.objects.annotate(
+                group_size=Window(expression=Count('id'), partition_by=group_partition),
+                group_position=Window(expression=RowNumber(), partition_by=group_partition, order_by=F('id').asc()),
+            ).values(
+                'reference_number', 'account_number', 'date', 'driver', 'route',
+                'final_total', 'description', 'group_size', 'group_position'
+            ).order_by('reference_number', 'account_number', 'date', 'id')
+            
+            for account in income_accounts:
+                # Skip if no route
+                route = account['route']
+                if not route or str(route).strip() == '' or str(route).lower() == 'nan':
+                    continue
                 
-                drivers_data[driver]['allowance_amount'] += float(allowance.final_total)
+                entry = get_driver_entry(account['driver'])
+                detail = {
+                    'reference_number': account['reference_number'],
+                    'account_number': account['account_number'],
+                    'date': account['date'].strftime('%Y-%m-%d'),
+                    'route': route,
+                    'description': account['description']
+                }
+                
+                if account['group_size'] == 1:
+                    # Split the single entry equally between front_load and back_load
+                    half_amount = float(account['final_total']) / 2
+                    entry['front_load_amount'] += half_amount
+                    entry['back_load_amount'] += half_amount
+                    entry['total_loads'] += 1
+                    entry['details'].append({**detail, 'amount': half_amount, 'load_type': 'front_load'})
+                    entry['details'].append({**detail, 'amount': half_amount, 'load_type': 'back_load'})
+                else:
+                    # First occurrence is front_load, subsequent are back_load
+                    amount = float(account['final_total'])
+                    if account['group_position'] == 1:
+                        load_type = 'front_load'
+                        entry['front_load_amount'] += amount
+                    else:
+                        load_type = 'back_load'
+                        entry['back_load_amount'] += amount
+                    entry['total_loads'] += 1
+                    entry['details'].append({**detail, 'amount': amount, 'load_type': load_type})
+            
+            # Process AllowanceAccount (for allowances)
+            # Each allowance is joined to the driver of the first income account with the same
+            # date and plate number (indexed lookup), and totals are summed per driver in SQL
+            matching_driver = IncomeAccount.objects.filter(
+                plate_number=OuterRef('plate_number'),
+                date=OuterRef('date')
+            ).order_by('id').values('driver')[:1]
+            allowance_totals = AllowanceAccount.objects.annotate(
+                driver_name=Coalesce(Subquery(matching_driver), Value('Unknown'))
+            ).values('driver_name').annotate(total=Sum('final_total')).order_by()
+            
+            for allowance in allowance_totals:
+                entry = get_driver_entry(allowance['driver_name'])
+                entry['allowance_amount'] += float(allowance['total'] or 0)
             
             # Convert to list, filter out drivers with no front_load or back_load, and sort by driver name
             result = [
@@ -7423,4 +7382,4 @@ class DriversSummaryView(APIView):
             return Response(
                 {'error': f'Failed to fetch drivers data: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
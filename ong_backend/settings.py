@@ -233,6 +233,14 @@ CORS_ALLOW_HEADERS = [
     'x-requested-with',
 ]
 
+# Response headers readable by the frontend (keyset pagination cursors)
+CORS_EXPOSE_HEADERS = [
+    'X-Next-Cursor',
+    'X-Report-Cache',
+    'X-Ledger-Generation',
+    'X-Report-Generation',
+]
+
 # For file uploads
 CSRF_TRUSTED_ORIGINS = [
     "https://web-production-639bc.up.railway.app",
@@ -277,6 +285,23 @@ CACHES = {
         'TIMEOUT': 3600,  # 1 hour default
     }
 }
+# Report responses are invalidated by the ledger generation, so they can live long
+REPORT_CACHE_TIMEOUT = int(os.getenv('REPORT_CACHE_TIMEOUT', 7 * 24 * 3600))
+# Concurrent misses for the same report wait for one worker instead of recomputing
+REPORT_LOCK_TIMEOUT = int(os.getenv('REPORT_LOCK_TIMEOUT', 120))
+REPORT_WAIT_TIMEOUT = int(os.getenv('REPORT_WAIT_TIMEOUT', 60))
+# Stale-while-revalidate reports: seconds writes are coalesced before a refresh, and the
+# oldest version served while it runs
+REPORT_REFRESH_DELAY = int(os.getenv('REPORT_REFRESH_DELAY', 5))
+REPORT_MAX_STALE_SECONDS = int(os.getenv('REPORT_MAX_STALE_SECONDS', 600))
+
+# Closed periods ending more than this many days ago are moved to the ledger archive
+LEDGER_ARCHIVE_AFTER_DAYS = int(os.getenv('LEDGER_ARCHIVE_AFTER_DAYS', 365))
+# Future months that get a ledger partition ahead of time (PostgreSQL only, see app.partitions)
+LEDGER_PARTITION_MONTHS_AHEAD = int(os.getenv('LEDGER_PARTITION_MONTHS_AHEAD', 3))
+# Deleted row ids kept for delta sync; older sync cursors get a full refresh (see app.ledger_sync)
+LEDGER_TOMBSTONE_RETENTION_DAYS = int(os.getenv('LEDGER_TOMBSTONE_RETENTION_DAYS', 30))
+
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'